@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coleta profunda da atividade de issues e pull requests (RQ02 e RQ06)
+
+Para cada repositório, pagina issues e pull requests (só createdAt, closedAt
+e mergedAt), do mais recente para o mais antigo, até max_items itens de
+cada tipo: em repositórios gigantes (ex.: freeCodeCamp) a etapa fica
+limitada e os itens coletados são os mais recentes. As duas conexões
+avançam na mesma requisição, cada uma com seu cursor, e vários
+repositórios são coletados em paralelo.
+
+Onde só a contagem importa (issues abertas/fechadas e PRs abertos/aceitos
+por mês), as janelas de data são contadas com search(type: ISSUE), várias
+por requisição via aliases, sem paginar os itens.
+
+Os resultados são passados ao Parquet à medida que cada repositório
+termina, em row groups de ITEMS_ROW_GROUP_SIZE itens (a memória não cresce
+com a coleta): activity_items.parquet (um item por linha) e
+activity_windows.parquet (uma contagem por janela e métrica). Os arquivos
+só aparecem nos caminhos finais ao fim da coleta (ver RepoParquetWriter).
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+from itertools import islice
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+import graphql
+from columnar_writer import RepoParquetWriter, pa, parse_timestamp, require_pyarrow
+from incremental import SNAPSHOT_FILE, load_snapshot
+from instrumentation import add_metrics_arguments, finish_metrics, metrics, start_metrics
+from repo_stats import TDigest
+
+ITEMS_FILE = "activity_items.parquet"
+WINDOWS_FILE = "activity_windows.parquet"
+
+MAX_ITEMS = 1000  # itens de cada tipo (issues, PRs) por repositório
+PAGE_SIZE = 100
+WINDOWS_PER_REQUEST = 24  # aliases de search(type: ISSUE) por requisição
+ITEMS_ROW_GROUP_SIZE = 10000  # itens por row group (~5 repositórios com MAX_ITEMS issues e PRs)
+
+# Métricas contadas por janela: nome -> qualificadores da busca ({window} = início..fim)
+WINDOW_METRICS = {
+    "issues_opened": "is:issue created:{window}",
+    "issues_closed": "is:issue closed:{window}",
+    "prs_opened": "is:pr created:{window}",
+    "prs_merged": "is:pr merged:{window}",
+}
+
+ACTIVITY_QUERY = """
+query($owner: String!, $name: String!, $issuesCursor: String, $prsCursor: String,
+      $issuesPage: Int!, $prsPage: Int!, $withIssues: Boolean!, $withPrs: Boolean!) {
+  repository(owner: $owner, name: $name) {
+    issues(first: $issuesPage, after: $issuesCursor, orderBy: {field: CREATED_AT, direction: DESC})
+        @include(if: $withIssues) {
+      pageInfo { endCursor hasNextPage }
+      nodes { createdAt closedAt }
+    }
+    pullRequests(first: $prsPage, after: $prsCursor, orderBy: {field: CREATED_AT, direction: DESC})
+        @include(if: $withPrs) {
+      pageInfo { endCursor hasNextPage }
+      nodes { createdAt closedAt mergedAt }
+    }
+  }
+  rateLimit { cost remaining resetAt }
+}
+"""
+
+
+def items_schema():
+    require_pyarrow()
+    timestamp = pa.timestamp("s", tz="UTC")
+    return pa.schema([
+        ("owner", pa.string()),
+        ("name", pa.string()),
+        ("kind", pa.dictionary(pa.int8(), pa.string())),
+        ("created_at", timestamp),
+        ("closed_at", timestamp),
+        ("merged_at", timestamp),
+    ])
+
+
+def windows_schema():
+    require_pyarrow()
+    return pa.schema([
+        ("owner", pa.string()),
+        ("name", pa.string()),
+        ("metric", pa.dictionary(pa.int8(), pa.string())),
+        ("window_start", pa.date32()),
+        ("window_end", pa.date32()),
+        ("count", pa.int64()),
+    ])
+
+
+def month_windows(months, end=None):
+    """As últimas months janelas mensais [(início, fim)], fechadas, terminando no mês de end"""
+    end = end or date.today()
+    windows = []
+    start = end.replace(day=1)
+    for _ in range(months):
+        last_day = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        windows.append((start, min(last_day, end)))
+        start = (start - timedelta(days=1)).replace(day=1)
+    return windows[::-1]
+
+
+def graphql_headers(token):
+    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+
+def crawl_items(owner, repo_name, token, max_items=MAX_ITEMS, session=None):
+    """Pagina issues e PRs do repositório (mais recentes primeiro) até max_items de cada tipo
+
+    Devolve os registros no formato de items_schema.
+    """
+    state = {
+        "issues": {"cursor": None, "has_next": max_items > 0, "count": 0},
+        "pullRequests": {"cursor": None, "has_next": max_items > 0, "count": 0},
+    }
+    records = []
+    while any(kind["has_next"] for kind in state.values()):
+        issues, prs = state["issues"], state["pullRequests"]
+        variables = {
+            "owner": owner, "name": repo_name,
+            "issuesCursor": issues["cursor"], "prsCursor": prs["cursor"],
+            "issuesPage": max(1, min(PAGE_SIZE, max_items - issues["count"])),
+            "prsPage": max(1, min(PAGE_SIZE, max_items - prs["count"])),
+            "withIssues": issues["has_next"], "withPrs": prs["has_next"],
+        }
+        with metrics.stage("activity_page"):
+            data, _ = graphql.make_graphql_request(graphql.GRAPHQL_URL, graphql_headers(token),
+                                                   {"query": ACTIVITY_QUERY, "variables": variables},
+                                                   session=session)
+        repository = (data.get("data") or {}).get("repository")
+        if repository is None:
+            raise Exception(f"Erro GraphQL ao coletar a atividade de {owner}/{repo_name}: {data.get('errors')}")
+
+        for field, kind in (("issues", "issue"), ("pullRequests", "pr")):
+            if not state[field]["has_next"]:
+                continue
+            connection = repository.get(field) or {}
+            nodes = connection.get("nodes") or []
+            for node in nodes[:max_items - state[field]["count"]]:
+                records.append({
+                    "owner": owner, "name": repo_name, "kind": kind,
+                    "created_at": parse_timestamp(node.get("createdAt")),
+                    "closed_at": parse_timestamp(node.get("closedAt")),
+                    "merged_at": parse_timestamp(node.get("mergedAt")),
+                })
+            state[field]["count"] = min(max_items, state[field]["count"] + len(nodes))
+            page_info = connection.get("pageInfo") or {}
+            state[field]["cursor"] = page_info.get("endCursor")
+            state[field]["has_next"] = bool(page_info.get("hasNextPage")) and state[field]["count"] < max_items
+    return records
+
+
+def count_windows(owner, repo_name, windows, token, session=None):
+    """Conta issues/PRs por janela e métrica com search(type: ISSUE), sem paginar os itens
+
+    Devolve os registros no formato de windows_schema.
+    """
+    requests_to_count = [
+        (metric, start, end, f"repo:{owner}/{repo_name} " + qualifiers.format(window=f"{start}..{end}"))
+        for start, end in windows
+        for metric, qualifiers in WINDOW_METRICS.items()
+    ]
+    records = []
+    for offset in range(0, len(requests_to_count), WINDOWS_PER_REQUEST):
+        chunk = requests_to_count[offset:offset + WINDOWS_PER_REQUEST]
+        declarations = ", ".join(f"$q{idx}: String!" for idx in range(len(chunk)))
+        selections = "\n".join(f"w{idx}: search(query: $q{idx}, type: ISSUE, first: 0) {{ issueCount }}"
+                               for idx in range(len(chunk)))
+        query = f"query({declarations}) {{\n{selections}\nrateLimit {{ cost remaining resetAt }}\n}}"
+        variables = {f"q{idx}": search_query for idx, (_, _, _, search_query) in enumerate(chunk)}
+
+        with metrics.stage("activity_windows"):
+            data, _ = graphql.make_graphql_request(graphql.GRAPHQL_URL, graphql_headers(token),
+                                                   {"query": query, "variables": variables}, session=session)
+            results = data.get("data") or {}
+        for idx, (metric, start, end, _) in enumerate(chunk):
+            result = results.get(f"w{idx}")
+            records.append({
+                "owner": owner, "name": repo_name, "metric": metric,
+                "window_start": start, "window_end": end,
+                "count": result.get("issueCount") if isinstance(result, dict) else None,
+            })
+    return records
+
+
+def crawl_repo(owner, repo_name, token, max_items=MAX_ITEMS, windows=(), session=None):
+    """Itens paginados e contagens por janela de um repositório: (itens, janelas)"""
+    items = crawl_items(owner, repo_name, token, max_items, session) if max_items else []
+    window_counts = count_windows(owner, repo_name, windows, token, session) if windows else []
+    return items, window_counts
+
+
+def hours_between(records, start_field, end_field):
+    """Horas entre dois campos dos registros que têm ambos"""
+    return np.array([
+        (record[end_field] - record[start_field]).total_seconds() / 3600
+        for record in records
+        if record[start_field] is not None and record[end_field] is not None
+    ])
+
+
+def crawl_activity(repos, token, items_path=ITEMS_FILE, windows_path=WINDOWS_FILE, max_items=MAX_ITEMS,
+                   months=12, workers=8):
+    """Coleta a atividade de vários repositórios em paralelo e grava os dois Parquets
+
+    repos é uma lista [(owner, nome)]. No máximo workers * 2 repositórios
+    ficam submetidos ao executor (uma nova submissão a cada um concluído),
+    e cada um é passado aos escritores e descartado assim que termina (os
+    Parquets são publicados no fim): a memória não cresce com o número de
+    repositórios. Falhas em um repositório não interrompem os demais. Devolve
+    {"time_to_close": TDigest, "merge_latency": TDigest} (em horas).
+    """
+    windows = month_windows(months) if months else []
+    digests = {"time_to_close": TDigest(), "merge_latency": TDigest()}
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    with session, \
+            RepoParquetWriter(items_path, row_group_size=ITEMS_ROW_GROUP_SIZE, schema=items_schema()) as items_writer, \
+            RepoParquetWriter(windows_path, schema=windows_schema()) as windows_writer, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = iter(repos)
+        futures = {}
+
+        def refill():
+            for owner, repo_name in islice(pending, workers * 2 - len(futures)):
+                future = executor.submit(crawl_repo, owner, repo_name, token, max_items, windows, session)
+                futures[future] = (owner, repo_name)
+
+        refill()
+        done = 0
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done += 1
+                write_repo_activity(futures.pop(future), future, items_writer, windows_writer, digests,
+                                    done, len(repos))
+            refill()
+    return digests
+
+
+def write_repo_activity(key, future, items_writer, windows_writer, digests, done, total):
+    """Grava os itens e contagens de um repositório concluído e atualiza os digests"""
+    owner, repo_name = key
+    try:
+        items, window_counts = future.result()
+    except Exception as e:
+        print(f"EXCEÇÃO ao coletar a atividade de {owner}/{repo_name}: {e}")
+        metrics.increment("activity_repos_total", result="failed")
+        return
+
+    with metrics.stage("activity_write"):
+        for record in items:
+            items_writer.write(record)
+        for record in window_counts:
+            windows_writer.write(record)
+    issues = [record for record in items if record["kind"] == "issue"]
+    prs = [record for record in items if record["kind"] == "pr"]
+    digests["time_to_close"].add_many(hours_between(issues, "created_at", "closed_at"))
+    digests["merge_latency"].add_many(hours_between(prs, "created_at", "merged_at"))
+    metrics.increment("activity_repos_total", result="ok")
+    metrics.increment("activity_items_total", len(issues), kind="issue")
+    metrics.increment("activity_items_total", len(prs), kind="pr")
+    print(f"[{done}/{total}] {owner}/{repo_name}: {len(issues)} issues, {len(prs)} PRs, "
+          f"{len(window_counts)} contagens por janela")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Coleta profunda da atividade de issues e pull requests")
+    parser.add_argument("repos", nargs="*", help="owner/nome (padrão: os repositórios do snapshot)")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="snapshot da última coleta")
+    parser.add_argument("--limit", type=int, default=None, help="só os primeiros N repositórios do snapshot")
+    parser.add_argument("--max-items", type=int, default=MAX_ITEMS,
+                        help="itens de cada tipo (issues, PRs) por repositório; 0 só conta as janelas")
+    parser.add_argument("--months", type=int, default=12, help="janelas mensais contadas via search (0 desativa)")
+    parser.add_argument("--workers", type=int, default=8, help="repositórios coletados em paralelo")
+    parser.add_argument("--items-output", default=ITEMS_FILE)
+    parser.add_argument("--windows-output", default=WINDOWS_FILE)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    start_metrics(args)
+    if args.repos:
+        repos = [tuple(repo.split("/", 1)) for repo in args.repos]
+    else:
+        repos = list(load_snapshot(args.snapshot))
+    repos = repos[:args.limit] if args.limit else repos
+    print(f"Coletando a atividade de {len(repos)} repositórios (até {args.max_items} itens de cada tipo, "
+          f"{args.months} janelas mensais)")
+
+    try:
+        digests = crawl_activity(repos, graphql.token, args.items_output, args.windows_output,
+                                 args.max_items, args.months, args.workers)
+        for name, label in (("time_to_close", "Tempo até fechar issues"), ("merge_latency", "Tempo até o merge de PRs")):
+            digest = digests[name]
+            if digest.count:
+                print(f"{label}: mediana {digest.quantile(0.5):.1f} h, p90 {digest.quantile(0.9):.1f} h "
+                      f"({digest.count:.0f} itens)")
+    finally:
+        finish_metrics(args)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coletor assíncrono dos detalhes dos repositórios
+
+Dispara as mesmas chamadas de graphql.py (query individual ou lotes com aliases)
+com no máximo concurrency requisições em andamento (asyncio.Semaphore). O
+projeto não depende de um cliente HTTP assíncrono (aiohttp/httpx): cada
+chamada bloqueante do requests roda em uma thread do executor, orquestrada
+pelo asyncio, e cada thread tem a própria requests.Session (Session não é
+thread-safe) com conexões HTTP/1.1 keep-alive. Gera os mesmos arquivos que
+collect_and_print_repo_info (.txt, CSV e Parquet escritos juntos) e usa o
+mesmo diário de progresso. Com vários tokens em TOKENS, cada chamada usa o
+token com mais folga, então a vazão cresce com o número de tokens. Para
+testar contra um servidor GraphQL local, defina GITHUB_GRAPHQL_URL.
+"""
+
+import asyncio
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import graphql
+from crawl_journal import JOURNAL_FILE, CrawlJournal
+from instrumentation import add_metrics_arguments, finish_metrics, start_metrics
+from response_cache import ResponseCache
+
+
+def create_session():
+    """Cria uma sessão com conexões keep-alive para uma thread do executor"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class WorkerSessions:
+    """Uma requests.Session por thread do executor, criada no primeiro uso"""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = create_session()
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+
+
+async def run_limited(semaphore, executor, sessions, func, *args, **kwargs):
+    """Executa uma chamada bloqueante no executor, com a Session da thread, respeitando o limite de concorrência"""
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        return await loop.run_in_executor(executor, lambda: func(*args, session=sessions.get(), **kwargs))
+
+
+async def fetch_repo_details(semaphore, executor, sessions, basic_repo, prefetched, token, journal=None):
+    """Obtém os detalhes de um repositório (as contagens nulas já vêm completadas)"""
+    owner = basic_repo["owner"]["login"]
+    repo_name = basic_repo["name"]
+
+    if journal is not None and (owner, repo_name) in journal.repos:
+        return journal.repos[(owner, repo_name)]
+
+    try:
+        if graphql.has_details(basic_repo):
+            repo = basic_repo
+        elif prefetched is not None:
+            # Lotes já registram cada resultado no diário (on_result)
+            return prefetched.get((owner, repo_name))
+        else:
+            repo = await run_limited(semaphore, executor, sessions, graphql.get_repo_details_graphql,
+                                     owner, repo_name, token)
+    except Exception as e:
+        print(f"EXCEÇÃO ao buscar {owner}/{repo_name}: {e}")
+        return None
+
+    if not isinstance(repo, Mapping):
+        return None
+    if journal is not None:
+        journal.record_repo(owner, repo_name, repo)
+    return repo
+
+
+async def collect_repo_details_async(basic_repos, token, concurrency=8, batch_size=None, journal=None):
+    """Busca os detalhes de todos os repositórios e devolve {(owner, nome): dados}
+
+    Com journal, os repositórios já registrados no diário não são buscados
+    de novo e cada novo repositório concluído é registrado.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    journaled = journal.repos if journal is not None else {}
+    pending = [repo for repo in basic_repos if (repo["owner"]["login"], repo["name"]) not in journaled]
+    missing_repos = [repo for repo in pending if not graphql.has_details(repo)]
+    sessions = WorkerSessions()
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Nós da passada única: contagens nulas completadas em um acompanhamento agrupado
+            with_details = {(repo["owner"]["login"], repo["name"]): repo
+                            for repo in pending if graphql.has_details(repo)}
+            if with_details:
+                await run_limited(semaphore, executor, sessions, graphql.fill_missing_counts, with_details, token)
+
+            prefetched = None
+            if batch_size:
+                # Cada lote vira uma requisição independente, executadas em paralelo
+                chunks = [missing_repos[i:i + batch_size] for i in range(0, len(missing_repos), batch_size)]
+                results = await asyncio.gather(*(
+                    run_limited(semaphore, executor, sessions, graphql.get_repos_details_batch_graphql,
+                                chunk, token, batch_size, on_result=graphql.journal_recorder(journal))
+                    for chunk in chunks
+                ))
+                prefetched = {}
+                for result in results:
+                    prefetched.update(result)
+
+            repos = await asyncio.gather(*(
+                fetch_repo_details(semaphore, executor, sessions, basic_repo, prefetched, token, journal)
+                for basic_repo in basic_repos
+            ))
+    finally:
+        sessions.close()
+
+    details = {}
+    for basic_repo, repo in zip(basic_repos, repos):
+        if repo is not None:
+            details[(basic_repo["owner"]["login"], basic_repo["name"])] = repo
+    return details
+
+
+async def collect_and_print_repo_info_async(basic_repos, filename, concurrency=8, batch_size=None, token=None,
+                                            parquet_path=None, write_txt=True, csv_path=None, journal=None):
+    """Versão assíncrona de collect_and_print_repo_info, com os mesmos arquivos de saída
+
+    Com csv_path, o CSV é escrito junto com o relatório (sem reler o .txt).
+    """
+    token = token or graphql.token
+    details = await collect_repo_details_async(basic_repos, token, concurrency, batch_size, journal)
+
+    def resolve_details(i, basic_repo):
+        return details.get((basic_repo["owner"]["login"], basic_repo["name"]))
+
+    written = graphql.write_repo_report(basic_repos, filename, resolve_details, parquet_path, write_txt, csv_path)
+    print(f"Orçamento de rate limit: {graphql.token_pool.budget()}")
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Coleta assíncrona dos repositórios mais populares do GitHub")
+    parser.add_argument("--max-repos", type=int, default=1000,
+                        help="número máximo de repositórios a coletar")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="número máximo de requisições simultâneas")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="repositórios por requisição em lote (0 busca um por vez)")
+    parser.add_argument("--parquet", default=None,
+                        help="grava também os registros tipados neste arquivo Parquet")
+    parser.add_argument("--no-txt", action="store_true",
+                        help="não gera o relatório .txt nem o CSV derivado dele (use com --parquet)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continua a coleta interrompida a partir do diário de progresso")
+    parser.add_argument("--journal", default=JOURNAL_FILE,
+                        help="arquivo do diário de progresso da coleta")
+    parser.add_argument("--cache", default=None, metavar="ARQUIVO",
+                        help="reaproveita respostas ainda válidas deste cache SQLite (desativado por padrão; "
+                             "dentro do TTL as contagens podem estar desatualizadas)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    start_metrics(args)
+    if args.cache:
+        graphql.response_cache = ResponseCache(args.cache)
+
+    print("=== COLETA ASSÍNCRONA DE REPOSITÓRIOS POPULARES ===")
+    print(graphql.details_plan.describe(args.max_repos, args.batch_size or 1))
+
+    # O diário é sempre gravado; --resume reaproveita o da execução anterior
+    journal = CrawlJournal(args.journal, resume=args.resume)
+
+    try:
+        repos = graphql.get_top_starred_repos_graphql(max_repos=args.max_repos, journal=journal)
+
+        if repos:
+            filename = "lab_popular_repositories.txt"
+            csv_filename = None if args.no_txt else "repos_info_with_issues_prs.csv"
+            asyncio.run(collect_and_print_repo_info_async(
+                repos, filename, concurrency=args.concurrency, batch_size=args.batch_size,
+                parquet_path=args.parquet, write_txt=not args.no_txt, csv_path=csv_filename, journal=journal))
+        else:
+            print("Nenhum repositório foi coletado")
+
+    except Exception as e:
+        print(f"Erro: {e}")
+    finally:
+        journal.close()
+        if graphql.response_cache is not None:
+            print(graphql.response_cache.summary())
+            graphql.response_cache.close()
+        finish_metrics(args)
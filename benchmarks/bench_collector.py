@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de ponta a ponta dos coletores contra o servidor local
+
+Sobe benchmarks/mock_github.py em segundo plano, aponta os coletores
+(graphql.py, async_collector.py e main.py) para ele e mede, por cenário:
+repositórios/s, requisições feitas, retentativas (respostas diferentes de
+200/304), KB recebidos e latência p50/p99 das requisições vistas pelo cliente.
+Com --rq/--columns, o cenário graphql-refresh usa o plano de campos
+reduzido (ver query_planner) sobre um snapshot completo montado antes da
+medição; os demais cenários são coletas normais e usam o fragmento completo.
+
+Os pools de tokens dos coletores são trocados por pools com orçamento alto
+(--points-per-minute) para medir o pipeline e não o espaçamento do rate
+limit; o rate limit do servidor continua valendo (--rate-limit).
+
+Com --save os resultados são gravados em JSON; com --compare, um resultado
+anterior serve de referência e o script termina com código 1 se algum
+cenário ficar mais lento que a tolerância.
+
+Uso: python benchmarks/bench_collector.py [--repos 500] [--latency 0.02]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from mock_github import MockGitHub  # noqa: E402
+from query_planner import add_plan_arguments, full_plan, plan_from_args  # noqa: E402
+
+SCENARIOS = ["graphql-per-repo", "graphql-batch", "graphql-single-pass", "graphql-async", "graphql-pipeline",
+             "graphql-pipeline-per-repo", "graphql-refresh", "rest"]
+
+
+class RequestRecorder:
+    """Registra status e latência de cada requisição feita pelo requests
+
+    Envolve HTTPAdapter.send, por onde passam as requisições de qualquer
+    Session (inclusive as de requests.get/post), enquanto estiver ativo.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = []
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+        self.original_send = None
+
+    def __enter__(self):
+        recorder = self
+        self.original_send = original_send = requests.adapters.HTTPAdapter.send
+
+        def send(adapter, request, **kwargs):
+            start = time.perf_counter()
+            response = original_send(adapter, request, **kwargs)
+            elapsed = time.perf_counter() - start
+            with recorder.lock:
+                recorder.latencies.append(elapsed)
+                recorder.statuses.append(response.status_code)
+                recorder.bytes_received += len(response.content)
+            return response
+
+        requests.adapters.HTTPAdapter.send = send
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        requests.adapters.HTTPAdapter.send = self.original_send
+
+    def percentile(self, q):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def retries(self):
+        return sum(1 for status in self.statuses if status not in (200, 304))
+
+
+def prepare_scenario(name, num_repos):
+    """Estado anterior de que o cenário depende, montado fora da medição"""
+    import graphql
+
+    if name == "graphql-refresh":
+        # Snapshot completo a atualizar (um plano parcial só completa detalhes conhecidos)
+        repos = graphql.get_top_starred_repos_graphql(max_repos=num_repos, with_details=True)
+        return {(repo["owner"]["login"], repo["name"]): repo for repo in repos}
+    return None
+
+
+def run_scenario(name, num_repos, workdir, concurrency, known=None):
+    """Executa um cenário completo (busca + detalhes + relatório)"""
+    import graphql
+    import main
+    from async_collector import collect_and_print_repo_info_async
+
+    report = os.path.join(workdir, f"{name}.txt")
+    if name == "graphql-per-repo":
+        repos = graphql.get_top_starred_repos_graphql(max_repos=num_repos)
+        return graphql.collect_and_print_repo_info(repos, report, batch_size=None)
+    if name == "graphql-batch":
+        repos = graphql.get_top_starred_repos_graphql(max_repos=num_repos)
+        return graphql.collect_and_print_repo_info(repos, report, batch_size=25)
+    if name == "graphql-single-pass":
+        repos = graphql.get_top_starred_repos_graphql(max_repos=num_repos, with_details=True)
+        return graphql.collect_and_print_repo_info(repos, report, batch_size=25)
+    if name == "graphql-async":
+        repos = graphql.get_top_starred_repos_graphql(max_repos=num_repos)
+        return asyncio.run(collect_and_print_repo_info_async(repos, report, concurrency=concurrency))
+    if name == "graphql-pipeline":
+        return graphql.collect_pipelined(report, num_repos, batch_size=25, workers=concurrency)
+    if name == "graphql-pipeline-per-repo":
+        return graphql.collect_pipelined(report, num_repos, batch_size=0, workers=concurrency)
+    if name == "graphql-refresh":
+        # Atualização do snapshot via nodes(ids:), sem a busca
+        return graphql.refresh_by_node_ids(known, graphql.token)
+    if name == "rest":
+        repos = main.get_top_starred_repos_paginated(num_repos)
+        main.collect_and_save_repo_info_to_csv(repos, os.path.join(workdir, "rest.csv"))
+        return repos
+    raise ValueError(f"Cenário desconhecido: {name}")
+
+
+def measure(name, num_repos, workdir, concurrency, refresh_plan):
+    import graphql
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        graphql.details_plan = full_plan()
+        known = prepare_scenario(name, num_repos)
+    if name == "graphql-refresh":
+        graphql.details_plan = refresh_plan
+    with RequestRecorder() as recorder, contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        run_scenario(name, num_repos, workdir, concurrency, known)
+        elapsed = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "repos": num_repos,
+        "seconds": elapsed,
+        "repos_per_second": num_repos / elapsed,
+        "requests": len(recorder.statuses),
+        "retries": recorder.retries(),
+        "kb_received": recorder.bytes_received / 1024,
+        "p50_ms": recorder.percentile(0.50) * 1000,
+        "p99_ms": recorder.percentile(0.99) * 1000,
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Lista os cenários com repos/s abaixo da referência menos a tolerância"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {entry["scenario"]: entry for entry in json.load(f)}
+    regressions = []
+    for result in results:
+        reference = baseline.get(result["scenario"])
+        if reference and result["repos_per_second"] < reference["repos_per_second"] * (1 - tolerance):
+            regressions.append((result["scenario"], reference["repos_per_second"], result["repos_per_second"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repos", type=int, default=500, help="repositórios coletados por cenário")
+    parser.add_argument("--dataset", type=int, default=5000, help="repositórios no servidor")
+    parser.add_argument("--latency", type=float, default=0.02, help="latência do servidor por requisição (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latência extra aleatória máxima (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 502")
+    parser.add_argument("--rate-limit", type=int, default=1000000, help="requisições por janela e token no servidor")
+    parser.add_argument("--rate-window", type=float, default=3600, help="duração da janela de rate limit (s)")
+    parser.add_argument("--null-count-rate", type=float, default=0.0,
+                        help="fração de repositórios com contagem nula nos detalhes")
+    parser.add_argument("--points-per-minute", type=float, default=1000000,
+                        help="orçamento dos pools de tokens dos coletores")
+    add_plan_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8, help="concorrência dos cenários async e pipeline")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"cenários separados por vírgula ({', '.join(SCENARIOS)})")
+    parser.add_argument("--save", default=None, help="grava os resultados neste JSON")
+    parser.add_argument("--compare", default=None, help="JSON de referência para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="queda de repos/s tolerada (fração)")
+    args = parser.parse_args()
+
+    mock = MockGitHub(args.dataset, args.latency, args.jitter, args.error_rate, args.rate_limit, args.rate_window,
+                      null_count_rate=args.null_count_rate)
+    base_url = mock.start()
+    os.environ["GITHUB_GRAPHQL_URL"] = f"{base_url}/graphql"
+    os.environ["GITHUB_API_URL"] = base_url
+    os.environ.setdefault("TOKEN", "bench-token")
+
+    import graphql  # noqa: E402
+    import main  # noqa: E402
+    from token_pool import TokenPool  # noqa: E402
+
+    try:
+        refresh_plan = plan_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+    if not refresh_plan.is_full:
+        print(refresh_plan.describe(args.repos, graphql.NODES_CHUNK_SIZE))
+
+    burst = max(100, int(args.points_per_minute))
+    graphql.token_pool = TokenPool.from_env(points_per_minute=args.points_per_minute, burst=burst)
+    main.search_pool = TokenPool(main.tokens, points_per_minute=args.points_per_minute, burst=burst)
+    main.core_pool = TokenPool(main.tokens, points_per_minute=args.points_per_minute, burst=burst)
+
+    print(f"Servidor local: {base_url} ({args.dataset} repositórios, latência {args.latency * 1000:.0f} ms, "
+          f"erros {args.error_rate:.0%})")
+    print(f"{'cenário':<27}{'repos/s':>10}{'tempo (s)':>11}{'requisições':>13}{'retentativas':>14}"
+          f"{'KB recebidos':>14}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]:
+            result = measure(name, args.repos, workdir, args.concurrency, refresh_plan)
+            results.append(result)
+            print(f"{name:<27}{result['repos_per_second']:>10.1f}{result['seconds']:>11.2f}"
+                  f"{result['requests']:>13}{result['retries']:>14}{result['kb_received']:>14.0f}"
+                  f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+
+    print(f"Servidor: {mock.stats}")
+    mock.stop()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for scenario, reference, current in regressions:
+            print(f"REGRESSÃO em {scenario}: {reference:.1f} -> {current:.1f} repos/s")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de memória dos repositórios mantidos durante a coleta
+
+Simula a coleta de N repositórios (padrão: 50 mil) a partir de páginas de
+resposta no formato da API, geradas com os dados de mock_github.py e
+decodificadas com json.loads como no coletor, e compara o pico de RSS ao
+guardar cada repositório como o dicionário JSON (comportamento anterior) ou
+como registro compacto (RepoRecord/RestRepoRecord, ver repo_record.py).
+
+Cenários: busca GraphQL leve, busca GraphQL com o fragmento de detalhes
+(--single-pass) e busca REST (main.py). Cada medição roda em um processo
+separado; o resultado é o pico de RSS acima do RSS antes da coleta, por
+10 mil repositórios.
+
+Uso: python benchmarks/bench_memory.py [--repos 50000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from mock_github import light_node, make_dataset, rest_repo  # noqa: E402
+from repo_record import RepoRecord, RestRepoRecord, vocabulary  # noqa: E402
+
+KINDS = ["graphql-light", "graphql-details", "rest"]
+STORAGES = ["dict", "record"]
+PAGE_SIZE = 100
+TEMPLATE_SIZE = 1000  # repositórios base; as páginas variam nome e ID de cada um
+
+
+def peak_rss_kb():
+    # ru_maxrss é em KB no Linux (em bytes no macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def render_page(kind, repos):
+    """Corpo JSON de uma página da busca com os repositórios indicados"""
+    if kind == "rest":
+        return json.dumps({"total_count": len(repos), "incomplete_results": False,
+                           "items": [rest_repo(repo) for repo in repos]}).encode("utf-8")
+    nodes = [light_node(repo) if kind == "graphql-light" else repo for repo in repos]
+    return json.dumps({"data": {"search": {"pageInfo": {"endCursor": "0", "hasNextPage": True},
+                                           "edges": [{"node": node} for node in nodes]}}}).encode("utf-8")
+
+
+def parse_page(kind, body, storage):
+    """Decodifica a página e devolve os repositórios como o coletor os guardaria"""
+    data = json.loads(body)
+    if kind == "rest":
+        items = data.get("items", [])
+        return items if storage == "dict" else [RestRepoRecord.from_mapping(item) for item in items]
+    nodes = [edge["node"] for edge in data["data"]["search"]["edges"]]
+    return nodes if storage == "dict" else [RepoRecord.from_mapping(node) for node in nodes]
+
+
+def measure(kind, storage, num_repos):
+    """Executado no processo filho: coleta num_repos e mede o pico de RSS"""
+    template = make_dataset(TEMPLATE_SIZE)
+    # Páginas-modelo pré-renderizadas: gerar o JSON fica fora da medição; cada
+    # página coletada troca o prefixo do nome e do ID para que sejam únicos
+    pages = [render_page(kind, template[start:start + PAGE_SIZE])
+             for start in range(0, TEMPLATE_SIZE, PAGE_SIZE)]
+    gc.collect()
+    baseline = peak_rss_kb()
+
+    kept = []
+    for page in range(-(-num_repos // PAGE_SIZE)):
+        body = pages[page % len(pages)].replace(b"repo-", f"repo-{page}-".encode()).replace(
+            b"R_kgDO", f"R_kgDO{page:05d}".encode())
+        kept.extend(parse_page(kind, body, storage))
+    del kept[num_repos:]
+
+    gc.collect()
+    return {
+        "kind": kind,
+        "storage": storage,
+        "repos": len(kept),
+        "baseline_kb": baseline,
+        "peak_kb": peak_rss_kb(),
+        "vocabulary": len(vocabulary),
+    }
+
+
+def run_child(kind, storage, num_repos):
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", f"{kind}:{storage}", "--repos", str(num_repos)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repos", type=int, default=50000, help="repositórios mantidos por cenário")
+    parser.add_argument("--kinds", default=",".join(KINDS), help=f"cenários separados por vírgula ({', '.join(KINDS)})")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, storage = args.child.split(":")
+        print(json.dumps(measure(kind, storage, args.repos)))
+        sys.exit(0)
+
+    print(f"Pico de RSS ao manter {args.repos} repositórios (MB por 10 mil repositórios)")
+    print(f"{'cenário':<18}{'dict (MB)':>12}{'registro (MB)':>15}{'redução':>10}{'vocabulário':>13}")
+    for kind in [name.strip() for name in args.kinds.split(",") if name.strip()]:
+        per_10k = {}
+        vocabulary_size = 0
+        for storage in STORAGES:
+            result = run_child(kind, storage, args.repos)
+            per_10k[storage] = (result["peak_kb"] - result["baseline_kb"]) / 1024 * 10000 / result["repos"]
+            if storage == "record":
+                vocabulary_size = result["vocabulary"]
+        reduction = per_10k["dict"] / per_10k["record"] if per_10k["record"] > 0 else float("inf")
+        print(f"{kind:<18}{per_10k['dict']:>12.1f}{per_10k['record']:>15.1f}{reduction:>9.1f}x{vocabulary_size:>13}")
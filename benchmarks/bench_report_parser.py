@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da conversão do relatório .txt para CSV
+
+Gera um relatório sintético com N repositórios (padrão: 100 mil) usando o
+mesmo writer do coletor e compara o parser incremental atual com a versão
+anterior (arquivo inteiro em memória + um re.search por campo). Também
+confere se os dois CSVs gerados são idênticos.
+
+Uso: python benchmarks/bench_report_parser.py [--repos 100000]
+"""
+
+import argparse
+import contextlib
+import csv
+import filecmp
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from graphql import txt_to_csv_with_issues_prs, write_repo_section, write_report_header  # noqa: E402
+
+LANGUAGES = ["Python", "TypeScript", "JavaScript", "Go", "Rust", "Java", "C++"]
+
+
+def synthetic_repo(i):
+    return {
+        "stargazerCount": 500000 - i,
+        "createdAt": "2015-03-01T12:00:00Z",
+        "updatedAt": "2025-08-30T10:00:00Z",
+        "pushedAt": "2025-08-29T09:00:00Z",
+        "primaryLanguage": {"name": LANGUAGES[i % len(LANGUAGES)]},
+        "releases": {"totalCount": i % 50},
+        "issues": {"totalCount": i % 300},
+        "closedIssues": {"totalCount": i % 900},
+        "totalIssues": {"totalCount": i % 300 + i % 900},
+        "pullRequests": {"totalCount": i % 700},
+        "totalPullRequests": {"totalCount": i % 1000},
+        "forkCount": i % 40000,
+        "diskUsage": i * 3,
+        "hasIssuesEnabled": True,
+        "hasWikiEnabled": i % 2 == 0,
+        "hasProjectsEnabled": True,
+        "licenseInfo": {"name": "MIT License"} if i % 3 else None,
+        "defaultBranchRef": {"name": "main"},
+        "languages": {"edges": [{"node": {"name": lang}, "size": 1000 * (j + 1)}
+                                for j, lang in enumerate(LANGUAGES[: i % 5 + 1])]},
+        "repositoryTopics": {"nodes": [{"topic": {"name": f"topic-{(i + j) % 97}"}} for j in range(i % 8)]},
+    }
+
+
+def write_synthetic_report(path, num_repos):
+    with open(path, "w", encoding="utf-8") as f:
+        write_report_header(f)
+        for i in range(1, num_repos + 1):
+            write_repo_section(f, i, f"owner-{i % 5000}", f"repo-{i}", synthetic_repo(i))
+
+
+def legacy_txt_to_csv(txt_filename, csv_filename):
+    """Implementação anterior: arquivo inteiro em memória e um re.search por campo"""
+    headers = [
+        'Repository', 'Owner', 'URL', 'Stars', 'Forks', 'Watchers',
+        'Last Commit Date', 'Main Language', 'License', 'Size (KB)',
+        'Main Branch', 'Topics', 'Issues', 'Pull Requests',
+        'Created At', 'Releases', 'Closed Issues', 'Merged PRs'
+    ]
+    with open(txt_filename, 'r', encoding='utf-8') as txt_file, \
+         open(csv_filename, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=headers)
+        writer.writeheader()
+        content = txt_file.read()
+        for section in content.split('=' * 100):
+            if not section.strip() or 'REPOSITÓRIO' not in section:
+                continue
+            repo_name_match = re.search(r'REPOSITÓRIO \d+: (.+)', section)
+            owner_match = re.search(r'Owner: (.+)', section)
+            if not repo_name_match or not owner_match:
+                continue
+            repo_name = repo_name_match.group(1).strip()
+            owner = owner_match.group(1).strip()
+            stars_match = re.search(r'Stars: (\d+)', section)
+            forks_match = re.search(r'Forks: (\d+)', section)
+            watchers_match = re.search(r'Watchers: (\d+)', section)
+            created_match = re.search(r'RQ01 - Created At: (.+)', section)
+            updated_match = re.search(r'RQ04 - Last Update: (.+)', section)
+            pushed_match = re.search(r'RQ04_Last_Push: (.+)', section)
+            language_match = re.search(r'RQ05 - Primary Language: (.+)', section)
+            license_match = re.search(r'License: (.+)', section)
+            size_match = re.search(r'Size: (\d+) KB', section)
+            branch_match = re.search(r'Default Branch: (.+)', section)
+            topics_match = re.search(r'Topics: (.+)', section)
+            re.search(r'RQ06 - Open Issues: (\d+)', section)
+            closed_issues_match = re.search(r'RQ06 - Closed Issues: (\d+)', section)
+            total_issues_match = re.search(r'RQ06 - Total Issues: (\d+)', section)
+            merged_prs_match = re.search(r'RQ02_Merged_PRs: (\d+)', section)
+            releases_match = re.search(r'RQ03_Total_Releases: (\d+)', section)
+            total_prs_match = re.search(r'RQ02_Total_PRs: (\d+)', section)
+            writer.writerow({
+                'Repository': repo_name,
+                'Owner': owner,
+                'URL': f"https://github.com/{owner}/{repo_name}",
+                'Stars': int(stars_match.group(1)) if stars_match else 0,
+                'Forks': int(forks_match.group(1)) if forks_match else 0,
+                'Watchers': int(watchers_match.group(1)) if watchers_match else 0,
+                'Last Commit Date': pushed_match.group(1) if pushed_match else (updated_match.group(1) if updated_match else 'N/A'),
+                'Main Language': language_match.group(1) if language_match else 'Not specified',
+                'License': license_match.group(1) if license_match else 'No license',
+                'Size (KB)': int(size_match.group(1)) if size_match else 'N/A',
+                'Main Branch': branch_match.group(1) if branch_match else 'N/A',
+                'Topics': topics_match.group(1) if topics_match else '',
+                'Issues': int(total_issues_match.group(1)) if total_issues_match else 0,
+                'Pull Requests': int(total_prs_match.group(1)) if total_prs_match else 0,
+                'Created At': created_match.group(1) if created_match else 'N/A',
+                'Releases': int(releases_match.group(1)) if releases_match else 0,
+                'Closed Issues': int(closed_issues_match.group(1)) if closed_issues_match else 0,
+                'Merged PRs': int(merged_prs_match.group(1)) if merged_prs_match else 0
+            })
+
+
+def measure(func, *args, repeat=3):
+    """Melhor tempo entre execuções limpas e pico de memória de outra (tracemalloc distorce o tempo)"""
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repos", type=int, default=100000, help="repositórios no relatório sintético")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = os.path.join(tmp, "report.txt")
+        legacy_csv = os.path.join(tmp, "legacy.csv")
+        stream_csv = os.path.join(tmp, "stream.csv")
+
+        print(f"Gerando relatório sintético com {args.repos} repositórios...")
+        write_synthetic_report(report, args.repos)
+        print(f"Tamanho do relatório: {os.path.getsize(report) / 1024 / 1024:.1f} MB")
+
+        legacy_time, legacy_peak = measure(legacy_txt_to_csv, report, legacy_csv)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stream_time, stream_peak = measure(txt_to_csv_with_issues_prs, report, stream_csv)
+
+        print(f"Regex por campo:     {legacy_time:.2f} s, pico de memória {legacy_peak / 1024 / 1024:.1f} MB")
+        print(f"Parser incremental:  {stream_time:.2f} s, pico de memória {stream_peak / 1024 / 1024:.1f} MB")
+        print(f"Speedup: {legacy_time / stream_time:.2f}x")
+        print(f"CSVs idênticos: {filecmp.cmp(legacy_csv, stream_csv, shallow=False)}")
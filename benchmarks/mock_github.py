@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita as partes da API do GitHub usadas pelos coletores
+
+GraphQL (POST /graphql): search (paginado por cursor, com repositoryCount
+e filtro stars:A..B / stars:>N), repository(owner, name), nodes(ids:),
+lotes com aliases (variáveis oN/nN -> rN), issues/pullRequests paginados
+com createdAt/closedAt/mergedAt, contagens search(type: ISSUE) (aliases
+wN com variáveis qN) e o objeto rateLimit. rename() simula
+renomeações/transferências (o node ID é mantido). Os repositórios da
+resposta trazem só os campos (ou aliases) pedidos na query.
+REST: GET /search/repositories e GET /repos/{owner}/{repo} (com ETag).
+
+Latência, taxa de erros (502), rate limit (headers X-RateLimit-* e 403 ao
+esgotar), tokens aceitos (os demais recebem 401), fração de repositórios
+com contagem nula nos detalhes e tamanho do conjunto de dados são
+configuráveis; os dados são gerados de forma determinística a partir da
+semente.
+
+Uso: python benchmarks/mock_github.py --port 8000 --repos 5000 --latency 0.05
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SEARCH_RESULT_CAP = 1000
+LANGUAGES = ["Python", "TypeScript", "JavaScript", "Go", "Rust", "Java", "C++", None]
+LICENSES = ["MIT License", "Apache License 2.0", None]
+BASE_DATE = datetime(2025, 8, 27, tzinfo=timezone.utc)
+
+
+def iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_dataset(size, seed=0):
+    """Repositórios no formato dos detalhes GraphQL, ordenados por estrelas"""
+    rng = random.Random(seed)
+    repos = []
+    for i in range(size):
+        stars = int(400000 / (1 + i) ** 0.8) + rng.randint(0, 50)
+        open_issues = rng.randint(0, 2000)
+        closed_issues = rng.randint(0, 20000)
+        merged_prs = rng.randint(0, 20000)
+        language = LANGUAGES[i % len(LANGUAGES)]
+        license_name = LICENSES[i % len(LICENSES)]
+        repos.append({
+            "id": f"R_kgDO{i:08d}",
+            "name": f"repo-{i}",
+            "owner": {"login": f"owner-{i % 997}"},
+            "stargazerCount": stars,
+            "createdAt": iso(BASE_DATE - timedelta(days=rng.randint(30, 5000))),
+            "updatedAt": iso(BASE_DATE - timedelta(hours=rng.randint(0, 2000))),
+            "pushedAt": iso(BASE_DATE - timedelta(hours=rng.randint(0, 4000))),
+            "primaryLanguage": {"name": language} if language else None,
+            "releases": {"totalCount": rng.randint(0, 500)},
+            "issues": {"totalCount": open_issues},
+            "closedIssues": {"totalCount": closed_issues},
+            "totalIssues": {"totalCount": open_issues + closed_issues},
+            "pullRequests": {"totalCount": merged_prs},
+            "totalPullRequests": {"totalCount": merged_prs + rng.randint(0, 5000)},
+            "forkCount": stars // rng.randint(3, 20),
+            "diskUsage": rng.randint(100, 2000000),
+            "hasIssuesEnabled": True,
+            "hasWikiEnabled": rng.random() < 0.5,
+            "hasProjectsEnabled": True,
+            "licenseInfo": {"name": license_name} if license_name else None,
+            "defaultBranchRef": {"name": "main"},
+            "languages": {"edges": [{"node": {"name": lang}, "size": rng.randint(1000, 10 ** 7)}
+                                    for lang in LANGUAGES[: 1 + i % 4] if lang]},
+            "repositoryTopics": {"nodes": [{"topic": {"name": f"topic-{(i + j) % 50}"}} for j in range(i % 6)]},
+        })
+    repos.sort(key=lambda repo: repo["stargazerCount"], reverse=True)
+    return repos
+
+
+def light_node(repo):
+    """Nó da busca sem o fragmento de detalhes"""
+    return {key: repo[key] for key in ("id", "name", "owner", "stargazerCount", "pushedAt", "updatedAt")}
+
+
+def requested_fields(query):
+    """Nomes (ou aliases) de campos citados na query; o nome após "alias:" não vira chave da resposta"""
+    return set(re.findall(r"[A-Za-z_]\w*", re.sub(r":\s*\w+", "", query)))
+
+
+def repo_nodes(data):
+    """(caminho, repositório) de cada repositório na resposta: aliases, arestas da busca e nodes"""
+    found = [([alias], node) for alias, node in data.items() if alias not in ("search", "nodes")]
+    if data.get("search") and "edges" in data["search"]:
+        found += [(["search", "edges", idx, "node"], edge["node"]) for idx, edge in enumerate(data["search"]["edges"])]
+    if data.get("nodes"):
+        found += [(["nodes", idx], node) for idx, node in enumerate(data["nodes"])]
+    return [(path, node) for path, node in found if isinstance(node, dict) and "owner" in node]
+
+
+def replace_node(data, path, repo):
+    if path[0] == "search":
+        data["search"]["edges"][path[2]] = {"node": repo}
+    elif path[0] == "nodes":
+        data["nodes"][path[1]] = repo
+    else:
+        data[path[0]] = repo
+
+
+def activity_item(repo, kind, index):
+    """index-ésimo item (do mais recente ao mais antigo) de issues ou PRs do repositório"""
+    rng = random.Random(f"{repo['id']}-{kind}-{index}")
+    created = BASE_DATE - timedelta(hours=index * 3 + rng.randint(0, 2))
+    closed = created + timedelta(hours=rng.randint(1, 2000)) if rng.random() < 0.8 else None
+    item = {"createdAt": iso(created), "closedAt": iso(closed) if closed else None}
+    if kind == "pullRequests":
+        item["mergedAt"] = item["closedAt"] if closed and rng.random() < 0.75 else None
+    return item
+
+
+def activity(repo, variables):
+    """Página de issues e/ou pull requests (cursor = posição) conforme as variáveis da query"""
+    result = {}
+    for field, total_field, prefix in (("issues", "totalIssues", "issues"),
+                                       ("pullRequests", "totalPullRequests", "prs")):
+        if not variables.get(f"with{prefix.capitalize()}"):
+            continue
+        total = repo[total_field]["totalCount"]
+        start = int(variables.get(f"{prefix}Cursor") or 0)
+        end = min(total, start + variables[f"{prefix}Page"])
+        result[field] = {
+            "pageInfo": {"endCursor": str(end), "hasNextPage": end < total},
+            "nodes": [activity_item(repo, field, index) for index in range(start, end)],
+        }
+    return result
+
+
+def issue_count(search_query):
+    """Contagem determinística para uma busca de issues/PRs"""
+    return int(hashlib.sha256(search_query.encode("utf-8")).hexdigest()[:6], 16) % 500
+
+
+# Campos *_url de um repositório na API REST (os itens da busca trazem todos)
+REST_URL_FIELDS = [
+    "forks", "keys", "collaborators", "teams", "hooks", "issue_events", "events", "assignees", "branches",
+    "tags", "blobs", "git_tags", "git_refs", "trees", "statuses", "languages", "stargazers", "contributors",
+    "subscribers", "subscription", "commits", "git_commits", "comments", "issue_comment", "contents",
+    "compare", "merges", "archive", "downloads", "issues", "pulls", "milestones", "notifications", "labels",
+    "releases", "deployments",
+]
+REST_OWNER_URL_FIELDS = [
+    "followers", "following", "gists", "starred", "subscriptions", "organizations", "repos", "events",
+    "received_events",
+]
+
+
+def rest_owner(owner):
+    api = f"https://api.github.com/users/{owner}"
+    owner_id = int(hashlib.sha1(owner.encode("utf-8")).hexdigest()[:6], 16)
+    return {"login": owner, "id": owner_id, "node_id": f"MDQ6VXNlcj{owner_id}",
+            "avatar_url": f"https://avatars.githubusercontent.com/u/{owner_id}?v=4",
+            "gravatar_id": "", "url": api, "html_url": f"https://github.com/{owner}", "type": "Organization",
+            "site_admin": False, **{f"{name}_url": f"{api}/{name}" for name in REST_OWNER_URL_FIELDS}}
+
+
+def rest_license(name):
+    key = name.split()[0].lower()
+    return {"key": key, "name": name, "spdx_id": name.split()[0].upper(),
+            "url": f"https://api.github.com/licenses/{key}", "node_id": f"MDc6TGljZW5zZT{key}"}
+
+
+def rest_repo(repo):
+    """Repositório no formato de GET /repos/{owner}/{repo} (e dos itens da busca)"""
+    owner = repo["owner"]["login"]
+    api = f"https://api.github.com/repos/{owner}/{repo['name']}"
+    return {
+        "id": int(repo["id"][6:]),
+        "node_id": repo["id"],
+        "name": repo["name"],
+        "full_name": f"{owner}/{repo['name']}",
+        "private": False,
+        "owner": rest_owner(owner),
+        "html_url": f"https://github.com/{owner}/{repo['name']}",
+        "description": f"Descrição do repositório {repo['name']}",
+        "fork": False,
+        "url": api,
+        **{f"{name}_url": f"{api}/{name}" for name in REST_URL_FIELDS},
+        "git_url": f"git://github.com/{owner}/{repo['name']}.git",
+        "ssh_url": f"git@github.com:{owner}/{repo['name']}.git",
+        "clone_url": f"https://github.com/{owner}/{repo['name']}.git",
+        "svn_url": f"https://github.com/{owner}/{repo['name']}",
+        "homepage": None,
+        "has_issues": repo["hasIssuesEnabled"],
+        "has_wiki": repo["hasWikiEnabled"],
+        "archived": False,
+        "visibility": "public",
+        "stargazers_count": repo["stargazerCount"],
+        "watchers_count": repo["stargazerCount"],
+        "forks_count": repo["forkCount"],
+        "open_issues_count": repo["issues"]["totalCount"],
+        "pushed_at": repo["pushedAt"],
+        "created_at": repo["createdAt"],
+        "updated_at": repo["updatedAt"],
+        "language": (repo["primaryLanguage"] or {}).get("name"),
+        "license": rest_license(repo["licenseInfo"]["name"]) if repo["licenseInfo"] else None,
+        "size": repo["diskUsage"],
+        "default_branch": repo["defaultBranchRef"]["name"],
+        "topics": [node["topic"]["name"] for node in repo["repositoryTopics"]["nodes"]],
+    }
+
+
+def filter_by_stars(repos, query):
+    """Aplica o filtro stars:A..B ou stars:>N de uma query de busca"""
+    match = re.search(r"stars:(\d+)\.\.(\d+)", query)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        return [repo for repo in repos if low <= repo["stargazerCount"] <= high]
+    match = re.search(r"stars:>(\d+)", query)
+    if match:
+        minimum = int(match.group(1))
+        return [repo for repo in repos if repo["stargazerCount"] > minimum]
+    return repos
+
+
+class RateLimiter:
+    """Orçamento por token (header Authorization) numa janela fixa"""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key, cost=1):
+        """Devolve (permitido, restante, reset em epoch)"""
+        with self.lock:
+            now = time.time()
+            used, reset_at = self.buckets.get(key, (0, now + self.window))
+            if now >= reset_at:
+                used, reset_at = 0, now + self.window
+            allowed = used + cost <= self.limit
+            if allowed:
+                used += cost
+            self.buckets[key] = (used, reset_at)
+            return allowed, self.limit - used, reset_at
+
+
+class MockGitHub:
+    """Servidor HTTP em thread com os dados, a configuração e os contadores"""
+
+    def __init__(self, repos=5000, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit=5000, rate_window=3600, seed=0, null_count_rate=0.0, valid_tokens=None):
+        self.repos = make_dataset(repos, seed)
+        self.by_key = {(repo["owner"]["login"], repo["name"]): repo for repo in self.repos}
+        self.by_id = {repo["id"]: repo for repo in self.repos}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # Repositórios cujo fragmento de detalhes traz closedIssues nulo (como
+        # quando o GitHub não consegue calcular a contagem); consultas só de
+        # contagens devolvem o valor real
+        self.null_counts = {key for key in self.by_key
+                            if random.Random(f"{seed}-{key}").random() < null_count_rate}
+        self.rate_limiter = RateLimiter(rate_limit, rate_window)
+        # Com valid_tokens, qualquer outro token recebe 401 (token revogado/inválido)
+        self.valid_tokens = set(valid_tokens) if valid_tokens is not None else None
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "errors_injected": 0, "rate_limited": 0, "not_modified": 0, "unauthorized": 0}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def rename(self, owner, name, new_owner, new_name):
+        """Renomeia/transfere um repositório (o node ID continua o mesmo)"""
+        repo = self.by_key.pop((owner, name))
+        repo["owner"] = {"login": new_owner}
+        repo["name"] = new_name
+        self.by_key[(new_owner, new_name)] = repo
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def start(self, port=0):
+        """Inicia o servidor em segundo plano e devolve a URL base"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+        self.server.daemon_threads = True
+        self.server.mock = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    # --- GraphQL ---
+
+    def graphql(self, body):
+        query = body["query"]
+        variables = body.get("variables") or {}
+        data = {}
+        errors = []
+        if "type: ISSUE" in query:
+            for key, search_query in variables.items():
+                match = re.fullmatch(r"q(\d+)", key)
+                if match:
+                    data[f"w{match.group(1)}"] = {"issueCount": issue_count(search_query)}
+        elif "search(" in query:
+            data["search"] = self.search(query, variables)
+        elif "ids" in variables:
+            data["nodes"] = [self.by_id.get(node_id) for node_id in variables["ids"]]
+            errors.extend({"type": "NOT_FOUND", "path": ["nodes", idx],
+                           "message": f"Could not resolve to a node with the global id of '{node_id}'"}
+                          for idx, node_id in enumerate(variables["ids"]) if node_id not in self.by_id)
+        elif "owner" in variables and "name" in variables:
+            repo = self.by_key.get((variables["owner"], variables["name"]))
+            data["repository"] = activity(repo, variables) if repo and "nodes { createdAt" in query else repo
+            if repo is None:
+                errors.append({"type": "NOT_FOUND", "path": ["repository"],
+                               "message": f"Could not resolve to a Repository with the name "
+                                          f"'{variables['owner']}/{variables['name']}'."})
+        else:
+            for key, owner in variables.items():
+                match = re.fullmatch(r"o(\d+)", key)
+                if not match:
+                    continue
+                alias = f"r{match.group(1)}"
+                repo = self.by_key.get((owner, variables.get(f"n{match.group(1)}")))
+                data[alias] = repo
+                if repo is None:
+                    errors.append({"type": "NOT_FOUND", "path": [alias], "message": "Could not resolve"})
+        if self.null_counts and "forkCount" in query and "closedIssues" in query:
+            self.apply_null_counts(data, errors)
+        requested = requested_fields(query)
+        for path, repo in repo_nodes(data):
+            replace_node(data, path, {key: value for key, value in repo.items() if key in requested})
+        if "rateLimit" in query:
+            data["rateLimit"] = {"cost": 1, "remaining": 5000, "resetAt": iso(datetime.now(timezone.utc) + timedelta(hours=1))}
+        result = {"data": data}
+        if errors:
+            result["errors"] = errors
+        return result
+
+    def apply_null_counts(self, data, errors):
+        """Anula closedIssues dos repositórios em null_counts, com o erro parcial correspondente"""
+        for path, repo in repo_nodes(data):
+            if (repo["owner"]["login"], repo["name"]) not in self.null_counts:
+                continue
+            replace_node(data, path, dict(repo, closedIssues={"totalCount": None}))
+            errors.append({"type": "TIMEOUT", "path": path + ["closedIssues", "totalCount"],
+                           "message": "Timeout computing totalCount"})
+
+    def search(self, query, variables):
+        search_query = variables.get("q")
+        if search_query is None:
+            match = re.search(r'search\(query:\s*"([^"]*)"', query)
+            search_query = match.group(1) if match else ""
+        matches = filter_by_stars(self.repos, search_query)
+        if "repositoryCount" in query:
+            return {"repositoryCount": len(matches), "nodes": [light_node(repo) for repo in matches[:1]]}
+
+        first = variables.get("perPage") or 100
+        start = int(variables.get("cursor") or 0)
+        matches = matches[:SEARCH_RESULT_CAP]
+        page = matches[start:start + first]
+        # Os nós saem completos; graphql() deixa só os campos pedidos
+        return {
+            "pageInfo": {"endCursor": str(start + len(page)), "hasNextPage": start + first < len(matches)},
+            "edges": [{"node": repo} for repo in page],
+        }
+
+    # --- REST ---
+
+    def rest_search(self, params):
+        per_page = int(params.get("per_page", ["30"])[0])
+        page = int(params.get("page", ["1"])[0])
+        matches = filter_by_stars(self.repos, params.get("q", [""])[0])
+        if page * per_page > SEARCH_RESULT_CAP:
+            return 422, {"message": "Only the first 1000 search results are available"}
+        items = matches[(page - 1) * per_page: page * per_page]
+        return 200, {"total_count": len(matches), "incomplete_results": False,
+                     "items": [rest_repo(repo) for repo in items]}
+
+    def rest_repo(self, owner, name):
+        repo = self.by_key.get((owner, name))
+        if repo is None:
+            return 404, {"message": "Not Found"}
+        return 200, rest_repo(repo)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, payload, extra_headers=None):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def admit(self):
+        """Latência, token inválido, erro injetado e rate limit; devolve os headers de rate limit ou None se já respondeu"""
+        mock = self.server.mock
+        mock.count("requests")
+        delay = mock.latency + (mock.random.uniform(0, mock.jitter) if mock.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+        authorization = self.headers.get("Authorization", "")
+        if mock.valid_tokens is not None and authorization.split(" ")[-1] not in mock.valid_tokens:
+            mock.count("unauthorized")
+            self.respond(401, {"message": "Bad credentials"})
+            return None
+
+        allowed, remaining, reset_at = mock.rate_limiter.consume(authorization)
+        headers = {
+            "X-RateLimit-Limit": str(mock.rate_limiter.limit),
+            "X-RateLimit-Remaining": str(max(remaining, 0)),
+            "X-RateLimit-Reset": str(int(reset_at)),
+        }
+        if not allowed:
+            mock.count("rate_limited")
+            headers["Retry-After"] = str(max(1, int(reset_at - time.time())))
+            self.respond(403, {"message": "API rate limit exceeded"}, headers)
+            return None
+        if mock.error_rate and mock.random.random() < mock.error_rate:
+            mock.count("errors_injected")
+            self.respond(502, {"message": "Server Error"}, headers)
+            return None
+        return headers
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        headers = self.admit()
+        if headers is None:
+            return
+        if urlparse(self.path).path.rstrip("/") not in ("", "/graphql"):
+            self.respond(404, {"message": "Not Found"}, headers)
+            return
+        self.respond(200, self.server.mock.graphql(body), headers)
+
+    def do_GET(self):
+        headers = self.admit()
+        if headers is None:
+            return
+        mock = self.server.mock
+        url = urlparse(self.path)
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)", url.path)
+        if url.path == "/search/repositories":
+            status, payload = mock.rest_search(parse_qs(url.query))
+        elif match:
+            status, payload = mock.rest_repo(match.group(1), match.group(2))
+            if status == 200:
+                etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest() + '"'
+                headers["ETag"] = etag
+                if self.headers.get("If-None-Match") == etag:
+                    mock.count("not_modified")
+                    self.respond(304, None, headers)
+                    return
+        else:
+            status, payload = 404, {"message": "Not Found"}
+        self.respond(status, payload, headers)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--repos", type=int, default=5000, help="tamanho do conjunto de dados")
+    parser.add_argument("--latency", type=float, default=0.0, help="latência fixa por requisição (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latência extra aleatória máxima (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 502")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="requisições por janela e token")
+    parser.add_argument("--rate-window", type=float, default=3600, help="duração da janela (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--null-count-rate", type=float, default=0.0,
+                        help="fração de repositórios com contagem nula nos detalhes")
+    args = parser.parse_args()
+
+    mock = MockGitHub(args.repos, args.latency, args.jitter, args.error_rate,
+                      args.rate_limit, args.rate_window, args.seed, args.null_count_rate)
+    base_url = mock.start(args.port)
+    print(f"GraphQL: {base_url}/graphql  REST: {base_url}")
+    print(f"Use GITHUB_GRAPHQL_URL={base_url}/graphql GITHUB_API_URL={base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Saída colunar (Parquet) gravada diretamente pelo coletor
+
+Os registros são tipados (int64, timestamp, dicionário para categorias e
+listas para tópicos/linguagens) e gravados em row groups conforme chegam,
+sem passar pelo relatório .txt nem pelo CSV, com memória limitada a um row
+group. Como os demais arquivos do coletor, o Parquet só aparece no caminho
+final quando a coleta termina (gravação atômica). O instante da coleta
+fica nos metadados do schema (collected_at), e não na data do arquivo, que
+muda ao copiar ou baixar. Requer pyarrow.
+"""
+
+import os
+from datetime import datetime, timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional; só é exigido ao gravar/ler Parquet
+    pa = None
+    pq = None
+
+PARQUET_FILE = "repos_info.parquet"
+COLLECTED_AT_KEY = b"collected_at"
+
+# Nomes equivalentes às colunas do CSV usadas na análise
+CSV_COLUMN_NAMES = {
+    "name": "Repository",
+    "owner": "Owner",
+    "stars": "Stars",
+    "forks": "Forks",
+    "watchers": "Watchers",
+    "pushed_at": "Last Commit Date",
+    "primary_language": "Main Language",
+    "license": "License",
+    "size_kb": "Size (KB)",
+    "default_branch": "Main Branch",
+    "total_issues": "Issues",
+    "total_prs": "Pull Requests",
+    "created_at": "Created At",
+    "releases": "Releases",
+    "closed_issues": "Closed Issues",
+    "merged_prs": "Merged PRs",
+}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow é necessário para a saída Parquet (pip install pyarrow)")
+
+
+def repo_schema():
+    """Schema Arrow dos registros de repositório"""
+    require_pyarrow()
+    category = pa.dictionary(pa.int32(), pa.string())
+    timestamp = pa.timestamp("s", tz="UTC")
+    return pa.schema([
+        ("rank", pa.int32()),
+        ("owner", pa.string()),
+        ("name", pa.string()),
+        ("node_id", pa.string()),
+        ("stars", pa.int64()),
+        ("forks", pa.int64()),
+        ("watchers", pa.int64()),
+        ("created_at", timestamp),
+        ("updated_at", timestamp),
+        ("pushed_at", timestamp),
+        ("primary_language", category),
+        ("license", category),
+        ("default_branch", category),
+        ("size_kb", pa.int64()),
+        ("releases", pa.int64()),
+        ("open_issues", pa.int64()),
+        ("closed_issues", pa.int64()),
+        ("total_issues", pa.int64()),
+        ("merged_prs", pa.int64()),
+        ("total_prs", pa.int64()),
+        ("has_issues", pa.bool_()),
+        ("has_wiki", pa.bool_()),
+        ("has_projects", pa.bool_()),
+        ("topics", pa.list_(pa.string())),
+        ("languages", pa.list_(pa.struct([("name", pa.string()), ("bytes", pa.int64())]))),
+    ])
+
+
+def collection_timestamp():
+    """Instante atual em UTC no formato ISO 8601 do GitHub (ex.: 2024-01-31T12:00:00Z)"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def read_collected_at(path):
+    """Instante da coleta gravado nos metadados do Parquet (texto ISO), ou None"""
+    require_pyarrow()
+    metadata = pq.read_schema(path).metadata or {}
+    value = metadata.get(COLLECTED_AT_KEY)
+    return value.decode("utf-8") if value else None
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def total_count(repo, field):
+    connection = repo.get(field)
+    return connection.get("totalCount") if isinstance(connection, dict) else None
+
+
+def nested_name(repo, field):
+    obj = repo.get(field)
+    return obj.get("name") if isinstance(obj, dict) else None
+
+
+def repo_to_record(rank, owner, repo_name, repo):
+    """Converte o dicionário GraphQL de um repositório em um registro tipado"""
+    watcher_obj = repo.get("watcherCount")
+    languages = (repo.get("languages") or {}).get("edges") or []
+    topics = (repo.get("repositoryTopics") or {}).get("nodes") or []
+    return {
+        "rank": rank,
+        "owner": owner,
+        "name": repo_name,
+        "node_id": repo.get("id"),
+        "stars": repo.get("stargazerCount"),
+        "forks": repo.get("forkCount"),
+        "watchers": watcher_obj.get("totalCount") if watcher_obj else 0,
+        "created_at": parse_timestamp(repo.get("createdAt")),
+        "updated_at": parse_timestamp(repo.get("updatedAt")),
+        "pushed_at": parse_timestamp(repo.get("pushedAt")),
+        "primary_language": nested_name(repo, "primaryLanguage"),
+        "license": nested_name(repo, "licenseInfo"),
+        "default_branch": nested_name(repo, "defaultBranchRef"),
+        "size_kb": repo.get("diskUsage"),
+        "releases": total_count(repo, "releases"),
+        "open_issues": total_count(repo, "issues"),
+        "closed_issues": total_count(repo, "closedIssues"),
+        "total_issues": total_count(repo, "totalIssues"),
+        "merged_prs": total_count(repo, "pullRequests"),
+        "total_prs": total_count(repo, "totalPullRequests"),
+        "has_issues": repo.get("hasIssuesEnabled"),
+        "has_wiki": repo.get("hasWikiEnabled"),
+        "has_projects": repo.get("hasProjectsEnabled"),
+        "topics": [node["topic"]["name"] for node in topics],
+        "languages": [{"name": edge["node"]["name"], "bytes": edge["size"]} for edge in languages],
+    }
+
+
+class RepoParquetWriter:
+    """Grava registros em Parquet, um row group a cada row_group_size registros
+
+    Só um row group fica em memória: cada um completo é gravado em
+    path + ".tmp". O arquivo em path só aparece (ou é substituído) em
+    close(), com todos os row groups; até lá, leitores continuam vendo a
+    versão anterior. Uma coleta interrompida (abort) descarta o .tmp.
+    collected_at (padrão: a abertura do arquivo) vai para os metadados do schema.
+    """
+
+    def __init__(self, path=PARQUET_FILE, row_group_size=1000, compression="zstd", schema=None, collected_at=None):
+        require_pyarrow()
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.row_group_size = row_group_size
+        self.collected_at = collected_at or collection_timestamp()
+        schema = schema or repo_schema()
+        self.schema = schema.with_metadata({**(schema.metadata or {}),
+                                            COLLECTED_AT_KEY: self.collected_at.encode("utf-8")})
+        self.buffer = []
+        self.rows_written = 0
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema, compression=compression)
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        table = pa.Table.from_pylist(self.buffer, schema=self.schema)
+        self.writer.write_table(table)
+        self.rows_written += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def load_repos_dataframe(path=PARQUET_FILE):
+    """Lê o Parquet como DataFrame com os nomes de coluna do CSV"""
+    require_pyarrow()
+    return pq.read_table(path).to_pandas().rename(columns=CSV_COLUMN_NAMES)
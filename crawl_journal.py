@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Diário write-ahead (JSONL) do progresso da coleta
+
+Cada página de busca concluída e cada repositório com detalhes buscados vira
+uma linha gravada (com fsync) assim que termina. Uma execução com --resume
+lê o diário e continua do último ponto sem repetir requisições já concluídas.
+"""
+
+import json
+import os
+import threading
+
+from repo_record import RepoRecord
+
+JOURNAL_FILE = "crawl_journal.jsonl"
+
+
+class CrawlJournal:
+    """Diário de páginas de busca e repositórios concluídos"""
+
+    def __init__(self, path=JOURNAL_FILE, resume=False):
+        self.path = path
+        self.pages = []
+        self.repos = {}
+        self.lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self._load()
+        mode = "a" if resume else "w"
+        self.file = open(path, mode, encoding="utf-8")
+
+    def _load(self):
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última linha incompleta (queda durante a escrita)
+                    break
+                valid_bytes += len(line)
+                if record["type"] == "page":
+                    self.pages.append(record)
+                elif record["type"] == "repo":
+                    self.repos[(record["owner"], record["name"])] = RepoRecord.from_mapping(record["details"])
+
+        # Descarta o resto da linha incompleta para as próximas gravações
+        with open(self.path, "r+b") as f:
+            f.truncate(valid_bytes)
+
+    def _append(self, record):
+        with self.lock:
+            # Registros compactos (RepoRecord) são gravados como o dicionário original
+            self.file.write(json.dumps(record, ensure_ascii=False, default=dict) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def record_page(self, cursor, repos, end_cursor, has_next, search=None):
+        """Registra uma página de busca concluída (search identifica a query)"""
+        record = {
+            "type": "page",
+            "search": search,
+            "cursor": cursor,
+            "end_cursor": end_cursor,
+            "has_next": has_next,
+            "repos": repos,
+        }
+        self._append(record)
+        self.pages.append(record)
+
+    def record_repo(self, owner, repo_name, details):
+        """Registra os detalhes de um repositório já buscado"""
+        self._append({"type": "repo", "owner": owner, "name": repo_name, "details": details})
+        self.repos[(owner, repo_name)] = details
+
+    def pages_for(self, search=None):
+        """Páginas já registradas de uma query de busca"""
+        return [page for page in self.pages if page.get("search") == search]
+
+    def search_state(self, search=None):
+        """Devolve (repositórios já coletados, próximo cursor, há mais páginas)"""
+        pages = self.pages_for(search)
+        all_repos = []
+        for page in pages:
+            all_repos.extend(page["repos"])
+        if not pages:
+            return all_repos, None, True
+        last = pages[-1]
+        return all_repos, last["end_cursor"], last["has_next"]
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas derivadas das RQs, calculadas de forma vetorizada
+
+compute_features converte as colunas brutas (CSV ou Parquet) em tipos
+(datas sem timezone, contagens numéricas) e calcula todas as métricas
+derivadas em uma passada, relativas a uma data de referência. Sem data
+explícita, a referência é a data da coleta gravada junto com os dados
+(coluna 'Collected At' do CSV ou metadados do Parquet, ver collection_date),
+e não a data do arquivo, que muda ao copiar ou baixar; a data explícita
+serve para arquivos sem esse registro e para reproduzir análises antigas:
+
+- RQ01: Repo_Age_Days (idade desde a criação)
+- RQ02: Merged_PRs_Ratio (PRs aceitos / total de PRs)
+- RQ04: Days_Since_Last_Commit
+- RQ06: Closed_Issues_Ratio (issues fechadas / total de issues)
+
+load_features guarda o resultado em cache (Arrow IPC) por arquivo de
+origem e data de referência, para que gráficos e estatísticas não
+recalculem nada.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from columnar_writer import PARQUET_FILE, load_repos_dataframe, read_collected_at
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # sem pyarrow as métricas são recalculadas a cada leitura
+    feather = None
+
+CSV_FILE = 'repos_info_with_issues_prs.csv'
+COLLECTED_AT_COLUMN = 'Collected At'
+FEATURE_CACHE_DIR = '.features_cache'
+FEATURES_VERSION = 1  # incrementar quando compute_features mudar
+
+DATE_COLUMNS = ['Created At', 'Last Commit Date']
+COUNT_COLUMNS = [
+    'Stars', 'Forks', 'Watchers', 'Size (KB)', 'Releases',
+    'Issues', 'Closed Issues', 'Pull Requests', 'Merged PRs',
+]
+FEATURE_COLUMNS = ['Repo_Age_Days', 'Days_Since_Last_Commit', 'Closed_Issues_Ratio', 'Merged_PRs_Ratio']
+
+
+def parse_reference_date(value):
+    """Data de referência a partir de 'AAAA-MM-DD' (uso em argparse)"""
+    return datetime.fromisoformat(value)
+
+
+def utc_naive(moment):
+    """Instante em UTC sem timezone, como as colunas de data de compute_features"""
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def collection_date(path):
+    """Data da coleta gravada no arquivo pelo coletor, em UTC, ou None se não houver
+
+    No Parquet ela fica nos metadados do schema; no CSV, na coluna
+    'Collected At' (igual em todas as linhas, lida só da primeira).
+    """
+    if path.endswith('.parquet'):
+        value = read_collected_at(path)
+    else:
+        first_row = pd.read_csv(path, usecols=lambda column: column == COLLECTED_AT_COLUMN, nrows=1)
+        value = first_row[COLLECTED_AT_COLUMN].iloc[0] if len(first_row.columns) and len(first_row) else None
+    moment = pd.to_datetime(value, errors='coerce', utc=True) if value is not None else pd.NaT
+    if pd.isna(moment):
+        return None
+    return utc_naive(moment.to_pydatetime())
+
+
+def resolve_reference_date(path, reference_date=None):
+    """reference_date, se dada; senão a data da coleta de path
+
+    Arquivos sem a data da coleta (gerados por versões antigas do coletor)
+    exigem a data explícita: levanta ValueError em vez de adivinhar.
+    """
+    if reference_date is not None:
+        return reference_date
+    collected = collection_date(path)
+    if collected is None:
+        raise ValueError(f"{path} não registra a data da coleta; informe a data de referência (--reference-date)")
+    return collected
+
+
+def ratio(numerator, denominator):
+    """numerator / denominator, com NaN onde o denominador é zero ou ausente"""
+    numerator = numerator.to_numpy(dtype=float)
+    denominator = denominator.to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def compute_features(df, reference_date=None):
+    """Tipa as colunas brutas e acrescenta FEATURE_COLUMNS ao DataFrame
+
+    Sem reference_date, as métricas em dias são relativas ao momento atual.
+    Colunas ausentes (ex.: CSVs antigos sem 'Created At') viram NaN/NaT em
+    vez de erro. O DataFrame é alterado no lugar e devolvido.
+    """
+    if reference_date is None:
+        reference_date = utc_naive(datetime.now(timezone.utc))
+    for column in DATE_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], errors='coerce', utc=True).dt.tz_localize(None)
+        else:
+            df[column] = pd.NaT
+    for column in COUNT_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        else:
+            df[column] = np.nan
+
+    reference = pd.Timestamp(reference_date)
+    df['Repo_Age_Days'] = (reference - df['Created At']).dt.days
+    df['Days_Since_Last_Commit'] = (reference - df['Last Commit Date']).dt.days
+    df['Closed_Issues_Ratio'] = ratio(df['Closed Issues'], df['Issues'])
+    df['Merged_PRs_Ratio'] = ratio(df['Merged PRs'], df['Pull Requests'])
+    return df
+
+
+def source_path(csv_path=CSV_FILE, parquet_path=PARQUET_FILE):
+    """O Parquet do coletor, se existir; senão o CSV"""
+    if parquet_path and os.path.exists(parquet_path):
+        return parquet_path
+    return csv_path
+
+
+def read_source(path):
+    if path.endswith('.parquet'):
+        return load_repos_dataframe(path)
+    return pd.read_csv(path)
+
+
+def cache_path(path, reference_date, cache_dir=FEATURE_CACHE_DIR):
+    """Arquivo de cache para o estado atual de path (tamanho e mtime) e a data de referência"""
+    stat = os.stat(path)
+    source_hash = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    state = f"{FEATURES_VERSION}|{stat.st_size}|{stat.st_mtime_ns}|{reference_date.isoformat()}"
+    state_hash = hashlib.sha256(state.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{source_hash}-{state_hash}.arrow")
+
+
+def load_features(csv_path=CSV_FILE, parquet_path=PARQUET_FILE, reference_date=None,
+                  cache_dir=FEATURE_CACHE_DIR):
+    """DataFrame com as colunas tipadas e as métricas derivadas, usando o cache se válido
+
+    Sem reference_date, a referência é a data da coleta gravada no arquivo
+    lido (ver resolve_reference_date). Um novo cache de um arquivo de origem
+    substitui os anteriores dele.
+    """
+    path = source_path(csv_path, parquet_path)
+    reference_date = resolve_reference_date(path, reference_date)
+    if feather is None:
+        return compute_features(read_source(path), reference_date)
+
+    cached = cache_path(path, reference_date, cache_dir)
+    if os.path.exists(cached):
+        return feather.read_feather(cached, memory_map=True)
+
+    df = compute_features(read_source(path), reference_date)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    source_prefix = os.path.basename(cached).split('-')[0] + '-'
+    for name in os.listdir(cache_dir):
+        if name.startswith(source_prefix):
+            os.remove(os.path.join(cache_dir, name))
+    tmp_path = cached + '.tmp'
+    feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+    os.replace(tmp_path, cached)
+    return df
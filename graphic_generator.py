@@ -1,96 +1,275 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')  # renderização sem interface gráfica (também nos processos filhos)
+import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
-import os
-from datetime import datetime
 
-# Criar pasta para gráficos
-os.makedirs('graphics', exist_ok=True)
+from columnar_writer import PARQUET_FILE
+from features import CSV_FILE, load_features, parse_reference_date
+from repo_stats import RepoStats, print_summary as print_stats_summary
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # sem pyarrow o DataFrame é compartilhado via pickle
+    pa = None
+    feather = None
+
+OUTPUT_DIR = 'graphics'
+MANIFEST_FILE = 'manifest.json'  # hashes das figuras, dentro de OUTPUT_DIR
+
+# Estilo aplicado a todas as figuras (entra no hash de cada uma)
+STYLE = {'style': 'whitegrid', 'figsize': (10, 6)}
+
+# Colunas usadas pelos gráficos (só elas são compartilhadas com os processos)
+PLOT_COLUMNS = ['Stars', 'Forks', 'Watchers', 'Issues', 'Pull Requests', 'Main Language', 'Days_Since_Last_Commit']
+NUMERIC_COLUMNS = ['Stars', 'Forks', 'Watchers', 'Issues', 'Pull Requests', 'Days_Since_Last_Commit']
+
 
 # ===============================
-# Leitura do CSV
+# Leitura dos dados (Parquet do coletor, se existir; senão o CSV)
 # ===============================
-df = pd.read_csv('repos_info_with_issues_prs.csv')
+def load_dataframe(csv_path=CSV_FILE, parquet_path=PARQUET_FILE, reference_date=None):
+    """Lê os dados com as métricas derivadas (features.load_features, com cache)"""
+    return load_features(csv_path, parquet_path, reference_date)
+
+
+def share_dataframe(df, directory):
+    """Grava as colunas dos gráficos em um arquivo lido pelos processos
+
+    Com pyarrow é um arquivo Arrow IPC (feather) sem compressão, aberto com
+    memory map pelos processos; sem pyarrow, um pickle.
+    """
+    shared = df[PLOT_COLUMNS].reset_index(drop=True)
+    if feather is not None:
+        path = os.path.join(directory, 'repos.arrow')
+        feather.write_feather(shared, path, compression='uncompressed')
+    else:
+        path = os.path.join(directory, 'repos.pkl')
+        with open(path, 'wb') as f:
+            pickle.dump(shared, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
 
-# Converter data de último commit e remover timezone
-df['Last Commit Date'] = pd.to_datetime(df['Last Commit Date'], errors='coerce').dt.tz_localize(None)
+def load_shared_dataframe(path):
+    if path.endswith('.arrow'):
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+    with open(path, 'rb') as f:
+        return pickle.load(f)
 
-# Calcular dias desde último commit
-today = datetime(2025, 8, 27)
-df['Days_Since_Last_Commit'] = (today - df['Last Commit Date']).dt.days
 
 # ===============================
 # Visualizações
 # ===============================
-sns.set(style="whitegrid")
-plt.rcParams['figure.figsize'] = (10,6)
-
-# RQ01 - Dias desde o último commit (Histograma)
-plt.figure()
-sns.histplot(df['Days_Since_Last_Commit'], bins=30, color='skyblue')
-plt.title('RQ01 - Dias desde o Último Commit (Histograma)')
-plt.xlabel('Dias desde último commit')
-plt.ylabel('Quantidade de Repositórios')
-plt.savefig('graphics/RQ01_Dias_Ultimo_Commit.png')
-plt.show()
-
-# RQ02 - Pull Requests (Violino)
-plt.figure()
-sns.violinplot(y=df['Pull Requests'], color='lightgreen')
-plt.title('RQ02 - Distribuição de Pull Requests (Violino)')
-plt.ylabel('Número de Pull Requests')
-plt.savefig('graphics/RQ02_Pull_Requests.png')
-plt.show()
-
-# RQ03 - Forks (Boxplot)
-plt.figure()
-sns.boxplot(x=df['Forks'], color='lightcoral')
-plt.title('RQ03 - Total de Forks por Repositório (Boxplot)')
-plt.xlabel('Total de Forks')
-plt.savefig('graphics/RQ03_Forks.png')
-plt.show()
-
-# RQ04 - Dias desde última atualização (Histograma)
-plt.figure()
-sns.histplot(df['Days_Since_Last_Commit'], bins=30, color='orchid')
-plt.title('RQ04 - Dias desde a Última Atualização (Histograma)')
-plt.xlabel('Dias desde última atualização')
-plt.ylabel('Quantidade de Repositórios')
-plt.savefig('graphics/RQ04_Dias_Ultima_Atualizacao.png')
-plt.show()
-
-# RQ05 - Linguagens mais populares (Barplot)
-language_counts = df['Main Language'].value_counts().head(10)
-plt.figure()
-sns.barplot(x=language_counts.values, y=language_counts.index, palette="viridis")
-plt.title('RQ05 - Top 10 Linguagens em Repositórios Populares (Barplot)')
-plt.xlabel('Quantidade de Repositórios')
-plt.ylabel('Linguagem')
-plt.savefig('graphics/RQ05_Linguagens_Populares.png')
-plt.show()
-
-# RQ06 - Issues (Violino)
-plt.figure()
-sns.violinplot(y=df['Issues'], color='gold')
-plt.title('RQ06 - Distribuição de Issues Totais (Violino)')
-plt.ylabel('Número de Issues')
-plt.savefig('graphics/RQ06_Issues.png')
-plt.show()
-
-# Heatmap de correlação (apenas numéricos)
-numeric_cols = ['Stars', 'Forks', 'Watchers', 'Issues', 'Pull Requests', 'Days_Since_Last_Commit']
-corr = df[numeric_cols].corr()
-
-plt.figure(figsize=(8,6))
-sns.heatmap(corr, annot=True, fmt=".2f", cmap='coolwarm')
-plt.title('Heatmap - Correlação entre Métricas dos Repositórios')
-plt.savefig('graphics/Heatmap_Correlacao.png')
-plt.show()
-
-print("===== Estatísticas Resumidas =====")
-print("Dias desde último commit (mediana):", df['Days_Since_Last_Commit'].median())
-print("Pull Requests (mediana):", df['Pull Requests'].median())
-print("Forks (mediana):", df['Forks'].median())
-print("Issues (mediana):", df['Issues'].median())
-print("Top 10 linguagens:")
-print(language_counts)
+def plot_rq01(df):
+    # RQ01 - Dias desde o último commit (Histograma)
+    plt.figure()
+    sns.histplot(df['Days_Since_Last_Commit'], bins=30, color='skyblue')
+    plt.title('RQ01 - Dias desde o Último Commit (Histograma)')
+    plt.xlabel('Dias desde último commit')
+    plt.ylabel('Quantidade de Repositórios')
+
+
+def plot_rq02(df):
+    # RQ02 - Pull Requests (Violino)
+    plt.figure()
+    sns.violinplot(y=df['Pull Requests'], color='lightgreen')
+    plt.title('RQ02 - Distribuição de Pull Requests (Violino)')
+    plt.ylabel('Número de Pull Requests')
+
+
+def plot_rq03(df):
+    # RQ03 - Forks (Boxplot)
+    plt.figure()
+    sns.boxplot(x=df['Forks'], color='lightcoral')
+    plt.title('RQ03 - Total de Forks por Repositório (Boxplot)')
+    plt.xlabel('Total de Forks')
+
+
+def plot_rq04(df):
+    # RQ04 - Dias desde última atualização (Histograma)
+    plt.figure()
+    sns.histplot(df['Days_Since_Last_Commit'], bins=30, color='orchid')
+    plt.title('RQ04 - Dias desde a Última Atualização (Histograma)')
+    plt.xlabel('Dias desde última atualização')
+    plt.ylabel('Quantidade de Repositórios')
+
+
+def plot_rq05(df):
+    # RQ05 - Linguagens mais populares (Barplot)
+    language_counts = df['Main Language'].value_counts().head(10)
+    plt.figure()
+    sns.barplot(x=language_counts.values, y=language_counts.index, palette="viridis")
+    plt.title('RQ05 - Top 10 Linguagens em Repositórios Populares (Barplot)')
+    plt.xlabel('Quantidade de Repositórios')
+    plt.ylabel('Linguagem')
+
+
+def plot_rq06(df):
+    # RQ06 - Issues (Violino)
+    plt.figure()
+    sns.violinplot(y=df['Issues'], color='gold')
+    plt.title('RQ06 - Distribuição de Issues Totais (Violino)')
+    plt.ylabel('Número de Issues')
+
+
+def plot_heatmap(df):
+    # Heatmap de correlação (apenas numéricos)
+    corr = df[NUMERIC_COLUMNS].corr()
+    plt.figure(figsize=(8,6))
+    sns.heatmap(corr, annot=True, fmt=".2f", cmap='coolwarm')
+    plt.title('Heatmap - Correlação entre Métricas dos Repositórios')
+
+
+# Nome da figura -> (função que desenha, arquivo gerado, colunas de entrada)
+FIGURES = {
+    'RQ01': (plot_rq01, 'RQ01_Dias_Ultimo_Commit.png', ['Days_Since_Last_Commit']),
+    'RQ02': (plot_rq02, 'RQ02_Pull_Requests.png', ['Pull Requests']),
+    'RQ03': (plot_rq03, 'RQ03_Forks.png', ['Forks']),
+    'RQ04': (plot_rq04, 'RQ04_Dias_Ultima_Atualizacao.png', ['Days_Since_Last_Commit']),
+    'RQ05': (plot_rq05, 'RQ05_Linguagens_Populares.png', ['Main Language']),
+    'RQ06': (plot_rq06, 'RQ06_Issues.png', ['Issues']),
+    'Heatmap': (plot_heatmap, 'Heatmap_Correlacao.png', NUMERIC_COLUMNS),
+}
+
+
+def setup_style():
+    sns.set(style=STYLE['style'])
+    plt.rcParams['figure.figsize'] = STYLE['figsize']
+
+
+def figure_hash(df, name):
+    """Hash das colunas de entrada e dos parâmetros de uma figura
+
+    Todas as figuras são distribuições ou contagens, que não dependem da
+    ordem das linhas; as colunas são ordenadas antes do hash para que uma
+    mudança só no ranking não force a renderização.
+    """
+    plot, filename, columns = FIGURES[name]
+    data = df[columns].sort_values(columns).reset_index(drop=True)
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    digest.update(inspect.getsource(plot).encode('utf-8'))
+    digest.update(f"{filename}|{STYLE}|{matplotlib.__version__}|{sns.__version__}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir=OUTPUT_DIR):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, output_dir=OUTPUT_DIR):
+    """Grava o manifesto de forma atômica (arquivo temporário + os.replace)"""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def render_figure(name, shared_path, output_dir=OUTPUT_DIR):
+    """Desenha e salva uma figura a partir do DataFrame compartilhado"""
+    setup_style()
+    df = load_shared_dataframe(shared_path)
+    plot, filename, _ = FIGURES[name]
+    plot(df)
+    path = os.path.join(output_dir, filename)
+    plt.savefig(path)
+    plt.close('all')
+    return path
+
+
+def render_figures(df, names=None, workers=None, output_dir=OUTPUT_DIR, force=False):
+    """Renderiza as figuras escolhidas em paralelo (um processo por figura)
+
+    O DataFrame é preparado uma vez e compartilhado somente leitura; o tempo
+    total fica limitado pela figura mais lenta. Com workers=1 tudo roda no
+    processo atual. Figuras cujo hash (figure_hash) é igual ao do manifesto
+    e cujo arquivo ainda existe são puladas, a menos que force=True.
+    Devolve (arquivos renderizados, figuras puladas).
+    """
+    names = list(FIGURES) if names is None else names
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = load_manifest(output_dir)
+    hashes = {name: figure_hash(df, name) for name in names}
+    stale = [
+        name for name in names
+        if force
+        or manifest.get(name, {}).get('hash') != hashes[name]
+        or not os.path.exists(os.path.join(output_dir, FIGURES[name][1]))
+    ]
+    skipped = [name for name in names if name not in stale]
+    if not stale:
+        return [], skipped
+
+    workers = workers or min(len(stale), os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        shared_path = share_dataframe(df, tmp)
+        if workers <= 1:
+            paths = [render_figure(name, shared_path, output_dir) for name in stale]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(render_figure, name, shared_path, output_dir) for name in stale]
+                paths = [future.result() for future in futures]
+
+    for name in stale:
+        manifest[name] = {'file': FIGURES[name][1], 'hash': hashes[name]}
+    save_manifest(manifest, output_dir)
+    return paths, skipped
+
+
+def print_summary(df):
+    """Resumo das RQs pelo mesmo motor de repo_stats (t-digest, linguagens e correlação)"""
+    stats = RepoStats()
+    stats.update(df)
+    print_stats_summary(stats)
+    return stats
+
+
+def parse_figures(value):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in FIGURES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"figuras desconhecidas: {', '.join(unknown)} (opções: {', '.join(FIGURES)})")
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os gráficos das questões de pesquisa")
+    parser.add_argument("--figures", type=parse_figures, default=None,
+                        help=f"figuras separadas por vírgula (padrão: todas; opções: {', '.join(FIGURES)})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos de renderização (padrão: um por figura, até o número de CPUs)")
+    parser.add_argument("--csv", default=CSV_FILE, help="CSV usado quando não há Parquet")
+    parser.add_argument("--parquet", default=PARQUET_FILE, help="Parquet gerado pelo coletor")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="pasta dos gráficos")
+    parser.add_argument("--reference-date", type=parse_reference_date, default=None,
+                        help="data de referência AAAA-MM-DD para as métricas em dias (padrão: data da coleta gravada no arquivo)")
+    parser.add_argument("--force", action="store_true",
+                        help="renderiza mesmo as figuras cujos dados não mudaram")
+    args = parser.parse_args()
+
+    df = load_dataframe(args.csv, args.parquet, args.reference_date)
+    paths, skipped = render_figures(df, args.figures, args.workers, args.output_dir, force=args.force)
+    for path in paths:
+        print(f"Gráfico salvo: {path}")
+    if skipped:
+        print(f"Sem mudanças (não renderizados): {', '.join(skipped)}")
+
+    print_summary(df)
@@ -1,135 +1,373 @@
 import requests
+import csv
+import io
 import os
+import re
 import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from columnar_writer import RepoParquetWriter, collection_timestamp, repo_to_record, total_count
+
+from crawl_journal import JOURNAL_FILE, CrawlJournal
+from instrumentation import add_metrics_arguments, finish_metrics, metrics, start_metrics
+from incremental import SNAPSHOT_FILE, load_snapshot, plan_refresh, save_snapshot
+
+from pipeline import run_pipeline
+from query_planner import COUNT_FIELD_NAMES, FIELD_SELECTIONS, add_plan_arguments, full_plan, has_all_fields, plan_from_args
+from repo_record import RepoRecord
+from response_cache import CachedResponse, ResponseCache, ttl_for_query
+from search_sharding import SEARCH_RESULT_CAP, merge_shards, plan_star_shards, star_range_query
+from snapshot_store import SnapshotStore
+from token_pool import NoTokensAvailableError, TokenPool
 
 load_dotenv()
 
 token = os.getenv("TOKEN")
 
-def handle_rate_limit(response, attempt, max_retries):
-    """Verifica se há rate limit e calcula tempo de espera"""
-    if response.status_code == 403 and "rate limit" in response.text.lower():
+# Pode apontar para um servidor GraphQL local (ex.: stub para testes)
+GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+
+# Tokens de TOKENS/TOKEN, cada um com seu orçamento de rate limit
+token_pool = TokenPool.from_env(points_per_minute=2000)
+
+# Cache persistente de respostas (ResponseCache); None desativa
+response_cache = None
+
+# Campos de detalhe pedidos ao GraphQL (query_planner.QueryPlan); o padrão é o fragmento completo
+details_plan = full_plan()
+
+# Busca padrão: todos os repositórios públicos com mais de uma estrela
+TOP_REPOS_SEARCH = "stars:>1 sort:stars-desc is:public"
+
+# Plano e fragmento completos de detalhes (ver query_planner); as queries usam details_plan.fragment,
+# e o plano completo para repositórios sem detalhes anteriores a completar
+FULL_DETAILS_PLAN = full_plan()
+REPO_DETAILS_FIELDS = FULL_DETAILS_PLAN.fragment
+
+# Contagens de issues/PRs: alias -> seleção (as mesmas do fragmento de detalhes).
+# Um totalCount nulo indica falha do GitHub ao calcular a contagem; zero é válido
+COUNT_FIELDS = {field: FIELD_SELECTIONS[field] for field in COUNT_FIELD_NAMES}
+
+# Máximo de IDs aceitos por nodes(ids:) em uma requisição
+NODES_CHUNK_SIZE = 100
+
+# Limites usados para adaptar o tamanho do lote ao custo da query
+MIN_BATCH_SIZE = 1
+MAX_BATCH_SIZE = 100
+TARGET_BATCH_COST = 10  # pontos de rate limit por requisição em lote
+TARGET_BATCH_BYTES = 2 * 1024 * 1024  # tamanho máximo desejado da resposta
+
+def handle_rate_limit(response, attempt, max_retries, scheduler):
+    """Verifica se há rate limit e agenda a espera indicada pelo GitHub (Retry-After/Reset)"""
+    if response.status_code in (403, 429) and "rate limit" in response.text.lower():
         if attempt < max_retries - 1:
 
-            wait_time = 2 ** attempt
-            print(f"Rate limit atingido. Aguardando {wait_time} segundos...")
-            time.sleep(wait_time)
+            wait_time = scheduler.wait_time_after_limit(response)
+            print(f"Rate limit atingido. Aguardando {wait_time:.0f} segundos...")
+            # A espera vale para todas as requisições deste token, não só para esta;
+            # com outros tokens no pool, a próxima tentativa usa o de maior folga
+            scheduler.block_for(wait_time)
             return True  
     return False
 
-def make_graphql_request(url, headers, json_data, max_retries=3):
-    """Faz requisição GraphQL com retry automático e tratamento de rate limit"""
+def decode_graphql_response(response):
+    """Decodifica o corpo uma única vez e devolve (dados, rateLimit)
+    
+    Corpo que não é um objeto JSON devolve (None, None); rateLimit é None se
+    a resposta não o trouxer. A resposta não é alterada.
+    """
+    try:
+        data = response.json()
+    except ValueError:
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    return data, (data.get("data") or {}).get("rateLimit")
+
+def make_graphql_request(url, headers, json_data, max_retries=3, session=None):
+    """Faz requisição GraphQL com retry automático e tratamento de rate limit
+    
+    Com session (requests.Session), as conexões keep-alive do pool são reutilizadas.
+    Cada tentativa usa o token do token_pool com mais folga (substituindo o
+    Authorization de headers) e é espaçada conforme o orçamento desse token.
+    O corpo de uma resposta 200 é decodificado uma única vez (ver
+    decode_graphql_response), e o rateLimit dele vai para o escalonador.
+    Devolve (dados decodificados, resposta); os chamadores usam os dados
+    devolvidos em vez de chamar response.json() de novo. Com response_cache
+    ativo, respostas ainda válidas (do mesmo endpoint url) são servidas do disco.
+    """
+    cache_key = None
+    if response_cache is not None:
+        cache_key = response_cache.make_key(json_data["query"], json_data.get("variables"), endpoint=url)
+        cached = response_cache.get(cache_key)
+        if cached is not None and cached[2]:
+            metrics.increment("github_cache_hits_total", api="graphql")
+            response = CachedResponse(cached[0])
+            return decode_graphql_response(response)[0], response
+    
+    http = session or requests
     for attempt in range(max_retries):
         try:
-            response = requests.post(url, headers=headers, json=json_data)
+            with metrics.stage("rate_limit_wait"):
+                request_token = token_pool.acquire(token_pool.last_cost())
+            request_headers = headers
+            if request_token is not None:
+                request_headers = dict(headers, Authorization=f"Bearer {request_token}")
             
+            start = time.perf_counter()
+            with metrics.stage("graphql_request"):
+                response = http.post(url, headers=request_headers, json=json_data)
+            metrics.record_response("graphql", response, time.perf_counter() - start, attempt)
+            data, rate_limit = decode_graphql_response(response) if response.status_code == 200 else (None, None)
+            token_pool.update_from_response(request_token, response, rate_limit)
+            metrics.record_budget(token_pool.labels[request_token],
+                                  token_pool.scheduler_for(request_token).budget())
+            
+            # Token revogado: tenta novamente com outro token do pool
+            if response.status_code == 401 and request_token is not None:
+                metrics.record_retry("graphql", "unauthorized", attempt=attempt)
+                continue
 
-            if handle_rate_limit(response, attempt, max_retries):
+            if handle_rate_limit(response, attempt, max_retries, token_pool.scheduler_for(request_token)):
+                metrics.record_retry("graphql", "rate_limit", attempt=attempt)
                 continue
             
             if response.status_code == 200:
-                return response
+                if data is None:
+                    raise Exception("Resposta GraphQL sem um objeto JSON")
+                # Respostas com erros (mesmo parciais) não são reaproveitadas
+                if cache_key is not None and "errors" not in data:
+                    response_cache.put(cache_key, response.content, ttl_for_query(json_data["query"]))
+                return data, response
             
 
             if attempt < max_retries - 1:
                 wait_time = 2 ** attempt
+                metrics.record_retry("graphql", "http_error", attempt=attempt, status=response.status_code)
                 print(f"Erro HTTP {response.status_code}, tentando novamente em {wait_time} segundos...")
-                time.sleep(wait_time)
+                with metrics.stage("retry_backoff"):
+                    time.sleep(wait_time)
                 continue
             else:
                 raise Exception(f"Erro HTTP persistente: {response.status_code}")
                 
+        except NoTokensAvailableError:
+            raise
         except Exception as e:
             if attempt < max_retries - 1:
                 wait_time = 2 ** attempt
+                metrics.record_retry("graphql", "exception", attempt=attempt, error=str(e))
                 print(f"⚠️  Exceção: {e}, tentando novamente em {wait_time} segundos...")
-                time.sleep(wait_time)
+                with metrics.stage("retry_backoff"):
+                    time.sleep(wait_time)
                 continue
             else:
                 raise e
     
     raise Exception(f"Falha após {max_retries} tentativas")
 
-def get_top_starred_repos_graphql(max_repos=1000):
+def get_top_starred_repos_graphql(max_repos=1000, with_details=False, per_page=100, journal=None,
+                                  search_query=TOP_REPOS_SEARCH, label=""):
+    """Busca os repositórios mais estrelados via search paginado
+    
+    Junta as páginas de iter_search_pages (mesmos parâmetros) em uma lista.
+    """
+    all_repos = []
+    for page_repos in iter_search_pages(max_repos, with_details, per_page, journal, search_query, label):
+        all_repos.extend(page_repos)
+    
+    print(f"{label}Total de repositórios coletados: {len(all_repos)}")
+    return all_repos
+
 
+def iter_search_pages(max_repos=1000, with_details=False, per_page=100, journal=None,
+                      search_query=TOP_REPOS_SEARCH, label=""):
+    """Gera os nós de cada página do search paginado, até max_repos no total
     
-    url = "https://api.github.com/graphql"
+    Com with_details=True, cada nó da busca já traz o fragmento completo de
+    detalhes (details_plan), dispensando a query individual por repositório.
+    Com journal (CrawlJournal), cada página concluída é registrada e a busca
+    continua do último cursor registrado. Uma página que falha interrompe a
+    busca com exceção em vez de devolver uma lista truncada.
+    search_query permite restringir a busca (ex.: uma faixa de estrelas);
+    label prefixa as mensagens de progresso.
+    """
+    
+    url = GRAPHQL_URL
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
     }
     
     cursor = None
-    per_page = 100
-    all_repos = []
+    collected = 0
+    has_next = True
+    page_count = 0
+    
+    if journal is not None and journal.pages_for(search_query):
+        journaled_repos, cursor, has_next = journal.search_state(search_query)
+        page_count = len(journal.pages_for(search_query))
+        print(f"{label}Retomando a busca do diário: {len(journaled_repos)} repositórios em {page_count} páginas")
+        collected = min(len(journaled_repos), max_repos)
+        yield [RepoRecord.from_mapping(repo) for repo in journaled_repos[:max_repos]]
+    
+    # pushedAt/updatedAt permitem comparar com o snapshot no modo incremental;
+    # stargazerCount ordena a mescla da busca fatiada; id permite o --refresh
+    node_fields = details_plan.fragment if with_details else """
+                  id
+                  stargazerCount
+                  pushedAt
+                  updatedAt"""
     
     # Query com paginação para buscar múltiplas páginas
     query = """
-    query($cursor: String, $perPage: Int!) {
-          search(query: "stars:>1 sort:stars-desc is:public", type: REPOSITORY, first: $perPage, after: $cursor) {
+    query($q: String!, $cursor: String, $perPage: Int!) {
+          search(query: $q, type: REPOSITORY, first: $perPage, after: $cursor) {
             pageInfo { endCursor hasNextPage }
             edges {
               node {
                 ... on Repository {
                   name
-                  owner { login }
+                  owner { login }""" + node_fields + """
                 }
               }
             }
           }
+          rateLimit { cost remaining resetAt }
         }
         
     """
-    page_count = 0
     
-    while len(all_repos) < max_repos:
+    while has_next and collected < max_repos:
         page_count += 1
-        print(f"Buscando página {page_count}... (repositórios coletados: {len(all_repos)})")
+        print(f"{label}Buscando página {page_count}... (repositórios coletados: {collected})")
         
-        variables = {"cursor": cursor, "perPage": per_page}
+        variables = {"q": search_query, "cursor": cursor, "perPage": per_page}
         json_data = {"query": query, "variables": variables}
         
         try:
-            response = make_graphql_request(url, headers, json_data)
-            data = response.json()
+            with metrics.stage("search_page"):
+                data, _ = make_graphql_request(url, headers, json_data)
             
             if "errors" in data:
                 print("ERROS encontrados:")
                 for error in data["errors"]:
                     print(f"- {error}")
-                    break
-                
-                search_data = data["data"]["search"]
-                page_info = search_data["pageInfo"]
-                edges = search_data["edges"]
-                
-                # Extrair os repositórios desta página
-                page_repos = [edge["node"] for edge in edges]
-                all_repos.extend(page_repos)
-                
-                print(f"Página {page_count}: {len(page_repos)} repositórios encontrados")
-                
-                if not page_info["hasNextPage"]:
-                    print("Não há mais páginas disponíveis")
-                    break
-                
-                cursor = page_info["endCursor"]
-                
-                if len(all_repos) < max_repos:
-                    time.sleep(1)
+                # Erros parciais (ex.: contagem nula em um nó) não invalidam a página
+                if not (data.get("data") or {}).get("search"):
+                    raise Exception(f"Erro GraphQL na página {page_count}: {data['errors']}")
+            
+            search_data = data["data"]["search"]
+            page_info = search_data["pageInfo"]
+            edges = search_data["edges"]
+            
+            # Extrair os repositórios desta página (registros compactos; o JSON da página é descartado)
+            page_repos = [RepoRecord.from_mapping(edge["node"]) for edge in edges]
+            
+            print(f"{label}Página {page_count}: {len(page_repos)} repositórios encontrados")
+            
+            if journal is not None:
+                journal.record_page(cursor, page_repos, page_info["endCursor"], page_info["hasNextPage"],
+                                    search=search_query)
+            
+            has_next = page_info["hasNextPage"]
+            cursor = page_info["endCursor"]
                 
         except Exception as e:
-            print(f"Erro ao buscar página {page_count}: {e}")
-            break
+            print(f"{label}Erro ao buscar página {page_count}: {e}")
+            if journal is not None:
+                print("As páginas já concluídas estão no diário; execute novamente com --resume")
+            raise
+        
+        # Fora do try: exceções do consumidor do gerador não são tratadas como erro da página
+        page_repos = page_repos[:max_repos - collected]
+        collected += len(page_repos)
+        yield page_repos
+        
+        if not has_next:
+            print(f"{label}Não há mais páginas disponíveis")
+
+
+def sample_search(search_query):
+    """Amostra uma busca: devolve (repositoryCount, estrelas do primeiro resultado)"""
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+    query = """
+    query($q: String!) {
+      search(query: $q, type: REPOSITORY, first: 1) {
+        repositoryCount
+        nodes { ... on Repository { stargazerCount } }
+      }
+      rateLimit { cost remaining resetAt }
+    }
+    """
+    data, _ = make_graphql_request(GRAPHQL_URL, headers, {"query": query, "variables": {"q": search_query}})
+    search_data = (data.get("data") or {}).get("search")
+    if not search_data:
+        raise Exception(f"Erro GraphQL ao amostrar a busca '{search_query}': {data.get('errors')}")
+    nodes = search_data["nodes"]
+    top_stars = nodes[0]["stargazerCount"] if nodes else 0
+    return search_data["repositoryCount"], top_stars
+
+
+def get_top_starred_repos_sharded(max_repos=10000, with_details=False, journal=None, workers=4):
+    """Busca além do limite de 1.000 resultados fatiando por faixas de estrelas
+    
+    As faixas são planejadas do topo para baixo (search_sharding) e cada uma
+    é paginada em paralelo assim que é planejada; o resultado é mesclado por
+    estrelas sem duplicatas.
+    """
+    _, max_stars = sample_search(TOP_REPOS_SEARCH)
+    print(f"Repositório mais estrelado: {max_stars} estrelas")
     
-    print(f"Total de repositórios coletados: {len(all_repos)}")
-    return all_repos[:max_repos]  # Retorna no máximo max_repos
+    def count_in_range(low, high):
+        return sample_search(star_range_query(low, high))[0]
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for low, high, count in plan_star_shards(count_in_range, max_stars, max_repos):
+            shard = len(futures) + 1
+            print(f"Faixa {shard}: stars:{low}..{high} ({count} repositórios)")
+            futures.append(executor.submit(
+                get_top_starred_repos_graphql,
+                max_repos=SEARCH_RESULT_CAP,
+                with_details=with_details,
+                journal=journal,
+                search_query=star_range_query(low, high),
+                label=f"[faixa {shard}] ",
+            ))
+        shard_results = [future.result() for future in futures]
+    
+    repos = merge_shards(shard_results, max_repos)
+    print(f"Total após mesclar {len(shard_results)} faixas: {len(repos)} repositórios")
+    return repos
+
+
+def missing_count_fields(repo, plan=None):
+    """Contagens do plano (padrão: details_plan) ausentes ou com totalCount nulo no repositório"""
+    return [field for field in (plan or details_plan).count_fields if total_count(repo, field) is None]
+
 
+def has_complete_counts(repo, plan=None):
+    """Verifica se o nó já traz todas as contagens de issues/PRs (não nulas)"""
+    return not missing_count_fields(repo, plan)
 
-def get_repo_details_graphql(owner, repo_name, token, max_retries=3):
-    """Busca detalhes completos de um repositório específico com retry automático"""
-    url = "https://api.github.com/graphql"
+
+def has_details(repo):
+    """Verifica se o nó já traz todos os campos de details_plan (e não só os da busca leve)"""
+    return all(field in repo for field in details_plan.fields)
+
+
+@metrics.timed("repo_details")
+def get_repo_details_graphql(owner, repo_name, token, max_retries=3, session=None, plan=None):
+    """Busca os detalhes (do plano; padrão: details_plan) de um repositório com retry automático"""
+    url = GRAPHQL_URL
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
@@ -138,381 +376,885 @@ def get_repo_details_graphql(owner, repo_name, token, max_retries=3):
     # Query principal com mais campos para issues e PRs
     query = """
     query($owner: String!, $name: String!) {
-      repository(owner: $owner, name: $name) {
-        stargazerCount
-        createdAt
-        updatedAt
-        pushedAt
-        primaryLanguage { name }
-        releases { totalCount }
-        issues(states: OPEN) { totalCount }
-        closedIssues: issues(states: CLOSED) { totalCount }
-        totalIssues: issues { totalCount }
-        pullRequests(states: MERGED) { totalCount }
-        totalPullRequests: pullRequests { totalCount }
-        forkCount
-        diskUsage
-        hasIssuesEnabled
-        hasWikiEnabled
-        hasProjectsEnabled
-        licenseInfo { name }
-        defaultBranchRef { name }
-        languages(first: 10) {
-          edges {
-            node { name }
-            size
-          }
-        }
-        repositoryTopics(first: 20) {
-          nodes {
-            topic { name }
-          }
-        }
-      }
+      repository(owner: $owner, name: $name) {""" + (plan or details_plan).fragment + """}
+      rateLimit { cost remaining resetAt }
     }
     """
     
     try:
         variables = {"owner": owner, "name": repo_name}
         json_data = {"query": query, "variables": variables}
-        response = make_graphql_request(url, headers, json_data)
+        data, _ = make_graphql_request(url, headers, json_data, session=session)
         
-        data = response.json()
+        repo_data = (data.get("data") or {}).get("repository")
         if "errors" in data:
             print(f"Erro GraphQL ao buscar {owner}/{repo_name}: {data['errors']}")
-            raise Exception(f"Erro GraphQL ao buscar {owner}/{repo_name}: {data['errors']}")
+            # Erros parciais (ex.: contagem nula) ainda trazem o repositório
+            if not isinstance(repo_data, dict):
+                raise Exception(f"Erro GraphQL ao buscar {owner}/{repo_name}: {data['errors']}")
         
-        repo_data = data["data"]["repository"]
+        # Contagens nulas: busca só os campos que faltam (zero é um valor válido)
+        fill_missing_counts({(owner, repo_name): repo_data}, token, session=session, plan=plan)
         
-        # Verificar se os dados críticos vieram corretamente
-        issues_ok = repo_data.get('issues', {}).get('totalCount') is not None
-        closed_issues_ok = repo_data.get('closedIssues', {}).get('totalCount') is not None
-        prs_ok = repo_data.get('pullRequests', {}).get('totalCount') is not None
-        
-        # Se algum dado crítico não veio, tentar query alternativa
-        if not all([issues_ok, closed_issues_ok, prs_ok]):
-            print(f"Dados incompletos para {owner}/{repo_name}, tentando query alternativa...")
-            
-            # Query alternativa com paginação para issues e PRs
-            alt_query = """
-            query($owner: String!, $name: String!) {
-              repository(owner: $owner, name: $name) {
-                stargazerCount
-                createdAt
-                updatedAt
-                pushedAt
-                primaryLanguage { name }
-                releases { totalCount }
-                forkCount
-                diskUsage
-                hasIssuesEnabled
-                hasWikiEnabled
-                hasProjectsEnabled
-                licenseInfo { name }
-                defaultBranchRef { name }
-                issues(first: 1) { totalCount }
-                closedIssues: issues(states: CLOSED, first: 1) { totalCount }
-                pullRequests(states: MERGED, first: 1) { totalCount }
-                totalPullRequests: pullRequests(first: 1) { totalCount }
-                languages(first: 10) {
-                  edges {
-                    node { name }
-                    size
-                  }
-                }
-                repositoryTopics(first: 20) {
-                  nodes {
-                    topic { name }
-                  }
-                }
-              }
-            }
-            """
-            
-            alt_json_data = {"query": alt_query, "variables": variables}
-            alt_response = make_graphql_request(url, headers, alt_json_data)
-            
-            if alt_response.status_code == 200:
-                alt_data = alt_response.json()
-                if "errors" not in alt_data:
-                    repo_data = alt_data["data"]["repository"]
-                    print(f"Query alternativa bem-sucedida para {owner}/{repo_name}")
-                else:
-                    print(f"Query alternativa também falhou para {owner}/{repo_name}")
-            else:
-                print(f"Query alternativa falhou com status {alt_response.status_code}")
-        
-        return repo_data
+        return RepoRecord.from_mapping(repo_data)
         
     except Exception as e:
         print(f"Erro ao buscar {owner}/{repo_name}: {e}")
         raise e
 
-def get_specific_issues_and_prs(owner, repo_name, token):
-    """Query específica para buscar issues e pull requests quando a query principal falhar"""
-    url = "https://api.github.com/graphql"
+def build_batch_query(repos, plan=None):
+    """Monta um documento GraphQL com um alias por repositório (r0, r1, ...)"""
+    fragment = (plan or details_plan).fragment
+    declarations = []
+    selections = []
+    variables = {}
+    for idx, (owner, repo_name) in enumerate(repos):
+        declarations.append(f"$o{idx}: String!, $n{idx}: String!")
+        selections.append(f"r{idx}: repository(owner: $o{idx}, name: $n{idx}) {{{fragment}}}")
+        variables[f"o{idx}"] = owner
+        variables[f"n{idx}"] = repo_name
+    
+    query = (
+        "query(" + ", ".join(declarations) + ") {\n"
+        + "\n".join(selections)
+        + "\nrateLimit { cost remaining resetAt }\n}"
+    )
+    return query, variables
+
+def build_counts_query(requests_by_repo):
+    """Monta um documento com um alias por repositório pedindo só as contagens indicadas
+    
+    requests_by_repo é uma lista [(owner, nome, [aliases de COUNT_FIELDS])].
+    """
+    declarations = []
+    selections = []
+    variables = {}
+    for idx, (owner, repo_name, fields) in enumerate(requests_by_repo):
+        declarations.append(f"$o{idx}: String!, $n{idx}: String!")
+        counts = " ".join(COUNT_FIELDS[field] for field in fields)
+        selections.append(f"r{idx}: repository(owner: $o{idx}, name: $n{idx}) {{ {counts} }}")
+        variables[f"o{idx}"] = owner
+        variables[f"n{idx}"] = repo_name
+    
+    query = (
+        "query(" + ", ".join(declarations) + ") {\n"
+        + "\n".join(selections)
+        + "\nrateLimit { cost remaining resetAt }\n}"
+    )
+    return query, variables
+
+def fill_missing_counts(repos, token, session=None, chunk_size=MAX_BATCH_SIZE, plan=None):
+    """Completa, no lugar, as contagens nulas de vários repositórios em consultas agrupadas
+    
+    repos é {(owner, nome): dados}. Cada repositório com contagens nulas entra
+    em uma única consulta de acompanhamento (até chunk_size por requisição)
+    pedindo apenas os campos que faltam (entre as contagens do plano; padrão:
+    details_plan). O caminho de cada repositório é
+    contado em collector_detail_path_total: complete (nada faltava),
+    follow_up (completado pelo acompanhamento) ou unresolved (continua nulo).
+    Devolve repos.
+    """
+    pending = []
+    for (owner, repo_name), repo in repos.items():
+        fields = missing_count_fields(repo, plan)
+        if fields:
+            pending.append((owner, repo_name, fields))
+        else:
+            metrics.increment("collector_detail_path_total", path="complete")
+    if not pending:
+        return repos
+    
+    url = GRAPHQL_URL
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
     }
     
-    # Query específica para issues e PRs com paginação
-    specific_query = """
-    query($owner: String!, $name: String!) {
-      repository(owner: $owner, name: $name) {
-        issues(first: 1) { totalCount }
-        closedIssues: issues(states: CLOSED, first: 1) { totalCount }
-        openIssues: issues(states: OPEN, first: 1) { totalCount }
-        pullRequests(states: MERGED, first: 1) { totalCount }
-        totalPullRequests: pullRequests(first: 1) { totalCount }
-        openPullRequests: pullRequests(states: OPEN, first: 1) { totalCount }
-        closedPullRequests: pullRequests(states: CLOSED, first: 1) { totalCount }
-      }
-    }
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        print(f"Buscando contagens nulas de {len(chunk)} repositórios em uma consulta...")
+        metrics.record_fallback("missing_counts", len(chunk))
+        query, variables = build_counts_query(chunk)
+        
+        try:
+            with metrics.stage("missing_counts"):
+                data, _ = make_graphql_request(url, headers, {"query": query, "variables": variables},
+                                               session=session)
+                results = data.get("data") or {}
+        except Exception as e:
+            print(f"Erro ao buscar contagens nulas: {e}")
+            results = {}
+        
+        for idx, (owner, repo_name, fields) in enumerate(chunk):
+            counts = results.get(f"r{idx}")
+            repo = repos[(owner, repo_name)]
+            if isinstance(counts, dict):
+                repo.update({field: counts[field] for field in fields if total_count(counts, field) is not None})
+            if missing_count_fields(repo, plan):
+                metrics.increment("collector_detail_path_total", path="unresolved")
+                print(f"Contagens ainda nulas para {owner}/{repo_name}: {', '.join(missing_count_fields(repo, plan))}")
+            else:
+                metrics.increment("collector_detail_path_total", path="follow_up")
+    
+    return repos
+
+def next_batch_size(batch_size, cost, response_bytes):
+    """Ajusta o tamanho do lote conforme o custo em pontos e o tamanho da resposta"""
+    factors = []
+    if cost:
+        factors.append(TARGET_BATCH_COST / cost)
+    if response_bytes:
+        factors.append(TARGET_BATCH_BYTES / response_bytes)
+    if not factors:
+        return batch_size
+    
+    # Cresce no máximo 2x por vez para não estourar timeouts do GitHub
+    factor = min(min(factors), 2.0)
+    new_size = int(batch_size * factor)
+    return max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, new_size))
+
+def get_repos_details_batch_graphql(basic_repos, token, batch_size=25, session=None, on_result=None, plan=None):
+    """Busca detalhes de vários repositórios por requisição usando aliases GraphQL
+    
+    Retorna um dicionário {(owner, nome): dados}. Se um alias falhar, os demais
+    resultados do lote são mantidos e apenas o repositório com erro é buscado
+    novamente de forma individual. Contagens nulas de todos os lotes são
+    completadas em uma única consulta de acompanhamento (fill_missing_counts).
+    on_result(chave, dados), se informado, é chamado assim que cada
+    repositório fica pronto. plan escolhe os campos (padrão: details_plan).
     """
+    url = GRAPHQL_URL
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
     
-    try:
-        variables = {"owner": owner, "name": repo_name}
-        json_data = {"query": specific_query, "variables": variables}
-        response = make_graphql_request(url, headers, json_data)
+    pending = [(repo["owner"]["login"], repo["name"]) for repo in basic_repos]
+    details = {}
+    failed = []
+    incomplete = []
+    total_repos = len(pending)
+    batch_size = max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, batch_size))
+    
+    while pending:
+        batch = pending[:batch_size]
+        print(f"Buscando lote de {len(batch)} repositórios ({len(details)}/{total_repos} concluídos)...")
         
-        data = response.json()
-        if "errors" in data:
-            print(f"Erro na query específica para {owner}/{repo_name}: {data['errors']}")
-            return None
+        query, variables = build_batch_query(batch, plan)
+        json_data = {"query": query, "variables": variables}
         
-        return data["data"]["repository"]
+        try:
+            with metrics.stage("batch_request"):
+                data, response = make_graphql_request(url, headers, json_data, session=session)
+        except Exception as e:
+            # Lotes grandes demais costumam resultar em timeout/502 no GitHub
+            if len(batch) > MIN_BATCH_SIZE:
+                batch_size = max(MIN_BATCH_SIZE, len(batch) // 2)
+                metrics.record_fallback("batch_split", batch=len(batch), error=str(e))
+                print(f"Erro no lote ({e}), reduzindo o tamanho do lote para {batch_size}")
+                continue
+            print(f"Erro ao buscar {batch[0][0]}/{batch[0][1]} em lote: {e}")
+            failed.extend(batch)
+            pending = pending[len(batch):]
+            continue
         
-    except Exception as e:
-        print(f"Exceção na query específica para {owner}/{repo_name}: {e}")
-        return None
+        results = data.get("data") or {}
+        if not results and "errors" in data and len(batch) > MIN_BATCH_SIZE:
+            # Erro no documento inteiro (ex.: complexidade), não em um alias
+            batch_size = max(MIN_BATCH_SIZE, len(batch) // 2)
+            metrics.record_fallback("batch_split", batch=len(batch))
+            print(f"Erro GraphQL no lote: {data['errors']}, reduzindo o tamanho do lote para {batch_size}")
+            continue
+        
+        pending = pending[len(batch):]
+        
+        # Aliases com erro voltam como null e aparecem em errors[].path; erros
+        # em campos internos (ex.: contagem nula) não descartam o repositório
+        failed_aliases = set()
+        for error in data.get("errors", []):
+            path = error.get("path") or []
+            if len(path) == 1:
+                failed_aliases.add(path[0])
+        
+        for idx, key in enumerate(batch):
+            alias = f"r{idx}"
+            repo_data = results.get(alias)
+            if alias in failed_aliases or not isinstance(repo_data, dict):
+                failed.append(key)
+            else:
+                details[key] = RepoRecord.from_mapping(repo_data)
+                if not has_complete_counts(details[key], plan):
+                    incomplete.append(key)
+                elif on_result is not None:
+                    on_result(key, details[key])
+        
+        rate_limit = results.get("rateLimit") or {}
+        batch_size = next_batch_size(len(batch), rate_limit.get("cost"), len(response.content))
+    
+    # Contagens nulas dos lotes: um único acompanhamento para todos os repositórios
+    fill_missing_counts(details, token, session=session, plan=plan)
+    if on_result is not None:
+        for key in incomplete:
+            on_result(key, details[key])
+    
+    # Somente os repositórios que falharam são buscados individualmente
+    if failed:
+        metrics.record_fallback("batch_single", len(failed))
+    for owner, repo_name in failed:
+        print(f"Buscando {owner}/{repo_name} individualmente após falha no lote...")
+        try:
+            details[(owner, repo_name)] = get_repo_details_graphql(owner, repo_name, token, session=session,
+                                                                   plan=plan)
+            if on_result is not None:
+                on_result((owner, repo_name), details[(owner, repo_name)])
+        except Exception as e:
+            print(f"EXCEÇÃO ao buscar {owner}/{repo_name}: {e}")
+    
+    return details
 
-# Função para coletar e salvar dados para análise do laboratório
-def collect_and_print_repo_info(basic_repos, filename):
+def extract_issue_pr_counts(repo):
+    """Extrai as contagens de issues e pull requests dos dados do repositório (nulas viram 0)"""
+    issues_count = total_count(repo, 'issues') or 0
+    closed_issues_count = total_count(repo, 'closedIssues') or 0
+    total_issues_count = total_count(repo, 'totalIssues') or 0
+    merged_prs_count = total_count(repo, 'pullRequests') or 0
+    total_prs_count = total_count(repo, 'totalPullRequests') or 0
+    return issues_count, closed_issues_count, total_issues_count, merged_prs_count, total_prs_count
+
+@contextmanager
+def atomic_open(filename, newline=None):
+    """Escreve em um arquivo temporário e só substitui filename se tudo der certo"""
+    tmp_filename = filename + ".tmp"
+    try:
+        with open(tmp_filename, "w", encoding="utf-8", newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+def write_report_header(f, collected_at=None):
+    """Escreve o cabeçalho do relatório de repositórios (com o instante da coleta, se dado)"""
+    f.write("# Análise de Repositórios Populares do GitHub\n")
+    f.write("# Dados coletados para responder às Questões de Pesquisa (RQs)\n")
+    if collected_at:
+        f.write(f"{COLLECTED_AT_KEY}: {collected_at}\n")
+    f.write("=" * 100 + "\n\n")
+
+def report_count(repo, field):
+    """Contagem para o relatório: N/A se o campo não foi buscado, 0 se veio nula"""
+    if field not in repo:
+        return 'N/A'
+    return total_count(repo, field) or 0
+
+def write_repo_section(f, index, owner, repo_name, repo):
+    """Escreve a seção de um repositório no relatório .txt
+    
+    Campos ausentes (não buscados) saem como N/A, e não como 0.
     """
-    Recebe lista básica de repositórios e busca detalhes completos de cada um
+    issues_count, closed_issues_count, total_issues_count, merged_prs_count, total_prs_count = (
+        report_count(repo, field) for field in ('issues', 'closedIssues', 'totalIssues', 'pullRequests',
+                                                'totalPullRequests'))
+    
+    f.write(f"REPOSITÓRIO {index:03d}: {repo_name}\n")
+    f.write(f"Owner: {owner}\n")
+    f.write(f"URL: {repo.get('url', 'N/A')}\n")
+    f.write(f"Description: {repo.get('description', 'No description')}\n")
+    f.write(f"Homepage: {repo.get('homepageUrl', 'N/A')}\n")
+    f.write("\n--- MÉTRICAS PARA AS QUESTÕES DE PESQUISA ---\n")
+    
+    # RQ01: Idade do repositório
+    f.write(f"RQ01 - Created At: {repo.get('createdAt', 'N/A')}\n")
+    
+    # RQ02: Contribuição externa (Pull Requests)
+    f.write(f"RQ02_Merged_PRs: {merged_prs_count}\n")
+    f.write(f"RQ02_Total_PRs: {total_prs_count}\n")
+    
+    # RQ03: Releases
+    releases = report_count(repo, 'releases')
+    f.write(f"RQ03_Total_Releases: {releases}\n")
+    
+    # RQ04: Última atualização
+    f.write(f"RQ04_Last_Push: {repo.get('pushedAt', 'N/A')}\n")
+    f.write(f"RQ04 - Last Update: {repo.get('updatedAt', 'N/A')}\n")
+    
+    # RQ05: Linguagem primária
+    primary_lang_obj = repo.get('primaryLanguage')
+    primary_lang = primary_lang_obj.get('name', 'Not specified') if primary_lang_obj else 'Not specified'
+    f.write(f"RQ05 - Primary Language: {primary_lang}\n")
+    
+    # RQ06: Issues fechadas vs total
+    f.write(f"RQ06 - Closed Issues: {closed_issues_count}\n")
+    f.write(f"RQ06 - Open Issues: {issues_count}\n")
+    f.write(f"RQ06 - Total Issues: {total_issues_count}\n")
+    
+    # Métricas de popularidade
+    f.write("\n--- MÉTRICAS DE POPULARIDADE ---\n")
+    f.write(f"Stars: {repo.get('stargazerCount', 'N/A')}\n")
+    f.write(f"Forks: {repo.get('forkCount', 'N/A')}\n")
+    watcher_obj = repo.get('watcherCount')
+    watchers = watcher_obj.get('totalCount', 0) if watcher_obj else 0
+    f.write(f"Watchers: {watchers}\n")
+    
+    # Informações adicionais
+    f.write("\n--- INFORMAÇÕES ADICIONAIS ---\n")
+    license_obj = repo.get('licenseInfo')
+    license_name = license_obj.get('name', 'No license') if license_obj else 'No license'
+    f.write(f"License: {license_name}\n")
+    f.write(f"Size: {repo.get('diskUsage', 'N/A')} KB\n")
+    branch_obj = repo.get('defaultBranchRef')
+    default_branch = branch_obj.get('name', 'N/A') if branch_obj else 'N/A'
+    
+    f.write(f"Default Branch: {default_branch}\n")
+    
+    # Linguagens utilizadas
+    if repo.get('languages', {}).get('edges'):
+        langs = [f"{edge['node']['name']} ({edge['size']} bytes)" for edge in repo['languages']['edges']]
+        f.write(f"Languages: {', '.join(langs)}\n")
+    
+    # Tópicos
+    if repo.get('repositoryTopics', {}).get('nodes'):
+        topics = [topic_node['topic']['name'] for topic_node in repo['repositoryTopics']['nodes']]
+        f.write(f"Topics: {', '.join(topics)}\n")
+    
+    # Configurações
+    f.write(f"Has Issues: {repo.get('hasIssuesEnabled', 'N/A')}\n")
+    f.write(f"Has Wiki: {repo.get('hasWikiEnabled', 'N/A')}\n")
+    f.write(f"Has Projects: {repo.get('hasProjectsEnabled', 'N/A')}\n")
+    
+    f.write("\n" + "=" * 100 + "\n\n")
+
+def write_stats_file(filename, successful_repos, repos_with_issues, repos_with_prs, total_repos):
+    """Salva as estatísticas da coleta em um arquivo separado"""
+    stats_filename = filename.replace('.txt', '_stats.txt')
+    with atomic_open(stats_filename) as stats_f:
+        stats_f.write(f"Estatísticas da Coleta de Dados\n")
+        stats_f.write(f"Total de repositórios processados: {successful_repos}\n")
+        stats_f.write(f"Repositórios com issues: {repos_with_issues}\n")
+        stats_f.write(f"Repositórios com pull requests: {repos_with_prs}\n")
+        success_rate = successful_repos / total_repos * 100 if total_repos else 0.0
+        stats_f.write(f"Taxa de sucesso: {success_rate:.1f}%\n")
+
+def write_repo_report(basic_repos, filename, resolve_details, parquet_path=None, write_txt=True, csv_path=None):
+    """Escreve o relatório .txt e o arquivo de estatísticas da coleta
+    
+    basic_repos pode ser qualquer iterável (ex.: um gerador alimentado pelo
+    pipeline). resolve_details(i, basic_repo) devolve o dicionário de detalhes
+    do repositório, ou None quando ele deve ser pulado. Os arquivos são
+    gravados de forma atômica. Com parquet_path, cada repositório também é
+    gravado como registro tipado em Parquet; com write_txt=False o .txt não é
+    gerado. Com csv_path, o CSV de txt_to_csv_with_issues_prs é escrito junto,
+    sem reler o .txt. O instante da coleta vai para o cabeçalho do .txt, a
+    coluna 'Collected At' do CSV e os metadados do Parquet. Devolve
+    {(owner, nome): detalhes} dos repositórios escritos.
     """
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write("# Análise de Repositórios Populares do GitHub\n")
-        f.write("# Dados coletados para responder às Questões de Pesquisa (RQs)\n")
-        f.write("=" * 100 + "\n\n")
+    written = {}
+    collected_at = collection_timestamp()
+    with ExitStack() as stack:
+        f = stack.enter_context(atomic_open(filename)) if write_txt else None
+        parquet = (stack.enter_context(RepoParquetWriter(parquet_path, collected_at=collected_at))
+                   if parquet_path else None)
+        csv_writer = None
+        if csv_path:
+            csv_writer = csv.writer(stack.enter_context(atomic_open(csv_path, newline='')))
+            csv_writer.writerow(CSV_HEADERS)
+        
+        if f is not None:
+            write_report_header(f, collected_at)
         
+        total_repos = 0
         successful_repos = 0
         repos_with_issues = 0
         repos_with_prs = 0
         
-        total_repos = len(basic_repos)
         for i, basic_repo in enumerate(basic_repos, 1):
+            total_repos = i
             owner = basic_repo["owner"]["login"]
             repo_name = basic_repo["name"]
             
-            print(f"Buscando detalhes do repositório {i}/{total_repos} ({i/total_repos*100:.1f}%): {owner}/{repo_name}")
-            
-            try:
-                repo = get_repo_details_graphql(owner, repo_name, token)
-            except Exception as e:
-                print(f"EXCEÇÃO ao buscar {owner}/{repo_name}: {e}")
-                continue
+            repo = resolve_details(i, basic_repo)
             
             if repo is None:
                 continue
                 
-            if not isinstance(repo, dict):
+            if not isinstance(repo, Mapping):
                 continue
                 
             successful_repos += 1
-            if repo is not None:
-                print(f"Sucesso para {owner}/{repo_name}, processando dados...")
-                
-                
-                if i < total_repos:
-                    print(f"Aguardando 0.5 segundos antes da próxima requisição...")
-                    time.sleep(0.5)
-                
-                issues_count = repo.get('issues', {}).get('totalCount', 0)
-                closed_issues_count = repo.get('closedIssues', {}).get('totalCount', 0)
-                total_issues_count = repo.get('totalIssues', {}).get('totalCount', 0)
-                merged_prs_count = repo.get('pullRequests', {}).get('totalCount', 0)
-                total_prs_count = repo.get('totalPullRequests', {}).get('totalCount', 0)
-                
-                
-                if all(count == 0 for count in [issues_count, closed_issues_count, merged_prs_count, total_prs_count]):
-                    print(f"Dados de issues/PRs não encontrados para {owner}/{repo_name}, tentando query específica...")
-                    specific_data = get_specific_issues_and_prs(owner, repo_name, token)
-                    if specific_data:
-                        
-                        repo.update(specific_data)
-                        issues_count = repo.get('issues', {}).get('totalCount', 0)
-                        closed_issues_count = repo.get('closedIssues', {}).get('totalCount', 0)
-                        total_issues_count = repo.get('totalIssues', {}).get('totalCount', 0)
-                        merged_prs_count = repo.get('pullRequests', {}).get('totalCount', 0)
-                        total_prs_count = repo.get('totalPullRequests', {}).get('totalCount', 0)
-                        print(f"Query específica bem-sucedida para {owner}/{repo_name}")
-                
-                
-                if issues_count > 0 or closed_issues_count > 0:
-                    repos_with_issues += 1
-                if merged_prs_count > 0 or total_prs_count > 0:
-                    repos_with_prs += 1
-                
-                f.write(f"REPOSITÓRIO {i:03d}: {repo_name}\n")
-                f.write(f"Owner: {owner}\n")
-                f.write(f"URL: {repo.get('url', 'N/A')}\n")
-                f.write(f"Description: {repo.get('description', 'No description')}\n")
-                f.write(f"Homepage: {repo.get('homepageUrl', 'N/A')}\n")
-                f.write("\n--- MÉTRICAS PARA AS QUESTÕES DE PESQUISA ---\n")
-                
-                # RQ01: Idade do repositório
-                f.write(f"RQ01 - Created At: {repo.get('createdAt', 'N/A')}\n")
-                
-                # RQ02: Contribuição externa (Pull Requests)
-                f.write(f"RQ02_Merged_PRs: {merged_prs_count}\n")
-                f.write(f"RQ02_Total_PRs: {total_prs_count}\n")
-                
-                # RQ03: Releases
-                releases = repo.get('releases', {}).get('totalCount', 0)
-                f.write(f"RQ03_Total_Releases: {releases}\n")
-                
-                # RQ04: Última atualização
-                f.write(f"RQ04_Last_Push: {repo.get('pushedAt', 'N/A')}\n")
-                f.write(f"RQ04 - Last Update: {repo.get('updatedAt', 'N/A')}\n")
-                
-                # RQ05: Linguagem primária
-                primary_lang_obj = repo.get('primaryLanguage')
-                primary_lang = primary_lang_obj.get('name', 'Not specified') if primary_lang_obj else 'Not specified'
-                f.write(f"RQ05 - Primary Language: {primary_lang}\n")
-                
-                # RQ06: Issues fechadas vs total
-                f.write(f"RQ06 - Closed Issues: {closed_issues_count}\n")
-                f.write(f"RQ06 - Open Issues: {issues_count}\n")
-                f.write(f"RQ06 - Total Issues: {total_issues_count}\n")
-                
-                # Métricas de popularidade
-                f.write("\n--- MÉTRICAS DE POPULARIDADE ---\n")
-                f.write(f"Stars: {repo.get('stargazerCount', 0)}\n")
-                f.write(f"Forks: {repo.get('forkCount', 0)}\n")
-                watcher_obj = repo.get('watcherCount')
-                watchers = watcher_obj.get('totalCount', 0) if watcher_obj else 0
-                f.write(f"Watchers: {watchers}\n")
-                
-                # Informações adicionais
-                f.write("\n--- INFORMAÇÕES ADICIONAIS ---\n")
-                license_obj = repo.get('licenseInfo')
-                license_name = license_obj.get('name', 'No license') if license_obj else 'No license'
-                f.write(f"License: {license_name}\n")
-                f.write(f"Size: {repo.get('diskUsage', 'N/A')} KB\n")
-                branch_obj = repo.get('defaultBranchRef')
-                default_branch = branch_obj.get('name', 'N/A') if branch_obj else 'N/A'
-                
-                f.write(f"Default Branch: {default_branch}\n")
-                
-                # Linguagens utilizadas
-                if repo.get('languages', {}).get('edges'):
-                    langs = [f"{edge['node']['name']} ({edge['size']} bytes)" for edge in repo['languages']['edges']]
-                    f.write(f"Languages: {', '.join(langs)}\n")
-                
-                # Tópicos
-                if repo.get('repositoryTopics', {}).get('nodes'):
-                    topics = [topic_node['topic']['name'] for topic_node in repo['repositoryTopics']['nodes']]
-                    f.write(f"Topics: {', '.join(topics)}\n")
-                
-                # Configurações
-                f.write(f"Has Issues: {repo.get('hasIssuesEnabled', 'N/A')}\n")
-                f.write(f"Has Wiki: {repo.get('hasWikiEnabled', 'N/A')}\n")
-                f.write(f"Has Projects: {repo.get('hasProjectsEnabled', 'N/A')}\n")
-                
-                f.write("\n" + "=" * 100 + "\n\n")
+            print(f"Sucesso para {owner}/{repo_name}, processando dados...")
+            
+            issues_count, closed_issues_count, _, merged_prs_count, total_prs_count = extract_issue_pr_counts(repo)
             
-        print(f"\nProcessados {successful_repos}/{len(basic_repos)} repositórios com sucesso")
+            if issues_count > 0 or closed_issues_count > 0:
+                repos_with_issues += 1
+            if merged_prs_count > 0 or total_prs_count > 0:
+                repos_with_prs += 1
+            
+            if f is not None or csv_writer is not None:
+                with metrics.stage("write_txt"):
+                    section_buffer = io.StringIO()
+                    write_repo_section(section_buffer, i, owner, repo_name, repo)
+                    section_text = section_buffer.getvalue()
+                    if f is not None:
+                        f.write(section_text)
+            if csv_writer is not None:
+                # A linha sai da seção renderizada, igual à conversão do .txt
+                with metrics.stage("write_csv"):
+                    for section in iter_report_sections([section_text]):
+                        section[COLLECTED_AT_KEY] = collected_at
+                        csv_writer.writerow(report_section_to_csv_row(section))
+            if parquet is not None:
+                with metrics.stage("write_parquet"):
+                    parquet.write(repo_to_record(i, owner, repo_name, repo))
+            written[(owner, repo_name)] = repo
+            
+        print(f"\nProcessados {successful_repos}/{total_repos} repositórios com sucesso")
         print(f"Repositórios com issues: {repos_with_issues}")
         print(f"Repositórios com pull requests: {repos_with_prs}")
         
         # Salvar estatísticas em arquivo separado
-        stats_filename = filename.replace('.txt', '_stats.txt')
-        with open(stats_filename, "w", encoding="utf-8") as stats_f:
-            stats_f.write(f"Estatísticas da Coleta de Dados\n")
-            stats_f.write(f"Total de repositórios processados: {successful_repos}\n")
-            stats_f.write(f"Repositórios com issues: {repos_with_issues}\n")
-            stats_f.write(f"Repositórios com pull requests: {repos_with_prs}\n")
-            stats_f.write(f"Taxa de sucesso: {(successful_repos/len(basic_repos)*100):.1f}%\n")
+        write_stats_file(filename, successful_repos, repos_with_issues, repos_with_prs, total_repos)
+    
+    return written
 
-def txt_to_csv_with_issues_prs(txt_filename, csv_filename):
-    """Converte o arquivo .txt em CSV com colunas específicas incluindo Issues e PRs"""
-    import csv
-    import re
-    
-    # Cabeçalhos do CSV
-    headers = [
-        'Repository', 'Owner', 'URL', 'Stars', 'Forks', 'Watchers', 
-        'Last Commit Date', 'Main Language', 'License', 'Size (KB)', 
-        'Main Branch', 'Topics', 'Issues', 'Pull Requests'
+def journal_recorder(journal):
+    """Callback on_result que registra cada repositório concluído no diário"""
+    if journal is None:
+        return None
+    return lambda key, repo: journal.record_repo(key[0], key[1], repo)
+
+# Função para coletar e salvar dados para análise do laboratório
+def collect_and_print_repo_info(basic_repos, filename, batch_size=None, journal=None,
+                                parquet_path=None, write_txt=True):
+    """
+    Recebe lista básica de repositórios e busca detalhes completos de cada um
+    
+    Com batch_size, os detalhes são buscados em lotes com aliases GraphQL
+    (ver get_repos_details_batch_graphql) em vez de uma requisição por repositório.
+    Repositórios que já trazem os detalhes da busca não são consultados novamente.
+    Com journal, os repositórios já registrados no diário não são buscados de
+    novo e cada novo repositório concluído é registrado.
+    """
+    journaled = journal.repos if journal is not None else {}
+    
+    # Nós vindos do modo de passada única já trazem os detalhes; contagens
+    # nulas neles são completadas em um acompanhamento agrupado. Os demais
+    # precisam da query de detalhes
+    fill_missing_counts({
+        (repo["owner"]["login"], repo["name"]): repo for repo in basic_repos
+        if has_details(repo) and (repo["owner"]["login"], repo["name"]) not in journaled
+    }, token)
+    missing_repos = [
+        repo for repo in basic_repos
+        if not has_details(repo) and (repo["owner"]["login"], repo["name"]) not in journaled
     ]
     
-    with open(txt_filename, 'r', encoding='utf-8') as txt_file, \
-         open(csv_filename, 'w', newline='', encoding='utf-8') as csv_file:
+    prefetched = None
+    if batch_size:
+        prefetched = get_repos_details_batch_graphql(missing_repos, token, batch_size,
+                                                     on_result=journal_recorder(journal))
+    
+    total_repos = len(basic_repos)
+    
+    def resolve_details(i, basic_repo):
+        owner = basic_repo["owner"]["login"]
+        repo_name = basic_repo["name"]
+        
+        if (owner, repo_name) in journaled:
+            return journaled[(owner, repo_name)]
+        
+        if has_details(basic_repo):
+            repo = basic_repo
+        elif prefetched is not None:
+            repo = prefetched.get((owner, repo_name))
+        else:
+            print(f"Buscando detalhes do repositório {i}/{total_repos} ({i/total_repos*100:.1f}%): {owner}/{repo_name}")
+            
+            try:
+                repo = get_repo_details_graphql(owner, repo_name, token)
+            except Exception as e:
+                print(f"EXCEÇÃO ao buscar {owner}/{repo_name}: {e}")
+                return None
         
-        writer = csv.DictWriter(csv_file, fieldnames=headers)
-        writer.writeheader()
+        if not isinstance(repo, Mapping):
+            return None
         
-        content = txt_file.read()
+        if journal is not None:
+            journal.record_repo(owner, repo_name, repo)
+        return repo
+    
+    written = write_repo_report(basic_repos, filename, resolve_details, parquet_path, write_txt)
+    print(f"Orçamento de rate limit: {token_pool.budget()}")
+    return written
+
+def incremental_refresh(basic_repos, filename, snapshot_path=SNAPSHOT_FILE, batch_size=25, journal=None,
+                        parquet_path=None, write_txt=True):
+    """Atualiza o relatório buscando detalhes só de repositórios novos ou alterados
+    
+    basic_repos vem da busca leve (com pushedAt/updatedAt). Os demais
+    repositórios reaproveitam os detalhes do snapshot anterior, e o snapshot
+    é regravado com o resultado mesclado.
+    """
+    previous = load_snapshot(snapshot_path)
+    to_fetch, reused = plan_refresh(basic_repos, previous)
+    if journal is not None:
+        reused.update({key: repo for key, repo in journal.repos.items() if key not in reused})
+        to_fetch = [repo for repo in to_fetch if (repo["owner"]["login"], repo["name"]) not in journal.repos]
+    print(f"Atualização incremental: {len(to_fetch)} repositórios a buscar, {len(reused)} reaproveitados do snapshot")
+    
+    searched = {(repo["owner"]["login"], repo["name"]): repo for repo in to_fetch}
+    
+    def merged(key, repo):
+        return merge_planned_details(previous.get(key), repo, searched.get(key))
+    
+    on_result = None
+    if journal is not None:
+        on_result = lambda key, repo: journal.record_repo(key[0], key[1], merged(key, repo))
+    
+    fetched = {}
+    for plan, repos in split_by_plan(to_fetch, previous):
+        fetched.update(get_repos_details_batch_graphql(repos, token, batch_size or 25, on_result=on_result,
+                                                       plan=plan))
+    
+    def resolve_details(i, basic_repo):
+        key = (basic_repo["owner"]["login"], basic_repo["name"])
+        if key in reused:
+            return reused[key]
+        repo = fetched.get(key)
+        if not isinstance(repo, Mapping):
+            return None
+        repo = merged(key, repo)
+        if journal is not None:
+            journal.record_repo(key[0], key[1], repo)
+        return repo
+    
+    written = write_repo_report(basic_repos, filename, resolve_details, parquet_path, write_txt)
+    save_snapshot(basic_repos, written, snapshot_path)
+    print(f"Orçamento de rate limit: {token_pool.budget()}")
+    return written
+
+def split_by_plan(basic_repos, previous):
+    """Separa os repositórios a buscar por plano: [(plano, repositórios), ...]
+    
+    Um plano parcial (details_plan) só é usado para repositórios com detalhes
+    anteriores completos em previous; os demais (novos no ranking ou com
+    snapshot incompleto) são buscados com o fragmento completo.
+    """
+    if details_plan.is_full:
+        groups = [(details_plan, list(basic_repos))]
+    else:
+        planned, unplanned = [], []
+        for repo in basic_repos:
+            known = previous.get((repo["owner"]["login"], repo["name"]))
+            (planned if known is not None and has_all_fields(known) else unplanned).append(repo)
+        if unplanned:
+            print(f"{len(unplanned)} repositórios sem detalhes anteriores completos; buscando o fragmento completo")
+        groups = [(details_plan, planned), (FULL_DETAILS_PLAN, unplanned)]
+    return [(plan, repos) for plan, repos in groups if repos]
+
+def merge_planned_details(previous, repo, basic_repo=None):
+    """Com um plano parcial (details_plan), completa os campos não pedidos
+    
+    A ordem de precedência é: o resultado buscado, o nó da busca (estrelas e
+    datas já devolvidas por ela) e, por fim, os detalhes anteriores.
+    """
+    if details_plan.is_full:
+        return RepoRecord.from_mapping(repo)
+    return RepoRecord.from_mapping({**(previous or {}), **(basic_repo or {}), **repo})
+
+def build_nodes_query(plan):
+    """Query nodes(ids:) com os campos do plano, mais nome e owner para seguir renomeações"""
+    return """
+    query($ids: [ID!]!) {
+      nodes(ids: $ids) {
+        ... on Repository {
+          name
+          owner { login }""" + plan.fragment + """
+        }
+      }
+      rateLimit { cost remaining resetAt }
+    }
+    """
+
+def refresh_by_node_ids(known, token, chunk_size=NODES_CHUNK_SIZE, session=None):
+    """Busca de novo os detalhes de repositórios conhecidos via nodes(ids:), sem a busca
+    
+    known é {(owner, nome): detalhes anteriores}, como em load_snapshot. Os
+    repositórios com node ID são buscados em blocos de chunk_size IDs; como o
+    ID não muda, renomeações e transferências são seguidas automaticamente
+    (a chave devolvida é o owner/nome atual). Os que ainda não têm ID são
+    buscados por owner/nome em lotes. IDs que não resolvem mais (repositório
+    removido ou privado) ficam de fora. Com um plano parcial em details_plan
+    (ex.: só estrelas e forks), só esses campos são buscados e os demais
+    continuam os de known; repositórios com detalhes incompletos em known
+    são buscados com o fragmento completo (ver split_by_plan). Devolve (nós
+    básicos ordenados por estrelas, {(owner, nome) atual: detalhes}).
+    """
+    url = GRAPHQL_URL
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+    
+    with_ids = [{"owner": {"login": key[0]}, "name": key[1], "id": repo["id"]}
+                for key, repo in known.items() if repo.get("id")]
+    without_ids = [{"owner": {"login": key[0]}, "name": key[1]} for key, repo in known.items() if not repo.get("id")]
+    details = {}
+    done = 0
+    
+    for plan, repos in split_by_plan(with_ids, known):
+        query = build_nodes_query(plan)
+        for start in range(0, len(repos), chunk_size):
+            chunk = [((repo["owner"]["login"], repo["name"]), repo["id"]) for repo in repos[start:start + chunk_size]]
+            done += len(chunk)
+            print(f"Atualizando {done}/{len(with_ids)} repositórios por node ID...")
+            with metrics.stage("refresh_nodes"):
+                data, _ = make_graphql_request(url, headers,
+                                               {"query": query, "variables": {"ids": [i for _, i in chunk]}},
+                                               session=session)
+            nodes = (data.get("data") or {}).get("nodes")
+            if nodes is None:
+                raise Exception(f"Erro GraphQL ao atualizar por node ID: {data.get('errors')}")
+            
+            for (old_key, node_id), node in zip(chunk, nodes):
+                if not isinstance(node, dict):
+                    print(f"{old_key[0]}/{old_key[1]} não foi encontrado (removido ou privado)")
+                    metrics.increment("collector_refresh_total", result="gone")
+                    continue
+                key = (node["owner"]["login"], node["name"])
+                if key != old_key:
+                    print(f"Renomeado: {old_key[0]}/{old_key[1]} -> {key[0]}/{key[1]}")
+                    metrics.increment("collector_refresh_total", result="renamed")
+                else:
+                    metrics.increment("collector_refresh_total", result="refreshed")
+                details[key] = merge_planned_details(known[old_key], node)
+    
+    if without_ids:
+        print(f"{len(without_ids)} repositórios sem node ID no snapshot, buscando por owner/nome...")
+        for plan, repos in split_by_plan(without_ids, known):
+            by_name = get_repos_details_batch_graphql(repos, token, session=session, plan=plan)
+            metrics.increment("collector_refresh_total", len(by_name), result="by_name")
+            for key, repo in by_name.items():
+                details.setdefault(key, merge_planned_details(known.get(key), repo))
+    
+    # Os detalhes já mesclados têm todos os campos: confere as contagens do fragmento completo
+    fill_missing_counts(details, token, session=session, plan=FULL_DETAILS_PLAN)
+    
+    basic_repos = [
+        RepoRecord.from_mapping({"id": repo.get("id"), "name": key[1], "owner": {"login": key[0]},
+                                 "stargazerCount": repo.get("stargazerCount"), "pushedAt": repo.get("pushedAt"),
+                                 "updatedAt": repo.get("updatedAt")})
+        for key, repo in details.items()
+    ]
+    basic_repos.sort(key=lambda repo: repo["stargazerCount"] or 0, reverse=True)
+    return basic_repos, details
+
+def refresh_known_repos(filename, snapshot_path=SNAPSHOT_FILE, parquet_path=None, write_txt=True):
+    """Atualiza o relatório e o snapshot a partir dos repositórios já conhecidos (ver refresh_by_node_ids)"""
+    known = load_snapshot(snapshot_path)
+    if not known:
+        print(f"Nenhum repositório conhecido em {snapshot_path}; faça uma coleta completa antes do --refresh")
+        return [], {}
+    
+    print(details_plan.describe(len(known), NODES_CHUNK_SIZE))
+    basic_repos, details = refresh_by_node_ids(known, token)
+    
+    def resolve_details(i, basic_repo):
+        return details.get((basic_repo["owner"]["login"], basic_repo["name"]))
+    
+    written = write_repo_report(basic_repos, filename, resolve_details, parquet_path, write_txt)
+    print(f"Orçamento de rate limit: {token_pool.budget()}")
+    return basic_repos, written
+
+def collect_pipelined(filename, max_repos=1000, batch_size=25, workers=4, with_details=False, journal=None,
+                      parquet_path=None, write_txt=True, csv_path=None, max_in_flight=16):
+    """Coleta com busca, detalhes e escrita sobrepostas (ver pipeline.run_pipeline)
+    
+    Cada página da busca é dividida em lotes de batch_size repositórios que
+    entram no pipeline assim que a página chega; workers threads buscam os
+    detalhes em paralelo numa Session compartilhada, e o relatório (.txt, CSV
+    e Parquet) é escrito na ordem do ranking à medida que os lotes ficam
+    prontos. No máximo max_in_flight lotes ficam entre a busca e a escrita.
+    Devolve (repositórios da busca, {(owner, nome): detalhes escritos}).
+    """
+    journaled = journal.repos if journal is not None else {}
+    chunk_size = batch_size or 1
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    
+    def chunks():
+        for page_repos in iter_search_pages(max_repos, with_details, journal=journal):
+            for start in range(0, len(page_repos), chunk_size):
+                yield page_repos[start:start + chunk_size]
+    
+    def fetch(chunk):
+        keys = [(repo["owner"]["login"], repo["name"]) for repo in chunk]
+        details = {key: journaled[key] for key in keys if key in journaled}
+        fill_missing_counts({key: repo for key, repo in zip(keys, chunk)
+                             if key not in details and has_details(repo)}, token, session=session)
+        details.update({key: repo for key, repo in zip(keys, chunk) if key not in details and has_details(repo)})
+        pending = [repo for key, repo in zip(keys, chunk) if key not in details]
+        if pending and batch_size:
+            details.update(get_repos_details_batch_graphql(pending, token, batch_size, session=session))
+        else:
+            for repo in pending:
+                owner, repo_name = repo["owner"]["login"], repo["name"]
+                try:
+                    details[(owner, repo_name)] = get_repo_details_graphql(owner, repo_name, token, session=session)
+                except Exception as e:
+                    print(f"EXCEÇÃO ao buscar {owner}/{repo_name}: {e}")
+        return [(repo, details.get(key)) for key, repo in zip(keys, chunk)]
+    
+    basic_repos = []
+    resolved = {}
+    
+    def ordered_repos():
+        for results in run_pipeline(chunks(), fetch, workers=workers, max_in_flight=max_in_flight):
+            for basic_repo, repo in results:
+                basic_repos.append(basic_repo)
+                resolved[(basic_repo["owner"]["login"], basic_repo["name"])] = repo
+                yield basic_repo
+    
+    def resolve_details(i, basic_repo):
+        key = (basic_repo["owner"]["login"], basic_repo["name"])
+        repo = resolved.pop(key, None)
+        if isinstance(repo, Mapping) and journal is not None and key not in journaled:
+            journal.record_repo(key[0], key[1], repo)
+        return repo
+    
+    with session:
+        written = write_repo_report(ordered_repos(), filename, resolve_details, parquet_path, write_txt, csv_path)
+    print(f"Orçamento de rate limit: {token_pool.budget()}")
+    return basic_repos, written
+
+# Chaves "Chave: valor" do relatório usadas na conversão para CSV
+# Linha do cabeçalho do relatório com o instante da coleta
+COLLECTED_AT_KEY = 'Data da coleta'
+
+REPORT_KEYS = [
+    'Owner', 'Stars', 'Forks', 'Watchers', 'RQ01 - Created At', 'RQ04 - Last Update',
+    'RQ04_Last_Push', 'RQ05 - Primary Language', 'License', 'Size', 'Default Branch',
+    'Topics', 'RQ06 - Open Issues', 'RQ06 - Closed Issues', 'RQ06 - Total Issues',
+    'RQ02_Merged_PRs', 'RQ02_Total_PRs', 'RQ03_Total_Releases', COLLECTED_AT_KEY,
+]
+
+# Um único padrão para o cabeçalho da seção e todas as linhas "Chave: valor"
+REPORT_LINE_PATTERN = re.compile(
+    r'^(REPOSITÓRIO \d+|' + '|'.join(re.escape(key) for key in REPORT_KEYS) + r'): (.+)$',
+    re.MULTILINE
+)
+LEADING_INT_PATTERN = re.compile(r'\d+')
+
+def parse_repo_report(txt_filename, block_size=1 << 20):
+    """Lê o relatório .txt em blocos e gera um dicionário por repositório
+    
+    Cada bloco (cortado sempre em fim de linha) é percorrido uma única vez por
+    REPORT_LINE_PATTERN, sem carregar o arquivo inteiro nem reprocessar a seção
+    por campo. Apenas a primeira ocorrência de cada chave na seção é mantida.
+    O instante da coleta do cabeçalho é repetido em todas as seções.
+    """
+    def blocks():
+        with open(txt_filename, 'r', encoding='utf-8') as txt_file:
+            while True:
+                block = txt_file.read(block_size)
+                if not block:
+                    break
+                yield block + txt_file.readline()
+    
+    return iter_report_sections(blocks())
+
+def iter_report_sections(blocks):
+    """Gera as seções do relatório a partir de blocos de texto terminados em fim de linha"""
+    section = None
+    header = {}
+    for block in blocks:
+        for key, value in REPORT_LINE_PATTERN.findall(block):
+            if key.startswith('REPOSITÓRIO'):
+                if section is not None:
+                    yield section
+                section = {'Repository': value.strip(), **header}
+            elif section is None:
+                header[key] = value.strip()
+            elif key not in section:
+                section[key] = value
+    
+    if section is not None:
+        yield section
+
+def leading_int(value, default):
+    """Inteiro no início do valor (ex.: "512548 KB"), ou default"""
+    if value is None:
+        return default
+    int_match = LEADING_INT_PATTERN.match(value)
+    return int(int_match.group()) if int_match else default
+
+# Cabeçalhos do CSV gerado a partir do relatório
+CSV_HEADERS = [
+    'Repository', 'Owner', 'URL', 'Stars', 'Forks', 'Watchers', 
+    'Last Commit Date', 'Main Language', 'License', 'Size (KB)', 
+    'Main Branch', 'Topics', 'Issues', 'Pull Requests',
+    'Created At', 'Releases', 'Closed Issues', 'Merged PRs', 'Collected At'
+]
+
+def report_section_to_csv_row(section):
+    """Monta a linha do CSV (na ordem de CSV_HEADERS) a partir de uma seção do relatório
+    
+    Métricas sem valor no relatório (N/A) continuam N/A. Devolve None se a
+    seção não tiver o owner.
+    """
+    owner = section.get('Owner')
+    if owner is None:
+        return None
+    owner = owner.strip()
+    repo_name = section['Repository']
+    
+    return (
+        repo_name,
+        owner,
+        f"https://github.com/{owner}/{repo_name}",
+        leading_int(section.get('Stars'), 'N/A'),
+        leading_int(section.get('Forks'), 'N/A'),
+        leading_int(section.get('Watchers'), 0),
+        section.get('RQ04_Last_Push') or section.get('RQ04 - Last Update') or 'N/A',
+        section.get('RQ05 - Primary Language', 'Not specified'),
+        section.get('License', 'No license'),
+        leading_int(section.get('Size'), 'N/A'),
+        section.get('Default Branch', 'N/A'),
+        section.get('Topics', ''),
+        leading_int(section.get('RQ06 - Total Issues'), 'N/A'),
+        leading_int(section.get('RQ02_Total_PRs'), 'N/A'),
+        section.get('RQ01 - Created At', 'N/A'),
+        leading_int(section.get('RQ03_Total_Releases'), 'N/A'),
+        leading_int(section.get('RQ06 - Closed Issues'), 'N/A'),
+        leading_int(section.get('RQ02_Merged_PRs'), 'N/A'),
+        section.get(COLLECTED_AT_KEY, 'N/A'),
+    )
+
+@metrics.timed("txt_to_csv")
+def txt_to_csv_with_issues_prs(txt_filename, csv_filename):
+    """Converte o arquivo .txt em CSV com colunas específicas incluindo Issues e PRs
+    
+    O relatório é lido de forma incremental por parse_repo_report, com memória
+    constante independentemente do número de repositórios.
+    """
+    with atomic_open(csv_filename, newline='') as csv_file:
         
-        # Dividir por repositórios (separados por =====)
-        repos_sections = content.split('=' * 100)
+        writer = csv.writer(csv_file)
+        writer.writerow(CSV_HEADERS)
         
         successful_repos = 0
         
-        for section in repos_sections:
-            if not section.strip() or 'REPOSITÓRIO' not in section:
-                continue
-                
+        for section in parse_repo_report(txt_filename):
             try:
-                # Extrair informações básicas
-                repo_name_match = re.search(r'REPOSITÓRIO \d+: (.+)', section)
-                owner_match = re.search(r'Owner: (.+)', section)
-                
-                if not repo_name_match or not owner_match:
+                row = report_section_to_csv_row(section)
+                if row is None:
                     continue
-                    
-                repo_name = repo_name_match.group(1).strip()
-                owner = owner_match.group(1).strip()
-                
-                # Extrair outras informações usando regex
-                stars_match = re.search(r'Stars: (\d+)', section)
-                forks_match = re.search(r'Forks: (\d+)', section)
-                watchers_match = re.search(r'Watchers: (\d+)', section)
-                created_match = re.search(r'RQ01 - Created At: (.+)', section)
-                updated_match = re.search(r'RQ04 - Last Update: (.+)', section)
-                pushed_match = re.search(r'RQ04_Last_Push: (.+)', section)
-                language_match = re.search(r'RQ05 - Primary Language: (.+)', section)
-                license_match = re.search(r'License: (.+)', section)
-                size_match = re.search(r'Size: (\d+) KB', section)
-                branch_match = re.search(r'Default Branch: (.+)', section)
-                topics_match = re.search(r'Topics: (.+)', section)
-                
-                # Extrair Issues e PRs
-                open_issues_match = re.search(r'RQ06 - Open Issues: (\d+)', section)
-                closed_issues_match = re.search(r'RQ06 - Closed Issues: (\d+)', section)
-                total_issues_match = re.search(r'RQ06 - Total Issues: (\d+)', section)
-                merged_prs_match = re.search(r'RQ02_Merged_PRs: (\d+)', section)
-                total_prs_match = re.search(r'RQ02_Total_PRs: (\d+)', section)
-                
-                # Construir linha do CSV
-                row = {
-                    'Repository': repo_name,
-                    'Owner': owner,
-                    'URL': f"https://github.com/{owner}/{repo_name}",
-                    'Stars': int(stars_match.group(1)) if stars_match else 0,
-                    'Forks': int(forks_match.group(1)) if forks_match else 0,
-                    'Watchers': int(watchers_match.group(1)) if watchers_match else 0,
-                    'Last Commit Date': pushed_match.group(1) if pushed_match else (updated_match.group(1) if updated_match else 'N/A'),
-                    'Main Language': language_match.group(1) if language_match else 'Not specified',
-                    'License': license_match.group(1) if license_match else 'No license',
-                    'Size (KB)': int(size_match.group(1)) if size_match else 'N/A',
-                    'Main Branch': branch_match.group(1) if branch_match else 'N/A',
-                    'Topics': topics_match.group(1) if topics_match else '',
-                    'Issues': int(total_issues_match.group(1)) if total_issues_match else 0,
-                    'Pull Requests': int(total_prs_match.group(1)) if total_prs_match else 0
-                }
                 
                 writer.writerow(row)
                 successful_repos += 1
@@ -526,27 +1268,122 @@ def txt_to_csv_with_issues_prs(txt_filename, csv_filename):
 
 # Main
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Coleta dados dos repositórios mais populares do GitHub")
+    parser.add_argument("--max-repos", type=int, default=1000,
+                        help="número máximo de repositórios a coletar")
+    parser.add_argument("--batch-size", type=int, default=25,
+                        help="repositórios por requisição em lote (0 busca um por vez)")
+    parser.add_argument("--sharded", action="store_true",
+                        help="fatia a busca por faixas de estrelas para passar de 1.000 repositórios")
+    parser.add_argument("--shard-workers", type=int, default=4,
+                        help="faixas de estrelas buscadas em paralelo (com --sharded)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="sobrepõe busca, detalhes e escrita (os detalhes começam com a primeira página)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="threads que buscam detalhes em paralelo (com --pipeline)")
+    parser.add_argument("--single-pass", action="store_true",
+                        help="busca os detalhes junto com a paginação da busca")
+    parser.add_argument("--incremental", action="store_true",
+                        help="busca detalhes só de repositórios novos ou alterados desde o último snapshot")
+    parser.add_argument("--refresh", action="store_true",
+                        help="atualiza só os repositórios do snapshot via node IDs (sem busca; segue renomeações)")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE,
+                        help="arquivo com o snapshot da última coleta")
+    parser.add_argument("--resume", action="store_true",
+                        help="continua a coleta interrompida a partir do diário de progresso")
+    parser.add_argument("--journal", default=JOURNAL_FILE,
+                        help="arquivo do diário de progresso da coleta")
+    parser.add_argument("--parquet", default=None,
+                        help="grava também os registros tipados neste arquivo Parquet")
+    parser.add_argument("--no-txt", action="store_true",
+                        help="não gera o relatório .txt nem o CSV derivado dele (use com --parquet)")
+    parser.add_argument("--history", default=None,
+                        help="acrescenta a coleta ao histórico de métricas nesta pasta (ex.: history)")
+    parser.add_argument("--cache", default=None, metavar="ARQUIVO",
+                        help="reaproveita respostas ainda válidas deste cache SQLite (desativado por padrão; "
+                             "dentro do TTL as contagens podem estar desatualizadas)")
+    add_plan_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    try:
+        details_plan = plan_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+    # Um plano parcial só completa detalhes já conhecidos; numa coleta normal
+    # os campos não pedidos sairiam vazios no relatório e no snapshot
+    if not details_plan.is_full and not (args.refresh or args.incremental):
+        parser.error("--rq/--columns só podem ser usados com --refresh ou --incremental")
+    
+    start_metrics(args)
+    if args.cache:
+        response_cache = ResponseCache(args.cache)
+    
     print("=== LABORATÓRIO: CARACTERÍSTICAS DE REPOSITÓRIOS POPULARES ===")
     print("Coletando dados dos repositórios mais populares do GitHub...")
     
     # Configurações
-    MAX_REPOS = 1000  # Número máximo de repositórios a coletar
+    MAX_REPOS = args.max_repos  # Número máximo de repositórios a coletar
     print(f"Configuração: Coletando até {MAX_REPOS} repositórios")
     
+    # O diário é sempre gravado; --resume reaproveita o da execução anterior
+    journal = CrawlJournal(args.journal, resume=args.resume)
+    
     try:
-        repos = get_top_starred_repos_graphql(max_repos=MAX_REPOS)
+        # No modo incremental a busca é sempre leve: os detalhes vêm do snapshot
+        with_details = args.single_pass and not args.incremental
+        filename = "lab_popular_repositories.txt"
+        csv_filename = "repos_info_with_issues_prs.csv"
+        output_options = {"parquet_path": args.parquet, "write_txt": not args.no_txt}
+        pipelined = args.pipeline and not (args.sharded or args.incremental or args.refresh)
+        if not args.refresh:
+            print(details_plan.describe(MAX_REPOS, 100 if with_details else args.batch_size or 1, search=with_details))
+        if args.pipeline and not pipelined:
+            print("Aviso: --pipeline não se combina com --sharded, --incremental nem --refresh; "
+                  "usando a coleta em etapas")
+        
+        if args.refresh:
+            repos, written = refresh_known_repos(filename, args.snapshot, **output_options)
+        elif pipelined:
+            if MAX_REPOS > SEARCH_RESULT_CAP:
+                print(f"Aviso: a busca devolve no máximo {SEARCH_RESULT_CAP} resultados; use --sharded")
+            repos, written = collect_pipelined(filename, MAX_REPOS, batch_size=args.batch_size, workers=args.workers,
+                                               with_details=with_details, journal=journal,
+                                               csv_path=None if args.no_txt else csv_filename, **output_options)
+        elif args.sharded:
+            repos = get_top_starred_repos_sharded(max_repos=MAX_REPOS, with_details=with_details, journal=journal,
+                                                  workers=args.shard_workers)
+        else:
+            if MAX_REPOS > SEARCH_RESULT_CAP:
+                print(f"Aviso: a busca devolve no máximo {SEARCH_RESULT_CAP} resultados; use --sharded")
+            repos = get_top_starred_repos_graphql(max_repos=MAX_REPOS, with_details=with_details, journal=journal)
         
         if repos:
             print(f"\nColeta concluída! {len(repos)} repositórios encontrados")
             
            
             
-            filename = "lab_popular_repositories.txt"
-            collect_and_print_repo_info(repos, filename)
+            if args.refresh or pipelined:
+                save_snapshot(repos, written, args.snapshot)
+            elif args.incremental:
+                written = incremental_refresh(repos, filename, args.snapshot, batch_size=args.batch_size,
+                                              journal=journal, **output_options)
+            else:
+                written = collect_and_print_repo_info(repos, filename, batch_size=args.batch_size, journal=journal,
+                                                      **output_options)
+                save_snapshot(repos, written, args.snapshot)
+            
+            if args.history:
+                store = SnapshotStore(args.history)
+                rows = store.append(repos, written)
+                store.close()
+                print(f"Histórico: {rows} repositórios com métricas alteradas gravados em {args.history}")
             
             
-            csv_filename = "repos_info_with_issues_prs.csv"
-            txt_to_csv_with_issues_prs(filename, csv_filename)
+            if not args.no_txt and not pipelined:
+                txt_to_csv_with_issues_prs(filename, csv_filename)
             
            
         else:
@@ -555,4 +1392,9 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Erro: {e}")
         print("\nDicas para resolver problemas:")
-        
\ No newline at end of file
+    finally:
+        journal.close()
+        if response_cache is not None:
+            print(response_cache.summary())
+            response_cache.close()
+        finish_metrics(args)
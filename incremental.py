@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Suporte ao modo de atualização incremental
+
+Guarda um snapshot da última coleta (ordem do ranking, node ID e detalhes
+de cada repositório) e compara com o novo resultado da busca para decidir quais
+repositórios precisam ter os detalhes buscados novamente.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+from query_planner import has_all_fields
+from repo_record import RepoRecord
+
+SNAPSHOT_FILE = "repos_snapshot.json"
+
+
+def repo_key(repo):
+    return (repo["owner"]["login"], repo["name"])
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """Carrega o snapshot anterior como {(owner, nome): RepoRecord}; vazio se não existir"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    snapshot = {}
+    for entry in data["repos"]:
+        details = entry["details"]
+        if entry.get("id") and not details.get("id"):
+            details = dict(details, id=entry["id"])
+        snapshot[(entry["owner"], entry["name"])] = RepoRecord.from_mapping(details)
+    return snapshot
+
+
+def save_snapshot(basic_repos, details, path=SNAPSHOT_FILE):
+    """Grava o snapshot atual de forma atômica (arquivo temporário + os.replace)
+
+    Só entram repositórios com todos os campos do fragmento completo: um
+    registro parcial (plano de --rq/--columns sem detalhes anteriores para
+    completar) não substitui o snapshot.
+    """
+    entries = []
+    for basic_repo in basic_repos:
+        key = repo_key(basic_repo)
+        if key in details and has_all_fields(details[key]):
+            entries.append({"owner": key[0], "name": key[1], "id": details[key].get("id") or basic_repo.get("id"),
+                            "details": details[key]})
+
+    data = {
+        "collected_at": datetime.now(timezone.utc).isoformat(),
+        "repos": entries,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=dict)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def plan_refresh(search_repos, previous):
+    """Separa os repositórios da nova busca entre reaproveitáveis e a buscar
+
+    Um repositório é buscado novamente se for novo no ranking ou se pushedAt
+    ou updatedAt mudaram desde o snapshot. Devolve (a_buscar, reaproveitados),
+    onde reaproveitados é {(owner, nome): detalhes do snapshot}, com os campos
+    que a nova busca já devolveu (estrelas, forks na passada única, datas)
+    sobrepostos aos do snapshot: estrelas mudam sem alterar pushedAt/updatedAt.
+    """
+    to_fetch = []
+    reused = {}
+    for repo in search_repos:
+        key = repo_key(repo)
+        old = previous.get(key)
+        if (old is None
+                or old.get("pushedAt") != repo.get("pushedAt")
+                or old.get("updatedAt") != repo.get("updatedAt")):
+            to_fetch.append(repo)
+        else:
+            reused[key] = RepoRecord.from_mapping({**old, **repo})
+    return to_fetch, reused
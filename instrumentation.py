@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas e tempos por etapa da coleta
+
+Um registro global (metrics) acumula contadores, gauges e o tempo de cada
+etapa (stage). Os dados saem de três formas:
+
+- logs estruturados: uma linha JSON por evento (configure(json_log=...))
+- formato texto do Prometheus: arquivo (write_prometheus) ou endpoint HTTP
+  /metrics (serve_prometheus)
+- resumo por etapa impresso ao final da execução (print_breakdown)
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+class Metrics:
+    """Contadores, gauges e tempos por etapa, seguros entre threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}  # (nome, labels) -> valor
+        self.gauges = {}
+        self.stages = {}  # etapa -> [chamadas, segundos, máximo]
+        self.log_file = None
+
+    def configure(self, json_log=None):
+        """Ativa os logs estruturados em json_log (JSON Lines)"""
+        with self.lock:
+            if self.log_file is not None:
+                self.log_file.close()
+            self.log_file = open(json_log, "a", encoding="utf-8") if json_log else None
+
+    def increment(self, name, value=1, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, label_key(labels))] = value
+
+    def observe(self, stage_name, seconds):
+        with self.lock:
+            entry = self.stages.setdefault(stage_name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Mede o tempo do bloco como uma chamada da etapa name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorador: cada chamada da função conta como uma chamada da etapa name"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def log_event(self, event, **fields):
+        """Grava um evento como linha JSON (se os logs estiverem ativos)"""
+        if self.log_file is None:
+            return
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            if self.log_file is not None:
+                self.log_file.write(line + "\n")
+                self.log_file.flush()
+
+    def record_response(self, api, response, seconds, attempt=0):
+        """Contabiliza uma resposta HTTP: contagem por status, bytes e evento no log"""
+        body = response.request.body if response.request is not None else None
+        sent = len(body or b"")
+        received = len(response.content)
+        self.increment("github_requests_total", api=api, status=response.status_code)
+        self.increment("github_bytes_total", sent, api=api, direction="sent")
+        self.increment("github_bytes_total", received, api=api, direction="received")
+        self.log_event("request", api=api, status=response.status_code, attempt=attempt,
+                       seconds=round(seconds, 4), bytes_sent=sent, bytes_received=received)
+
+    def record_retry(self, api, reason, **fields):
+        self.increment("github_retries_total", api=api, reason=reason)
+        self.log_event("retry", api=api, reason=reason, **fields)
+
+    def record_fallback(self, kind, count=1, **fields):
+        self.increment("collector_fallbacks_total", count, kind=kind)
+        self.log_event("fallback", kind=kind, count=count, **fields)
+
+    def record_budget(self, label, budget):
+        """Atualiza os gauges de rate limit a partir de RateLimitScheduler.budget()"""
+        for field in ("limit", "remaining", "bucket_tokens", "total_wait_seconds"):
+            if budget.get(field) is not None:
+                self.set_gauge(f"github_rate_limit_{field}", budget[field], token=label)
+
+    def render_prometheus(self):
+        """Métricas no formato texto de exposição do Prometheus"""
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            stages = {name: list(entry) for name, entry in self.stages.items()}
+
+        lines = []
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, key), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{format_labels(key)} {value}")
+        if stages:
+            for name, kind, index in (("collector_stage_calls_total", "counter", 0),
+                                      ("collector_stage_seconds_total", "counter", 1),
+                                      ("collector_stage_seconds_max", "gauge", 2)):
+                lines.append(f"# TYPE {name} {kind}")
+                for stage_name, entry in sorted(stages.items()):
+                    lines.append(f'{name}{{stage="{stage_name}"}} {entry[index]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Grava as métricas para o textfile collector (arquivo temporário + os.replace)"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve_prometheus(self, port, host="127.0.0.1"):
+        """Expõe GET /metrics numa thread em segundo plano; devolve o servidor"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def print_breakdown(self):
+        """Imprime o tempo por etapa (as etapas podem ser aninhadas) e os contadores"""
+        with self.lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1][1], reverse=True)
+            counters = sorted(self.counters.items())
+        wall = time.time() - self.started
+
+        print("\n===== Tempo por etapa =====")
+        print(f"{'etapa':<24}{'chamadas':>10}{'total (s)':>11}{'média (ms)':>12}{'máx (ms)':>10}{'% do total':>12}")
+        for name, (calls, seconds, maximum) in stages:
+            print(f"{name:<24}{calls:>10}{seconds:>11.2f}{seconds / calls * 1000:>12.1f}"
+                  f"{maximum * 1000:>10.1f}{seconds / wall * 100 if wall else 0:>11.1f}%")
+        print(f"Tempo total da execução: {wall:.2f} s")
+        if counters:
+            print("Contadores:")
+            for (name, key), value in counters:
+                print(f"  {name}{format_labels(key)}: {value}")
+
+    def close(self):
+        self.configure(None)
+
+
+# Registro usado por todo o coletor
+metrics = Metrics()
+
+
+def add_metrics_arguments(parser):
+    """Opções de linha de comando comuns aos coletores"""
+    parser.add_argument("--metrics-log", default=None,
+                        help="grava um evento JSON por linha neste arquivo (requisições, retentativas, fallbacks)")
+    parser.add_argument("--metrics-file", default=None,
+                        help="grava as métricas no formato texto do Prometheus ao final")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="expõe /metrics (Prometheus) nesta porta durante a coleta")
+
+
+def start_metrics(args):
+    metrics.configure(json_log=args.metrics_log)
+    if args.metrics_port:
+        metrics.serve_prometheus(args.metrics_port)
+        print(f"Métricas em http://127.0.0.1:{args.metrics_port}/metrics")
+
+
+def finish_metrics(args):
+    metrics.print_breakdown()
+    if args.metrics_file:
+        metrics.write_prometheus(args.metrics_file)
+    metrics.close()
@@ -1,12 +1,75 @@
 import requests
 import csv
+import json
+import os
 import time
 import urllib3
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from instrumentation import add_metrics_arguments, finish_metrics, metrics, start_metrics
+from repo_record import RestRepoRecord
+from response_cache import REST_TTL, ResponseCache
+from token_pool import NoTokensAvailableError, TokenPool, tokens_from_env
 
 token = "token" 
 
+# Pode apontar para um servidor REST local (ex.: benchmarks/mock_github.py)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Tokens de TOKENS/TOKEN (ou o token fixo acima). A busca e os detalhes têm
+# orçamentos separados na API REST do GitHub, então cada um tem seu pool
+tokens = tokens_from_env() or [token]
+search_pool = TokenPool(tokens, points_per_minute=30, burst=10)
+core_pool = TokenPool(tokens, points_per_minute=900)
+
+# Cache persistente dos detalhes (ResponseCache); None desativa
+response_cache = None
+
+# Campos do CSV, todos presentes nos itens de /search/repositories; GET
+# /repos/{owner}/{repo} só é chamado para itens em que algum deles falte
+ROW_FIELDS = [
+    "name", "owner", "html_url", "stargazers_count", "forks_count", "watchers_count",
+    "pushed_at", "language", "license", "size", "default_branch", "topics",
+]
+
+
+def rest_get(url, pool, max_retries=3, extra_headers=None, session=None):
+    """GET na API REST com o token de maior folga, espaçado pelos headers de rate limit
+    
+    Com session (requests.Session), as conexões keep-alive do pool são reutilizadas.
+    Um 401 só é repetido se ainda houver outro token no pool; sem nenhum, a
+    resposta 401 é devolvida para o raise_for_status() de quem chamou.
+    """
+    http = session or requests
+    for attempt in range(max_retries):
+        with metrics.stage("rate_limit_wait"):
+            request_token = pool.acquire()
+        headers = {"Authorization": f"token {request_token}", **(extra_headers or {})}
+        start = time.perf_counter()
+        with metrics.stage("rest_request"):
+            response = http.get(url, headers=headers, verify=False)
+        metrics.record_response("rest", response, time.perf_counter() - start, attempt)
+        pool.update_from_response(request_token, response)
+        metrics.record_budget(pool.labels[request_token], pool.scheduler_for(request_token).budget())
+        
+        # Token revogado: tenta novamente com outro token do pool
+        if response.status_code == 401 and attempt < max_retries - 1 and pool.has_active_tokens():
+            metrics.record_retry("rest", "unauthorized", attempt=attempt)
+            continue
+        
+        scheduler = pool.scheduler_for(request_token)
+        if (response.status_code in (403, 429) and "rate limit" in response.text.lower()
+                and attempt < max_retries - 1):
+            wait_time = scheduler.wait_time_after_limit(response)
+            print(f"Rate limit atingido. Aguardando {wait_time:.0f} segundos...")
+            scheduler.block_for(wait_time)
+            metrics.record_retry("rest", "rate_limit", attempt=attempt)
+            continue
+        return response
+
 def get_top_starred_repos_paginated(num_repos):
    
     all_repos = []
@@ -14,39 +77,122 @@ def get_top_starred_repos_paginated(num_repos):
     num_pages = (num_repos + per_page - 1) // per_page
 
     for page in range(1, num_pages + 1):
-        url = f"https://api.github.com/search/repositories?q=stars:>0&sort=stars&order=desc&per_page={per_page}&page={page}"
-        headers = {"Authorization": f"token {token}"}
+        url = f"{GITHUB_API_URL}/search/repositories?q=stars:>0&sort=stars&order=desc&per_page={per_page}&page={page}"
         
         try:
-            response = requests.get(url, headers=headers, verify=False)
+            response = rest_get(url, search_pool)
             response.raise_for_status()  
             
+            # Só os campos da linha do CSV ficam na memória (ver RestRepoRecord)
             repos = response.json().get("items", [])
-            all_repos.extend(repos)
+            all_repos.extend(RestRepoRecord.from_mapping(item) for item in repos)
 
             print(f"Página {page} de {num_pages} processada. Repositórios coletados: {len(all_repos)}")
-            time.sleep(1) 
         
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, NoTokensAvailableError) as e:
             print(f"Erro ao buscar repositórios na página {page}: {e}")
             break
     
-    return all_repos
+    return all_repos[:num_repos]
 
 
-def get_repo_details(owner, repo):
-    url = f"https://api.github.com/repos/{owner}/{repo}"
-    headers = {"Authorization": f"token {token}"}
+def get_repo_details(owner, repo, session=None):
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
+    
+    # Entrada válida no cache dispensa a requisição; expirada é revalidada pelo ETag
+    cached = None
+    extra_headers = None
+    if response_cache is not None:
+        cache_key = response_cache.make_key(url)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            body, etag, fresh = cached
+            if fresh:
+                metrics.increment("github_cache_hits_total", api="rest")
+                return json.loads(body)
+            if etag:
+                extra_headers = {"If-None-Match": etag}
+    
     try:
-        response = requests.get(url, headers=headers, verify=False)
+        response = rest_get(url, core_pool, extra_headers=extra_headers, session=session)
+        if response.status_code == 304:
+            metrics.increment("github_not_modified_total", api="rest")
+            response_cache.touch(cache_key, REST_TTL)
+            return json.loads(cached[0])
         response.raise_for_status()
+        if response_cache is not None:
+            response_cache.put(cache_key, response.content, REST_TTL, etag=response.headers.get("ETag"))
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, NoTokensAvailableError) as e:
         print(f"Erro ao buscar detalhes do repositório {owner}/{repo}: {e}")
         return None
 
 
-def collect_and_save_repo_info_to_csv(repos, filename="repos_info.csv"):
+def missing_row_fields(repo):
+    """Campos de ROW_FIELDS ausentes no item (None é um valor válido, ex.: sem licença)"""
+    return [field for field in ROW_FIELDS if field not in repo]
+
+
+def complete_repos(repos, workers=8):
+    """Devolve os itens da busca, completando com GET /repos só os que não têm todos os campos
+    
+    As chamadas de detalhes rodam em paralelo em um requests.Session com pool
+    de conexões keep-alive.
+    """
+    incomplete = [i for i, repo in enumerate(repos) if missing_row_fields(repo)]
+    metrics.increment("rest_rows_from_search_total", len(repos) - len(incomplete))
+    if not incomplete:
+        return list(repos)
+    
+    print(f"Buscando detalhes de {len(incomplete)} repositórios sem todos os campos na busca...")
+    metrics.increment("rest_detail_fetches_total", len(incomplete))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    
+    def fetch(i):
+        repo = repos[i]
+        owner = repo.get("owner", {}).get("login")
+        repo_name = repo.get("name")
+        if not owner or not repo_name:
+            return None
+        return get_repo_details(owner, repo_name, session=session)
+    
+    completed = list(repos)
+    with session, ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, details in zip(incomplete, executor.map(fetch, incomplete)):
+            completed[i] = RestRepoRecord.from_mapping({**repos[i], **details}) if details else None
+    return completed
+
+
+def repo_to_row(repo):
+    """Linha do CSV a partir de um item da busca ou de GET /repos/{owner}/{repo}"""
+    license_name = "Sem licença"
+    license_data = repo.get("license")
+    if license_data and isinstance(license_data, dict):
+        license_name = license_data.get("name", "Sem licença")
+    
+    topics_list = repo.get("topics", [])
+    topics_str = ", ".join(topics_list)
+
+    return {
+        "Repository": repo.get("name", "N/A"),
+        "Owner": repo.get("owner", {}).get("login", "N/A"),
+        "URL": repo.get("html_url", "N/A"),
+        "Stars": repo.get("stargazers_count", "N/A"),
+        "Forks": repo.get("forks_count", "N/A"),
+        "Watchers": repo.get("watchers_count", "N/A"),
+        "Last Commit Date": repo.get("pushed_at", "N/A"),
+        "Main Language": repo.get("language", "N/A"),
+        "License": license_name,
+        "Size (KB)": repo.get("size", "N/A"),
+        "Main Branch": repo.get("default_branch", "N/A"),
+        "Topics": topics_str
+    }
+
+
+def collect_and_save_repo_info_to_csv(repos, filename="repos_info.csv", workers=8):
     if not repos:
         print("Nenhum repositório para salvar.")
         return
@@ -61,49 +207,40 @@ def collect_and_save_repo_info_to_csv(repos, filename="repos_info.csv"):
         writer = csv.DictWriter(f, fieldnames=headers)
         writer.writeheader()
         
-        for i, repo in enumerate(repos):
-            owner = repo.get("owner", {}).get("login")
-            repo_name = repo.get("name")
-            
-            if not owner or not repo_name:
+        for i, repo in enumerate(complete_repos(repos, workers)):
+            if not repo or not repo.get("owner", {}).get("login") or not repo.get("name"):
                 continue
 
-            repo_details = get_repo_details(owner, repo_name)
-            
-            if repo_details:
-                license_name = "Sem licença"
-                license_data = repo_details.get("license")
-                if license_data and isinstance(license_data, dict):
-                    license_name = license_data.get("name", "Sem licença")
-                
-                topics_list = repo_details.get("topics", [])
-                topics_str = ", ".join(topics_list)
-
-                row = {
-                    "Repository": repo_details.get("name", "N/A"),
-                    "Owner": repo_details.get("owner", {}).get("login", "N/A"),
-                    "URL": repo_details.get("html_url", "N/A"),
-                    "Stars": repo_details.get("stargazers_count", "N/A"),
-                    "Forks": repo_details.get("forks_count", "N/A"),
-                    "Watchers": repo_details.get("watchers_count", "N/A"),
-                    "Last Commit Date": repo_details.get("pushed_at", "N/A"),
-                    "Main Language": repo_details.get("language", "N/A"),
-                    "License": license_name,
-                    "Size (KB)": repo_details.get("size", "N/A"),
-                    "Main Branch": repo_details.get("default_branch", "N/A"),
-                    "Topics": topics_str
-                }
-                writer.writerow(row)
-                print(f"Salvando {i+1}/{len(repos)}: {repo_name}")
-                time.sleep(1)
+            writer.writerow(repo_to_row(repo))
+            print(f"Salvando {i+1}/{len(repos)}: {repo['name']}")
 
 
 if __name__ == "__main__":
-    num_repos_to_collect = 1000
-    print(f"Iniciando a coleta dos {num_repos_to_collect} repositórios mais populares...")
-    
-    repos = get_top_starred_repos_paginated(num_repos_to_collect)
-    
-    print(f"Coletados {len(repos)} repositórios. Salvando em arquivo CSV...")
-    collect_and_save_repo_info_to_csv(repos)
-    print("Dados salvos em repos_info.csv")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Coleta via API REST dos repositórios mais populares do GitHub")
+    parser.add_argument("--max-repos", type=int, default=1000,
+                        help="número máximo de repositórios a coletar")
+    parser.add_argument("--cache", default=None, metavar="ARQUIVO",
+                        help="reaproveita detalhes ainda válidos deste cache SQLite (desativado por padrão; "
+                             "dentro do TTL as contagens podem estar desatualizadas)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    start_metrics(args)
+    if args.cache:
+        response_cache = ResponseCache(args.cache)
+    try:
+        print(f"Iniciando a coleta dos {args.max_repos} repositórios mais populares...")
+        
+        repos = get_top_starred_repos_paginated(args.max_repos)
+        
+        print(f"Coletados {len(repos)} repositórios. Salvando em arquivo CSV...")
+        collect_and_save_repo_info_to_csv(repos)
+        print("Dados salvos em repos_info.csv")
+        print(f"Orçamento de rate limit (core): {core_pool.budget()}")
+    finally:
+        if response_cache is not None:
+            print(response_cache.summary())
+            response_cache.close()
+        finish_metrics(args)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline produtor/consumidor com filas limitadas
+
+run_pipeline lê os itens de uma fonte numa thread produtora, processa cada
+item em várias threads e devolve os resultados na ordem da fonte, usando
+um buffer de reordenação. O número de itens entre a leitura e a entrega é
+limitado (max_in_flight): quando o consumidor ou os workers ficam para trás,
+o produtor espera, e a memória não cresce com o tamanho da coleta.
+"""
+
+import queue
+import threading
+
+# Marcadores nas filas internas
+_WORKER_DONE = object()
+_STOP = object()
+
+
+class ReorderBuffer:
+    """Recebe itens numerados fora de ordem e libera as sequências contíguas"""
+
+    def __init__(self, start=0):
+        self.next_seq = start
+        self.pending = {}
+
+    def push(self, seq, item):
+        """Guarda o item e devolve a lista (possivelmente vazia) dos itens já em ordem"""
+        self.pending[seq] = item
+        ready = []
+        while self.next_seq in self.pending:
+            ready.append(self.pending.pop(self.next_seq))
+            self.next_seq += 1
+        return ready
+
+    def __len__(self):
+        return len(self.pending)
+
+
+def run_pipeline(source, process, workers=4, max_in_flight=16, poll_interval=0.1):
+    """Gera process(item) para cada item de source, na ordem de source
+
+    source é percorrido numa thread produtora e process roda em workers
+    threads. Uma exceção na fonte ou em process interrompe o pipeline e é
+    repassada ao consumidor. Se o consumidor parar antes do fim (break ou
+    exceção), as threads são encerradas.
+    """
+    slots = threading.Semaphore(max_in_flight)
+    work_queue = queue.Queue(maxsize=max_in_flight)
+    done_queue = queue.Queue()
+    stop = threading.Event()
+
+    def acquire_slot():
+        while not stop.is_set():
+            if slots.acquire(timeout=poll_interval):
+                return True
+        return False
+
+    def put_work(entry):
+        while not stop.is_set():
+            try:
+                work_queue.put(entry, timeout=poll_interval)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for seq, item in enumerate(source):
+                if not acquire_slot() or not put_work((seq, item)):
+                    return
+        except BaseException as e:
+            done_queue.put((_STOP, e))
+        finally:
+            for _ in range(workers):
+                put_work(_STOP)
+
+    def work():
+        try:
+            while not stop.is_set():
+                try:
+                    entry = work_queue.get(timeout=poll_interval)
+                except queue.Empty:
+                    continue
+                if entry is _STOP:
+                    return
+                seq, item = entry
+                try:
+                    done_queue.put((seq, process(item)))
+                except BaseException as e:
+                    done_queue.put((_STOP, e))
+                    return
+        finally:
+            done_queue.put(_WORKER_DONE)
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    buffer = ReorderBuffer()
+    finished_workers = 0
+    try:
+        while finished_workers < workers:
+            entry = done_queue.get()
+            if entry is _WORKER_DONE:
+                finished_workers += 1
+                continue
+            seq, result = entry
+            if seq is _STOP:
+                raise result
+            for ready in buffer.push(seq, result):
+                yield ready
+                slots.release()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=poll_interval * 10)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Planejador dos campos de detalhe pedidos ao GraphQL
+
+Cada conexão do fragmento de detalhes (issues, releases, languages, ...)
+entra no custo da query e no tamanho da resposta. plan_query monta o menor
+fragmento que cobre as questões de pesquisa (RQ01..RQ06) e/ou as colunas
+do CSV escolhidas, e QueryPlan.estimate_cost estima os pontos de rate limit
+antes da coleta, pela regra do GitHub: cada conexão custa uma requisição
+por repositório da query, o total é dividido por 100 e arredondado, com
+custo mínimo de 1 ponto por query.
+
+Sem nenhuma escolha, o plano é o fragmento completo (REPO_DETAILS_FIELDS).
+Um plano parcial só atualiza detalhes já conhecidos (--refresh e
+--incremental): os campos não pedidos vêm do snapshot anterior.
+"""
+
+# Campo (ou alias) da resposta -> seleção GraphQL, na ordem do fragmento completo
+FIELD_SELECTIONS = {
+    "id": "id",
+    "stargazerCount": "stargazerCount",
+    "createdAt": "createdAt",
+    "updatedAt": "updatedAt",
+    "pushedAt": "pushedAt",
+    "primaryLanguage": "primaryLanguage { name }",
+    "releases": "releases { totalCount }",
+    "issues": "issues(states: OPEN) { totalCount }",
+    "closedIssues": "closedIssues: issues(states: CLOSED) { totalCount }",
+    "totalIssues": "totalIssues: issues { totalCount }",
+    "pullRequests": "pullRequests(states: MERGED) { totalCount }",
+    "totalPullRequests": "totalPullRequests: pullRequests { totalCount }",
+    "forkCount": "forkCount",
+    "diskUsage": "diskUsage",
+    "hasIssuesEnabled": "hasIssuesEnabled",
+    "hasWikiEnabled": "hasWikiEnabled",
+    "hasProjectsEnabled": "hasProjectsEnabled",
+    "licenseInfo": "licenseInfo { name }",
+    "defaultBranchRef": "defaultBranchRef { name }",
+    "languages": """languages(first: 10) {
+          edges {
+            node { name }
+            size
+          }
+        }""",
+    "repositoryTopics": """repositoryTopics(first: 20) {
+          nodes {
+            topic { name }
+          }
+        }""",
+}
+
+# Conexões de cada campo (os demais são escalares ou objetos simples, sem custo extra)
+FIELD_CONNECTIONS = {
+    "releases": 1,
+    "issues": 1,
+    "closedIssues": 1,
+    "totalIssues": 1,
+    "pullRequests": 1,
+    "totalPullRequests": 1,
+    "languages": 1,
+    "repositoryTopics": 1,
+}
+
+# Contagens de issues/PRs (ver graphql.fill_missing_counts)
+COUNT_FIELD_NAMES = ["issues", "closedIssues", "totalIssues", "pullRequests", "totalPullRequests"]
+
+# Sempre pedidos: o node ID permite o --refresh e o snapshot
+ALWAYS_FIELDS = ["id"]
+
+# Campos usados por cada questão de pesquisa no relatório
+RQ_FIELDS = {
+    "RQ01": ["createdAt"],
+    "RQ02": ["pullRequests", "totalPullRequests"],
+    "RQ03": ["releases"],
+    "RQ04": ["pushedAt", "updatedAt"],
+    "RQ05": ["primaryLanguage"],
+    "RQ06": ["issues", "closedIssues", "totalIssues"],
+}
+
+# Campos usados por cada coluna do CSV (Repository, Owner e URL vêm da busca)
+COLUMN_FIELDS = {
+    "Repository": [],
+    "Owner": [],
+    "URL": [],
+    "Stars": ["stargazerCount"],
+    "Forks": ["forkCount"],
+    "Watchers": [],
+    "Last Commit Date": ["pushedAt", "updatedAt"],
+    "Main Language": ["primaryLanguage"],
+    "License": ["licenseInfo"],
+    "Size (KB)": ["diskUsage"],
+    "Main Branch": ["defaultBranchRef"],
+    "Topics": ["repositoryTopics"],
+    "Issues": ["totalIssues"],
+    "Pull Requests": ["totalPullRequests"],
+    "Created At": ["createdAt"],
+    "Releases": ["releases"],
+    "Closed Issues": ["closedIssues"],
+    "Merged PRs": ["pullRequests"],
+}
+
+
+class QueryPlan:
+    """Campos de detalhe escolhidos, o fragmento GraphQL correspondente e o custo estimado"""
+
+    def __init__(self, fields):
+        wanted = set(fields) | set(ALWAYS_FIELDS)
+        unknown = wanted - set(FIELD_SELECTIONS)
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+        self.fields = [field for field in FIELD_SELECTIONS if field in wanted]
+        self.count_fields = [field for field in COUNT_FIELD_NAMES if field in wanted]
+        self.connections = sum(FIELD_CONNECTIONS.get(field, 0) for field in self.fields)
+        self.fragment = "\n" + "".join(f"        {FIELD_SELECTIONS[field]}\n" for field in self.fields)
+
+    @property
+    def is_full(self):
+        return len(self.fields) == len(FIELD_SELECTIONS)
+
+    def points_per_query(self, repos_per_query, search=False):
+        """Pontos de uma query com repos_per_query repositórios (search conta como uma conexão a mais)"""
+        requests = repos_per_query * self.connections + (1 if search else 0)
+        return max(1, round(requests / 100))
+
+    def estimate_cost(self, total_repos, repos_per_query=25, search=False):
+        """Estimativa para buscar os detalhes de total_repos repositórios em queries de repos_per_query"""
+        queries = -(-total_repos // repos_per_query) if total_repos else 0
+        last = total_repos - (queries - 1) * repos_per_query if queries else 0
+        points = (queries - 1) * self.points_per_query(repos_per_query, search) if queries else 0
+        if queries:
+            points += self.points_per_query(last, search)
+        return {
+            "fields": len(self.fields),
+            "connections_per_repo": self.connections,
+            "queries": queries,
+            "points_per_query": self.points_per_query(repos_per_query, search),
+            "points": points,
+        }
+
+    def describe(self, total_repos, repos_per_query=25, search=False):
+        """Resumo do plano e da estimativa para imprimir antes da coleta"""
+        cost = self.estimate_cost(total_repos, repos_per_query, search)
+        full = full_plan().estimate_cost(total_repos, repos_per_query, search)
+        return (f"Plano de campos: {', '.join(self.fields)}\n"
+                f"Custo estimado: {cost['points']} pontos em {cost['queries']} queries de até {repos_per_query} "
+                f"repositórios ({cost['connections_per_repo']} conexões por repositório; "
+                f"fragmento completo: {full['points']} pontos)")
+
+
+def has_all_fields(repo):
+    """Verifica se o repositório traz todos os campos do fragmento completo (ex.: antes de ir para o snapshot)"""
+    return all(field in repo for field in FIELD_SELECTIONS)
+
+
+def full_plan():
+    """Plano com todos os campos (o fragmento usado sem escolha de RQs ou colunas)"""
+    return QueryPlan(FIELD_SELECTIONS)
+
+
+def plan_query(rqs=(), columns=()):
+    """Menor plano que cobre as RQs e as colunas (do CSV, ou nomes de campos GraphQL) indicadas
+
+    Sem RQs nem colunas, devolve o plano completo.
+    """
+    if not rqs and not columns:
+        return full_plan()
+    fields = []
+    for rq in rqs:
+        key = rq.strip().upper()
+        if key not in RQ_FIELDS:
+            raise ValueError(f"RQ desconhecida: {rq} (opções: {', '.join(RQ_FIELDS)})")
+        fields += RQ_FIELDS[key]
+    for column in columns:
+        column = column.strip()
+        if column in COLUMN_FIELDS:
+            fields += COLUMN_FIELDS[column]
+        elif column in FIELD_SELECTIONS:
+            fields.append(column)
+        else:
+            raise ValueError(f"Coluna desconhecida: {column} (opções: {', '.join(COLUMN_FIELDS)} "
+                             f"ou um campo GraphQL: {', '.join(FIELD_SELECTIONS)})")
+    return QueryPlan(fields)
+
+
+def split_option(value):
+    """Lista de uma opção separada por vírgulas ("RQ02,RQ06" -> ["RQ02", "RQ06"])"""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def add_plan_arguments(parser):
+    """Opções de linha de comando para escolher os campos de detalhe (com --refresh ou --incremental)"""
+    parser.add_argument("--rq", default=None,
+                        help="com --refresh/--incremental, atualiza só os campos destas RQs, separadas por vírgula "
+                             "(ex.: RQ02,RQ06)")
+    parser.add_argument("--columns", default=None,
+                        help="com --refresh/--incremental, atualiza só os campos destas colunas do CSV ou campos GraphQL "
+                             '(ex.: "Stars,Forks")')
+
+
+def plan_from_args(args):
+    return plan_query(split_option(args.rq), split_option(args.columns))
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Escalonador de requisições guiado pelo rate limit do GitHub
+
+Lê X-RateLimit-Remaining/Limit/Reset, Retry-After e o objeto GraphQL
+rateLimit { cost remaining resetAt } para espaçar as requisições: usa todo o
+orçamento disponível sem chegar ao 403 e sem as esperas fixas entre chamadas.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+
+def parse_reset_at(value):
+    """Converte o resetAt do GraphQL (ISO 8601) para timestamp em segundos"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class RateLimitScheduler:
+    """Token bucket com o orçamento primário (por hora) e o limite secundário (por minuto)
+
+    O balde (burst pontos, reposto a points_per_minute) evita o limite
+    secundário do GitHub. Quando o orçamento primário informado pela API não
+    cobre a próxima requisição, a espera vai até o horário de reset.
+    """
+
+    def __init__(self, points_per_minute=2000, burst=100, reserve=0):
+        self.rate = points_per_minute / 60.0
+        self.burst = burst
+        self.reserve = reserve
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.blocked_until = 0.0
+        self.last_cost = None
+        self.total_wait = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve_slot(self, cost=1):
+        """Reserva orçamento para uma requisição e devolve quantos segundos esperar"""
+        with self.lock:
+            now = time.time()
+            self._refill(now)
+            start = max(now, self.blocked_until)
+
+            # Orçamento primário esgotado: só depois do reset
+            if (self.remaining is not None and self.reset_at
+                    and self.remaining - self.reserve < cost and self.reset_at > now):
+                start = max(start, self.reset_at + 1)
+                # Até a próxima resposta, assume a janela nova cheia
+                self.remaining = self.limit
+                self.reset_at = None
+
+            self.tokens -= cost
+            if self.tokens < 0:
+                start = max(start, now + (-self.tokens) / self.rate)
+
+            if self.remaining is not None:
+                self.remaining -= cost
+
+            wait = start - now
+            self.total_wait += wait
+            return wait
+
+    def acquire(self, cost=1):
+        """Bloqueia até que a próxima requisição caiba no orçamento"""
+        wait = self.reserve_slot(cost)
+        if wait > 0:
+            time.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """Atualiza o orçamento a partir dos headers X-RateLimit-* e Retry-After"""
+        with self.lock:
+            remaining = headers.get("X-RateLimit-Remaining")
+            reset = headers.get("X-RateLimit-Reset")
+            limit = headers.get("X-RateLimit-Limit")
+            if limit is not None:
+                self.limit = int(limit)
+            if reset is not None:
+                self._set_remaining(int(remaining) if remaining is not None else None, float(reset))
+            elif remaining is not None:
+                self.remaining = int(remaining)
+
+            retry_after = headers.get("Retry-After")
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, time.time() + float(retry_after))
+
+    def update_from_graphql(self, rate_limit):
+        """Atualiza o orçamento a partir do objeto rateLimit { cost remaining resetAt }"""
+        if not rate_limit:
+            return
+        with self.lock:
+            if rate_limit.get("cost") is not None:
+                self.last_cost = rate_limit["cost"]
+            self._set_remaining(rate_limit.get("remaining"), parse_reset_at(rate_limit.get("resetAt")))
+
+    def update_from_response(self, response, rate_limit=None):
+        """Atualiza o orçamento com os headers e, se informado, o rateLimit já extraído do corpo GraphQL
+
+        O corpo não é decodificado aqui: quem fez a requisição já o decodifica.
+        """
+        self.update_from_headers(response.headers)
+        self.update_from_graphql(rate_limit)
+
+    def _set_remaining(self, remaining, reset_at):
+        # Respostas fora de ordem da mesma janela não podem aumentar o saldo
+        if remaining is None:
+            return
+        if reset_at and self.reset_at and abs(reset_at - self.reset_at) < 1 and self.remaining is not None:
+            self.remaining = min(self.remaining, remaining)
+        else:
+            self.remaining = remaining
+        if reset_at:
+            self.reset_at = reset_at
+
+    def block_for(self, seconds):
+        """Suspende novas requisições pelos próximos segundos (ex.: após um 403)"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+    def wait_time_after_limit(self, response):
+        """Segundos a esperar após uma resposta 403/429 de rate limit"""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            return float(retry_after)
+        reset = response.headers.get("X-RateLimit-Reset")
+        if reset is not None and response.headers.get("X-RateLimit-Remaining") == "0":
+            return max(0.0, float(reset) - time.time()) + 1
+        # Limite secundário sem headers: o GitHub recomenda esperar ao menos 1 minuto
+        return 60.0
+
+    def budget(self):
+        """Métrica com o orçamento atual de rate limit"""
+        with self.lock:
+            self._refill(time.time())
+            return {
+                "limit": self.limit,
+                "remaining": self.remaining,
+                "reset_at": self.reset_at,
+                "last_cost": self.last_cost,
+                "bucket_tokens": round(self.tokens, 2),
+                "total_wait_seconds": round(self.total_wait, 2),
+            }
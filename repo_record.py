@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Registros compactos de repositório para coletas grandes
+
+Os nós GraphQL e os itens da busca REST chegam como dicionários aninhados
+(owner { login }, issues { totalCount }, languages { edges { node ... } }) e,
+no caso do REST, com dezenas de URLs que o coletor não usa. Guardar 100 mil
+deles custa gigabytes. RepoRecord e RestRepoRecord guardam só os campos
+usados, em __slots__, e já achatados: contagens viram int, objetos
+{ name } viram a string e linguagens/tópicos viram tuplas. Linguagens,
+licenças, branches e tópicos (poucos valores distintos, repetidos em
+milhares de repositórios) passam por um vocabulário compartilhado, então
+cada valor existe uma única vez na memória. Valores próprios de cada
+repositório (nome, ID, login do owner) não entram no vocabulário, que assim
+não cresce com o número de repositórios coletados.
+
+Os registros continuam se comportando como o dicionário original (Mapping
+mutável com as mesmas chaves e os mesmos valores aninhados, montados na
+leitura), então o relatório, o Parquet, o snapshot e o diário funcionam
+sem mudanças. Chaves fora de FIELDS são descartadas na conversão.
+"""
+
+from collections.abc import MutableMapping
+
+
+class Vocabulary:
+    """Strings compartilhadas: cada valor distinto é guardado uma única vez"""
+
+    def __init__(self):
+        self.strings = {}
+
+    def intern(self, value):
+        if value is None:
+            return None
+        return self.strings.setdefault(value, value)
+
+    def clear(self):
+        """Esquece os valores (os registros já criados continuam com as próprias referências)"""
+        self.strings.clear()
+
+    def __len__(self):
+        return len(self.strings)
+
+
+# Vocabulário usado por todos os registros (linguagens, licenças, branches e tópicos)
+vocabulary = Vocabulary()
+
+
+def _nested(value, key):
+    return value.get(key) if isinstance(value, dict) else value
+
+
+def _encode_shared(value):
+    return vocabulary.intern(value)
+
+
+def _encode_login(value):
+    return _nested(value, "login")
+
+
+def _decode_login(value):
+    return {"login": value}
+
+
+def _encode_name(value):
+    return vocabulary.intern(_nested(value, "name"))
+
+
+def _decode_name(value):
+    return {"name": value} if value is not None else None
+
+
+def _encode_count(value):
+    return _nested(value, "totalCount")
+
+
+def _decode_count(value):
+    return {"totalCount": value}
+
+
+def _encode_languages(value):
+    """{"edges": [{"node": {"name": n}, "size": s}, ...]} -> (n, s, n, s, ...)"""
+    if value is None:
+        return None
+    flat = []
+    for edge in value.get("edges") or []:
+        flat.append(vocabulary.intern(edge["node"]["name"]))
+        flat.append(edge["size"])
+    return tuple(flat)
+
+
+def _decode_languages(value):
+    if value is None:
+        return None
+    return {"edges": [{"node": {"name": value[i]}, "size": value[i + 1]} for i in range(0, len(value), 2)]}
+
+
+def _encode_topics(value):
+    """{"nodes": [{"topic": {"name": n}}, ...]} -> (n, ...)"""
+    if value is None:
+        return None
+    return tuple(vocabulary.intern(node["topic"]["name"]) for node in value.get("nodes") or [])
+
+
+def _decode_topics(value):
+    if value is None:
+        return None
+    return {"nodes": [{"topic": {"name": name}} for name in value]}
+
+
+def _encode_topic_list(value):
+    return tuple(vocabulary.intern(name) for name in value) if value is not None else None
+
+
+def _decode_topic_list(value):
+    return list(value) if value is not None else None
+
+
+def _identity(value):
+    return value
+
+
+# Tipo de campo -> (codificação ao guardar, decodificação na leitura)
+CODECS = {
+    "value": (_identity, _identity),
+    "shared": (_encode_shared, _identity),
+    "login": (_encode_login, _decode_login),
+    "name": (_encode_name, _decode_name),
+    "count": (_encode_count, _decode_count),
+    "languages": (_encode_languages, _decode_languages),
+    "topics": (_encode_topics, _decode_topics),
+    "topic_list": (_encode_topic_list, _decode_topic_list),
+}
+
+
+class CompactRecord(MutableMapping):
+    """Base dos registros: um slot por chave de FIELDS; slot vazio = chave ausente"""
+
+    __slots__ = ()
+    FIELDS = {}  # chave do JSON -> tipo em CODECS
+
+    @classmethod
+    def from_mapping(cls, data):
+        """Converte o dicionário da API (ou um registro) descartando as chaves não usadas"""
+        if data is None or isinstance(data, cls):
+            return data
+        record = cls()
+        for key, value in data.items():
+            kind = cls.FIELDS.get(key)
+            if kind is not None:
+                setattr(record, key, CODECS[kind][0](value))
+        return record
+
+    def __getitem__(self, key):
+        kind = self.FIELDS.get(key)
+        if kind is None:
+            raise KeyError(key)
+        try:
+            value = getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        return CODECS[kind][1](value)
+
+    def __setitem__(self, key, value):
+        kind = self.FIELDS.get(key)
+        if kind is None:
+            raise KeyError(f"{type(self).__name__} não guarda o campo {key}")
+        setattr(self, key, CODECS[kind][0](value))
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        delattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and hasattr(self, key)
+
+    def __iter__(self):
+        return (key for key in self.FIELDS if hasattr(self, key))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class RepoRecord(CompactRecord):
+    """Nó GraphQL de repositório (busca leve ou fragmento de detalhes)"""
+
+    FIELDS = {
+        "id": "value",
+        "name": "value",
+        "owner": "login",
+        "stargazerCount": "value",
+        "createdAt": "value",
+        "updatedAt": "value",
+        "pushedAt": "value",
+        "primaryLanguage": "name",
+        "releases": "count",
+        "issues": "count",
+        "closedIssues": "count",
+        "totalIssues": "count",
+        "pullRequests": "count",
+        "totalPullRequests": "count",
+        "forkCount": "value",
+        "diskUsage": "value",
+        "hasIssuesEnabled": "value",
+        "hasWikiEnabled": "value",
+        "hasProjectsEnabled": "value",
+        "licenseInfo": "name",
+        "defaultBranchRef": "name",
+        "languages": "languages",
+        "repositoryTopics": "topics",
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class RestRepoRecord(CompactRecord):
+    """Item da busca REST (ou GET /repos) com só os campos da linha do CSV"""
+
+    FIELDS = {
+        "name": "value",
+        "owner": "login",
+        "html_url": "value",
+        "stargazers_count": "value",
+        "forks_count": "value",
+        "watchers_count": "value",
+        "pushed_at": "value",
+        "language": "shared",
+        "license": "name",
+        "size": "value",
+        "default_branch": "shared",
+        "topics": "topic_list",
+    }
+    __slots__ = tuple(FIELDS)
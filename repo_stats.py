@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+Estatísticas das RQs calculadas em streaming, por blocos
+
+Os dados (CSV ou Parquet, um ou vários arquivos) são lidos em blocos de
+chunk_size linhas e resumidos em estruturas mescláveis:
+
+- medianas/quantis: t-digest (TDigest)
+- top linguagens: contagem exata (Counter; a cardinalidade é pequena)
+- correlação: co-momentos acumulados por par de colunas (Correlation)
+
+Resultados parciais de vários shards são combinados com RepoStats.merge ou
+salvos/carregados como JSON (--save / --merge na linha de comando).
+"""
+
+import argparse
+import json
+import math
+import os
+from collections import Counter
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from columnar_writer import CSV_COLUMN_NAMES
+from features import COUNT_COLUMNS, DATE_COLUMNS, compute_features, parse_reference_date, resolve_reference_date
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional; só é exigido ao ler Parquet
+    pq = None
+
+# Colunas resumidas por quantis e usadas na matriz de correlação
+QUANTILE_COLUMNS = [
+    'Repo_Age_Days', 'Pull Requests', 'Merged_PRs_Ratio', 'Releases', 'Forks',
+    'Days_Since_Last_Commit', 'Issues', 'Closed_Issues_Ratio', 'Stars',
+]
+CORRELATION_COLUMNS = ['Stars', 'Forks', 'Watchers', 'Issues', 'Pull Requests', 'Days_Since_Last_Commit']
+# Colunas brutas lidas dos arquivos (as ausentes em CSVs antigos são ignoradas)
+SOURCE_COLUMNS = COUNT_COLUMNS + DATE_COLUMNS + ['Main Language']
+
+
+class TDigest:
+    """t-digest (variante com merge) para quantis aproximados e mescláveis
+
+    Os pontos chegam num buffer; ao comprimir, buffer e centróides são
+    ordenados e fundidos respeitando a função de escala k1, que mantém
+    centróides pequenos nas caudas e maiores perto da mediana.
+    """
+
+    def __init__(self, compression=200, buffer_size=5000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.centroids = []  # [(média, peso)] ordenados pela média
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        self.buffer.append((float(value), weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= self.buffer_size:
+            self.compress()
+
+    def add_many(self, values):
+        """Adiciona um array de valores (NaN são ignorados)"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        # Contagens se repetem muito; cada valor distinto entra uma vez com seu peso
+        unique, counts = np.unique(values, return_counts=True)
+        self.buffer.extend(zip(unique.tolist(), counts.tolist()))
+        self.count += int(values.size)
+        self.min = min(self.min, float(unique[0]))
+        self.max = max(self.max, float(unique[-1]))
+        if len(self.buffer) >= self.buffer_size:
+            self.compress()
+
+    def merge(self, other):
+        other.compress()
+        self.buffer.extend(other.centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.compress()
+
+    def _q_limit(self, q):
+        """Maior quantil que um centróide iniciado em q pode alcançar (k1)"""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def compress(self):
+        if not self.buffer:
+            return
+        points = self.centroids + self.buffer
+        points.sort(key=itemgetter(0))
+        self.buffer = []
+
+        merged = []
+        cumulative = 0
+        limit = self._q_limit(0.0)
+        current_mean, current_weight = points[0]
+        for mean, weight in points[1:]:
+            if (cumulative + current_weight + weight) / self.count <= limit:
+                current_weight += weight
+                current_mean += (mean - current_mean) * weight / current_weight
+            else:
+                merged.append((current_mean, current_weight))
+                cumulative += current_weight
+                limit = self._q_limit(cumulative / self.count)
+                current_mean, current_weight = mean, weight
+        merged.append((current_mean, current_weight))
+        self.centroids = merged
+
+    def quantile(self, q):
+        """Quantil q (0 a 1), interpolando entre os centros dos centróides"""
+        self.compress()
+        if not self.centroids:
+            return math.nan
+        target = q * self.count
+        previous_center = 0.0
+        previous_mean = self.min
+        cumulative = 0
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target <= center:
+                if center == previous_center:
+                    return mean
+                fraction = (target - previous_center) / (center - previous_center)
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+        if cumulative == previous_center:
+            return self.max
+        fraction = (target - previous_center) / (cumulative - previous_center)
+        return previous_mean + fraction * (self.max - previous_mean)
+
+    def to_dict(self):
+        self.compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "centroids": self.centroids,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(compression=data["compression"])
+        digest.count = data["count"]
+        if data["count"]:
+            digest.min = data["min"]
+            digest.max = data["max"]
+        digest.centroids = [tuple(centroid) for centroid in data["centroids"]]
+        return digest
+
+
+class Correlation:
+    """Co-momentos por par de colunas para a correlação de Pearson
+
+    Como o .corr() do pandas, cada par usa só as linhas em que as duas
+    colunas têm valor. Blocos e shards são combinados pela fórmula de Chan.
+    """
+
+    STATS = ("n", "mean_x", "mean_y", "m2_x", "m2_y", "c_xy")
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        size = len(self.columns)
+        for name in self.STATS:
+            setattr(self, name, np.zeros((size, size)))
+
+    def _combine(self, other):
+        n = self.n + other.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(n > 0, other.n / n, 0.0)
+            cross = np.where(n > 0, self.n * other.n / n, 0.0)
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        self.mean_x = self.mean_x + dx * ratio
+        self.mean_y = self.mean_y + dy * ratio
+        self.m2_x = self.m2_x + other.m2_x + dx * dx * cross
+        self.m2_y = self.m2_y + other.m2_y + dy * dy * cross
+        self.c_xy = self.c_xy + other.c_xy + dx * dy * cross
+        self.n = n
+
+    def update(self, values):
+        """Acumula um bloco (array linhas x colunas, NaN para ausentes)"""
+        chunk = Correlation(self.columns)
+        valid = ~np.isnan(values)
+        size = len(self.columns)
+        for i in range(size):
+            for j in range(i, size):
+                mask = valid[:, i] & valid[:, j]
+                count = mask.sum()
+                if not count:
+                    continue
+                x = values[mask, i]
+                y = values[mask, j]
+                mean_x, mean_y = x.mean(), y.mean()
+                chunk.n[i, j] = count
+                chunk.mean_x[i, j] = mean_x
+                chunk.mean_y[i, j] = mean_y
+                chunk.m2_x[i, j] = ((x - mean_x) ** 2).sum()
+                chunk.m2_y[i, j] = ((y - mean_y) ** 2).sum()
+                chunk.c_xy[i, j] = ((x - mean_x) * (y - mean_y)).sum()
+        self._combine(chunk)
+
+    def merge(self, other):
+        self._combine(other)
+
+    def matrix(self):
+        """Matriz de correlação como DataFrame (NaN onde a variância é zero)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            upper = self.c_xy / np.sqrt(self.m2_x * self.m2_y)
+        upper = np.triu(np.clip(upper, -1.0, 1.0))
+        corr = upper + np.triu(upper, 1).T
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def to_dict(self):
+        data = {name: getattr(self, name).tolist() for name in self.STATS}
+        data["columns"] = self.columns
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        correlation = cls(data["columns"])
+        for name in cls.STATS:
+            setattr(correlation, name, np.array(data[name], dtype=float))
+        return correlation
+
+
+class RepoStats:
+    """Resumo mesclável das métricas das RQ01–RQ06"""
+
+    def __init__(self, compression=200):
+        self.rows = 0
+        self.digests = {column: TDigest(compression) for column in QUANTILE_COLUMNS}
+        self.languages = Counter()
+        self.correlation = Correlation(CORRELATION_COLUMNS)
+
+    def update(self, chunk):
+        """Acumula um bloco já com as métricas derivadas (features.compute_features)"""
+        self.rows += len(chunk)
+        for column, digest in self.digests.items():
+            digest.add_many(pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float))
+        self.languages.update(chunk['Main Language'].dropna().tolist())
+        values = chunk[CORRELATION_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        self.correlation.update(values)
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column, digest in self.digests.items():
+            digest.merge(other.digests[column])
+        self.languages.update(other.languages)
+        self.correlation.merge(other.correlation)
+        return self
+
+    def median(self, column):
+        return self.digests[column].quantile(0.5)
+
+    def top_languages(self, n=10):
+        return self.languages.most_common(n)
+
+    def summary(self):
+        return {
+            "rows": self.rows,
+            "quantiles": {
+                column: {
+                    "p25": digest.quantile(0.25),
+                    "median": digest.quantile(0.5),
+                    "p75": digest.quantile(0.75),
+                }
+                for column, digest in self.digests.items()
+            },
+            "top_languages": self.top_languages(),
+            "correlation": self.correlation.matrix().round(4).to_dict(),
+        }
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "digests": {column: digest.to_dict() for column, digest in self.digests.items()},
+            "languages": dict(self.languages),
+            "correlation": self.correlation.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.rows = data["rows"]
+        stats.digests = {column: TDigest.from_dict(digest) for column, digest in data["digests"].items()}
+        stats.languages = Counter(data["languages"])
+        stats.correlation = Correlation.from_dict(data["correlation"])
+        return stats
+
+
+def iter_chunks(path, chunk_size=100000):
+    """Lê um CSV ou Parquet em blocos só com as colunas usadas"""
+    if path.endswith('.parquet'):
+        if pq is None:
+            raise ImportError("pyarrow é necessário para ler Parquet (pip install pyarrow)")
+        parquet_names = {csv_name: name for name, csv_name in CSV_COLUMN_NAMES.items()}
+        columns = [parquet_names[column] for column in SOURCE_COLUMNS]
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas().rename(columns=CSV_COLUMN_NAMES)
+    else:
+        yield from pd.read_csv(path, usecols=lambda column: column in SOURCE_COLUMNS, chunksize=chunk_size)
+
+
+def compute_stats(paths, chunk_size=100000, reference_date=None):
+    """Calcula o resumo de um ou vários arquivos em uma passada por blocos
+
+    Sem reference_date, cada arquivo usa a própria data da coleta (features.resolve_reference_date).
+    """
+    stats = RepoStats()
+    for path in paths:
+        reference = resolve_reference_date(path, reference_date)
+        for chunk in iter_chunks(path, chunk_size):
+            stats.update(compute_features(chunk, reference))
+    return stats
+
+
+def print_summary(stats):
+    print("===== Estatísticas Resumidas =====")
+    print("Repositórios:", stats.rows)
+    print("Idade em dias (mediana):", stats.median('Repo_Age_Days'))
+    print("Dias desde último commit (mediana):", stats.median('Days_Since_Last_Commit'))
+    print("Pull Requests (mediana):", stats.median('Pull Requests'))
+    print("PRs aceitos / total (mediana):", stats.median('Merged_PRs_Ratio'))
+    print("Releases (mediana):", stats.median('Releases'))
+    print("Forks (mediana):", stats.median('Forks'))
+    print("Issues (mediana):", stats.median('Issues'))
+    print("Issues fechadas / total (mediana):", stats.median('Closed_Issues_Ratio'))
+    print("Top 10 linguagens:")
+    for language, count in stats.top_languages():
+        print(f"  {language}: {count}")
+    print("Correlação:")
+    print(stats.correlation.matrix().round(2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estatísticas das RQs em streaming (CSV/Parquet, vários shards)")
+    parser.add_argument("paths", nargs="*", help="arquivos CSV ou Parquet a resumir")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="linhas lidas por bloco")
+    parser.add_argument("--merge", nargs="*", default=[], help="resumos parciais (JSON) a combinar")
+    parser.add_argument("--save", default=None, help="grava o resumo mesclável neste JSON")
+    parser.add_argument("--reference-date", type=parse_reference_date, default=None,
+                        help="data de referência AAAA-MM-DD para as métricas em dias (padrão: data da coleta gravada no arquivo)")
+    args = parser.parse_args()
+
+    stats = compute_stats(args.paths, args.chunk_size, args.reference_date)
+    for partial_path in args.merge:
+        with open(partial_path, 'r', encoding='utf-8') as f:
+            stats.merge(RepoStats.from_dict(json.load(f)))
+
+    if args.save:
+        tmp_path = args.save + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stats.to_dict(), f)
+        os.replace(tmp_path, args.save)
+
+    print_summary(stats)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Cache persistente de respostas da API do GitHub em SQLite
+
+As entradas são indexadas por (endpoint, hash da query, variáveis) no GraphQL
+e pela URL completa no REST, então um servidor local de testes e a API real
+não compartilham respostas no mesmo arquivo. O TTL de cada entrada é o menor
+TTL entre os campos consultados, e o arquivo é limitado por número de
+entradas com descarte LRU. Os acessos de leitura só são gravados em lote
+(antes do descarte ou a cada ACCESS_FLUSH_SIZE leituras). Entradas REST
+guardam o ETag para revalidação com If-None-Match (respostas 304 não contam
+no rate limit).
+
+O cache é opcional nos coletores (--cache ARQUIVO): dentro do TTL, uma nova
+execução devolve as contagens gravadas, não as atuais. summary() informa
+quantas respostas vieram do cache e a idade da mais antiga.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# TTL por campo: contagens mudam rápido, metadados quase nunca
+FIELD_TTLS = {
+    "search": 1 * HOUR,
+    "stargazerCount": 6 * HOUR,
+    "forkCount": 6 * HOUR,
+    "issues": 6 * HOUR,
+    "pullRequests": 6 * HOUR,
+    "pushedAt": 6 * HOUR,
+    "updatedAt": 6 * HOUR,
+    "releases": 1 * DAY,
+    "diskUsage": 1 * DAY,
+    "languages": 7 * DAY,
+    "repositoryTopics": 7 * DAY,
+    "licenseInfo": 7 * DAY,
+    "defaultBranchRef": 7 * DAY,
+    "createdAt": 30 * DAY,
+}
+DEFAULT_TTL = 6 * HOUR
+REST_TTL = 6 * HOUR
+
+# Leituras acumuladas antes de gravar os horários de acesso (LRU) no SQLite
+ACCESS_FLUSH_SIZE = 500
+
+
+class CachedResponse:
+    """Resposta servida do cache, com a mesma interface usada de requests.Response"""
+
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {}
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def ttl_for_query(query, field_ttls=FIELD_TTLS, default=DEFAULT_TTL):
+    """Menor TTL entre os campos presentes na query"""
+    ttls = [ttl for field, ttl in field_ttls.items() if re.search(rf"\b{field}\b", query)]
+    return min(ttls) if ttls else default
+
+
+class ResponseCache:
+    """Cache de respostas em SQLite com TTL e descarte LRU por número de entradas"""
+
+    def __init__(self, path="github_cache.sqlite", max_entries=50000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.oldest_hit = None  # stored_at da resposta mais antiga servida do cache
+        self.pending_access = {}  # chave -> horário da última leitura ainda não gravado
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                stored_at REAL
+            )
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(entries)")]
+        if "stored_at" not in columns:  # arquivos de versões anteriores
+            self.conn.execute("ALTER TABLE entries ADD COLUMN stored_at REAL")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(query, variables=None, endpoint=""):
+        """Chave a partir do endpoint, do hash da query e das variáveis
+        
+        No REST, query é a URL completa (que já inclui o endpoint).
+        """
+        query_hash = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        payload = json.dumps(variables or {}, sort_keys=True)
+        return hashlib.sha256(f"{endpoint}:{query_hash}:{payload}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Devolve (corpo, etag, ainda_válido) ou None se a chave não existir"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, etag, expires_at, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            self.pending_access[key] = now
+            if len(self.pending_access) >= ACCESS_FLUSH_SIZE:
+                self._flush_access()
+                self.conn.commit()
+            body, etag, expires_at, stored_at = row
+            fresh = expires_at > now
+            if fresh:
+                self.hits += 1
+                if stored_at is not None and (self.oldest_hit is None or stored_at < self.oldest_hit):
+                    self.oldest_hit = stored_at
+            else:
+                self.misses += 1
+            return bytes(body), etag, fresh
+
+    def _flush_access(self):
+        """Grava os horários de leitura pendentes (chamado com o lock, sem commit)"""
+        if self.pending_access:
+            self.conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                  [(accessed, key) for key, accessed in self.pending_access.items()])
+            self.pending_access.clear()
+
+    def put(self, key, body, ttl, etag=None):
+        """Grava uma resposta e descarta as entradas menos usadas se passar do limite"""
+        with self.lock:
+            now = time.time()
+            self.pending_access.pop(key, None)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, body, etag, expires_at, last_access, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, etag, now + ttl, now, now),
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                # O descarte LRU precisa dos acessos mais recentes
+                self._flush_access()
+                self.conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self.conn.commit()
+
+    def touch(self, key, ttl):
+        """Renova a validade de uma entrada (ex.: após um 304 Not Modified, que a confirma atual)"""
+        with self.lock:
+            now = time.time()
+            self.pending_access.pop(key, None)
+            self.conn.execute(
+                "UPDATE entries SET expires_at = ?, last_access = ?, stored_at = ? WHERE key = ?",
+                (now + ttl, now, now, key),
+            )
+            self.conn.commit()
+            self.revalidated += 1
+
+    def stats(self):
+        oldest_hit_age = time.time() - self.oldest_hit if self.oldest_hit is not None else None
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated,
+                "oldest_hit_age": oldest_hit_age}
+
+    def summary(self):
+        """Linha para o resumo da execução: respostas servidas do cache e a idade da mais antiga"""
+        stats = self.stats()
+        text = f"Cache de respostas ({self.path}): {stats['hits']} respostas servidas do cache"
+        if stats["oldest_hit_age"] is not None:
+            text += f", a mais antiga gravada há {stats['oldest_hit_age'] / HOUR:.1f} h"
+        if stats["revalidated"]:
+            text += f"; {stats['revalidated']} revalidadas (304)"
+        return text
+
+    def close(self):
+        with self.lock:
+            self._flush_access()
+            self.conn.commit()
+            self.conn.close()
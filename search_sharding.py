@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Busca fatiada por faixas de estrelas
+
+A busca do GitHub devolve no máximo 1.000 resultados por query. Para coletar
+além disso, o espaço de estrelas é dividido em faixas adjacentes
+(stars:A..B), cada uma com menos resultados que o limite. O tamanho de cada
+faixa é escolhido amostrando repositoryCount; as faixas são planejadas do
+topo para baixo até somar max_repos e depois mescladas por estrelas.
+"""
+
+SEARCH_RESULT_CAP = 1000  # resultados que a busca do GitHub devolve por query
+SHARD_CAP = 900  # folga para contagens que mudam durante a coleta
+ACCEPT_RATIO = 0.6  # faixa aceita sem refinar se tiver ao menos 60% do limite
+MIN_STARS = 2  # equivalente a stars:>1 da busca sem fatias
+
+
+def star_range_query(low, high):
+    """Query de busca restrita a uma faixa de estrelas (inclusive)"""
+    return f"stars:{low}..{high} sort:stars-desc is:public"
+
+
+def find_shard_floor(count_in_range, high, shard_cap=SHARD_CAP, min_stars=MIN_STARS, guess=None):
+    """Menor limite inferior com count_in_range(limite, high) <= shard_cap
+
+    Bisseção sobre o limite inferior, começando pelo palpite. Qualquer faixa
+    com pelo menos ACCEPT_RATIO * shard_cap resultados é aceita sem continuar
+    refinando. Devolve (limite, contagem); se nem a faixa de um único valor
+    (high..high) couber no limite, devolve essa faixa mesmo assim.
+    """
+    lower, upper = min_stars, high
+    floor = min(max(guess if guess is not None else (min_stars + high) // 2, min_stars), high)
+    best = None
+    while True:
+        count = count_in_range(floor, high)
+        if count <= shard_cap:
+            best = (floor, count)
+            if count >= ACCEPT_RATIO * shard_cap:
+                break
+            upper = floor - 1
+        else:
+            lower = floor + 1
+        if lower > upper:
+            break
+        floor = (lower + upper) // 2
+
+    if best is None:
+        # Só sobra lower > high quando a última amostra foi high..high
+        return high, count
+    return best
+
+
+def plan_star_shards(count_in_range, max_stars, max_repos, shard_cap=SHARD_CAP, min_stars=MIN_STARS):
+    """Gera faixas (inferior, superior, contagem) do topo até somar max_repos
+
+    count_in_range(inferior, superior) devolve o repositoryCount da faixa. O
+    palpite de cada faixa vem da densidade (repositórios por estrela) da
+    anterior, então em geral bastam poucas amostras por faixa.
+    """
+    high = max_stars
+    planned = 0
+    guess = None
+    while high >= min_stars and planned < max_repos:
+        low, count = find_shard_floor(count_in_range, high, shard_cap, min_stars, guess)
+        if count > shard_cap:
+            print(f"Aviso: {count} repositórios com exatamente {high} estrelas; "
+                  f"só os {SEARCH_RESULT_CAP} primeiros serão coletados")
+        yield low, high, count
+        planned += count
+
+        width = high - low + 1
+        high = low - 1
+        # A densidade cresce para baixo; a bisseção corrige o palpite
+        guess = high - max(1, int(width * shard_cap / max(count, 1))) + 1
+
+
+def merge_shards(shard_results, max_repos):
+    """Mescla as listas das faixas por estrelas (decrescente), sem duplicatas
+
+    Um repositório pode aparecer em duas faixas se ganhou estrelas entre uma
+    consulta e outra; fica a primeira ocorrência após a ordenação.
+    """
+    merged = []
+    for repos in shard_results:
+        merged.extend(repos)
+    merged.sort(key=lambda repo: repo.get("stargazerCount") or 0, reverse=True)
+
+    seen = set()
+    unique = []
+    for repo in merged:
+        key = (repo["owner"]["login"], repo["name"])
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(repo)
+    return unique[:max_repos]
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Histórico append-only das métricas dos repositórios
+
+Cada coleta vira uma partição Parquet (zstd) em history/date=AAAA-MM-DD/,
+contendo só os repositórios cujas métricas mudaram desde a última
+observação gravada (deltas deduplicados por repositório). Um índice SQLite
+guarda, por repositório e data, as métricas mais consultadas e o arquivo da
+partição, de forma que séries temporais e rankings de crescimento são
+respondidos pelo índice sem ler todas as partições.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from datetime import date, timedelta
+
+from columnar_writer import pa, pq, repo_to_record, require_pyarrow
+from query_planner import has_all_fields
+
+HISTORY_DIR = "history"
+INDEX_FILE = "index.sqlite"
+
+# Métricas gravadas no histórico; uma mudança em qualquer uma gera um delta
+METRIC_FIELDS = [
+    "stars", "forks", "watchers", "releases", "size_kb",
+    "open_issues", "closed_issues", "total_issues", "merged_prs", "total_prs",
+]
+# Métricas copiadas no índice (consultas sem abrir os arquivos Parquet)
+INDEXED_METRICS = ["stars", "forks", "total_issues", "total_prs"]
+
+
+def history_schema():
+    require_pyarrow()
+    return pa.schema(
+        [("collected_on", pa.date32()), ("owner", pa.string()), ("name", pa.string()), ("rank", pa.int32())]
+        + [(field, pa.int64()) for field in METRIC_FIELDS]
+        + [("pushed_at", pa.timestamp("s", tz="UTC"))]
+    )
+
+
+class SnapshotStore:
+    """Partições Parquet por data de coleta + índice SQLite por repositório"""
+
+    def __init__(self, path=HISTORY_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(path, INDEX_FILE), check_same_thread=False)
+        metric_columns = ", ".join(f"{metric} INTEGER" for metric in INDEXED_METRICS)
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS repos (
+                repo_id INTEGER PRIMARY KEY,
+                owner TEXT NOT NULL,
+                name TEXT NOT NULL,
+                UNIQUE (owner, name)
+            );
+            CREATE TABLE IF NOT EXISTS observations (
+                repo_id INTEGER NOT NULL,
+                collected_on TEXT NOT NULL,
+                {metric_columns},
+                part TEXT NOT NULL,
+                PRIMARY KEY (repo_id, collected_on)
+            );
+            CREATE INDEX IF NOT EXISTS observations_date ON observations (collected_on);
+            CREATE TABLE IF NOT EXISTS latest (
+                repo_id INTEGER PRIMARY KEY,
+                collected_on TEXT NOT NULL,
+                metrics TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                collected_on TEXT NOT NULL,
+                part TEXT,
+                repos_seen INTEGER NOT NULL,
+                rows_written INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def _repo_id(self, owner, name):
+        self.conn.execute("INSERT OR IGNORE INTO repos (owner, name) VALUES (?, ?)", (owner, name))
+        return self.conn.execute(
+            "SELECT repo_id FROM repos WHERE owner = ? AND name = ?", (owner, name)
+        ).fetchone()[0]
+
+    def append(self, basic_repos, details, collected_on=None):
+        """Grava a coleta como partição de deltas e atualiza o índice
+
+        basic_repos dá a ordem do ranking e details é {(owner, nome): detalhes
+        GraphQL}, como devolvido pelo coletor. Só repositórios com alguma
+        métrica diferente da última observação são gravados; registros
+        parciais (sem todos os campos do fragmento completo) ficam de fora
+        para não gravar métricas nulas. Devolve o número de linhas gravadas.
+        """
+        collected_on = collected_on or date.today()
+        day = collected_on.isoformat()
+
+        with self.lock:
+            rows = []
+            index_rows = []
+            for rank, basic_repo in enumerate(basic_repos, 1):
+                key = (basic_repo["owner"]["login"], basic_repo["name"])
+                repo = details.get(key)
+                if not isinstance(repo, Mapping) or not has_all_fields(repo):
+                    continue
+                record = repo_to_record(rank, key[0], key[1], repo)
+                metrics = [record[field] for field in METRIC_FIELDS]
+                repo_id = self._repo_id(*key)
+                previous = self.conn.execute(
+                    "SELECT metrics FROM latest WHERE repo_id = ?", (repo_id,)
+                ).fetchone()
+                if previous is not None and json.loads(previous[0]) == metrics:
+                    continue
+                rows.append({"collected_on": collected_on, "owner": key[0], "name": key[1], "rank": rank,
+                             "pushed_at": record["pushed_at"], **dict(zip(METRIC_FIELDS, metrics))})
+                index_rows.append((repo_id, metrics))
+
+            part = self._write_partition(day, rows) if rows else None
+            for repo_id, metrics in index_rows:
+                values = dict(zip(METRIC_FIELDS, metrics))
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO observations (repo_id, collected_on, {', '.join(INDEXED_METRICS)}, part) "
+                    f"VALUES (?, ?, {', '.join('?' for _ in INDEXED_METRICS)}, ?)",
+                    (repo_id, day, *[values[metric] for metric in INDEXED_METRICS], part),
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO latest (repo_id, collected_on, metrics) VALUES (?, ?, ?)",
+                    (repo_id, day, json.dumps(metrics)),
+                )
+            self.conn.execute(
+                "INSERT INTO snapshots (collected_on, part, repos_seen, rows_written) VALUES (?, ?, ?, ?)",
+                (day, part, len(basic_repos), len(rows)),
+            )
+            self.conn.commit()
+        return len(rows)
+
+    def _write_partition(self, day, rows):
+        """Grava um novo arquivo na partição do dia (nunca sobrescreve) e devolve o caminho relativo"""
+        directory = os.path.join(self.path, f"date={day}")
+        os.makedirs(directory, exist_ok=True)
+        number = len([name for name in os.listdir(directory) if name.endswith(".parquet")])
+        part = os.path.join(f"date={day}", f"part-{number:04d}.parquet")
+        path = os.path.join(self.path, part)
+        tmp_path = path + ".tmp"
+        table = pa.Table.from_pylist(rows, schema=history_schema())
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        return part
+
+    def series(self, owner, name, metric="stars"):
+        """Série [(data, valor)] de uma métrica nas datas com delta gravado para o repositório"""
+        if metric in INDEXED_METRICS:
+            rows = self.conn.execute(
+                f"SELECT o.collected_on, o.{metric} FROM observations o "
+                "JOIN repos r ON r.repo_id = o.repo_id "
+                "WHERE r.owner = ? AND r.name = ? ORDER BY o.collected_on",
+                (owner, name),
+            ).fetchall()
+            return [(date.fromisoformat(day), value) for day, value in rows]
+
+        # Demais métricas: lê só as partições em que o repositório aparece
+        if metric not in METRIC_FIELDS:
+            raise ValueError(f"Métrica desconhecida: {metric}")
+        parts = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT o.part FROM observations o JOIN repos r ON r.repo_id = o.repo_id "
+            "WHERE r.owner = ? AND r.name = ?", (owner, name),
+        )]
+        values = {}
+        for part in sorted(parts):
+            table = pq.read_table(os.path.join(self.path, part), columns=["collected_on", metric],
+                                  filters=[("owner", "=", owner), ("name", "=", name)])
+            for row in table.to_pylist():
+                values[row["collected_on"]] = row[metric]
+        return sorted(values.items())
+
+    def top_growers(self, days=30, metric="stars", as_of=None, limit=10):
+        """Repositórios que mais cresceram em metric nos últimos days dias
+
+        Compara o último valor até as_of com o último valor até as_of - days;
+        repositórios sem observação antes do início da janela ficam de fora.
+        Cada valor vem de uma única passada pelas observações até a data
+        (ROW_NUMBER por repositório), e não de subconsultas por repositório.
+        Devolve [(owner, nome, valor_inicial, valor_final, crescimento)].
+        """
+        if metric not in INDEXED_METRICS:
+            raise ValueError(f"top_growers usa métricas do índice: {', '.join(INDEXED_METRICS)}")
+        as_of = as_of or date.today()
+        start = as_of - timedelta(days=days)
+
+        def last_value_until(alias):
+            return (f"SELECT repo_id, value FROM ("
+                    f"  SELECT repo_id, {metric} AS value,"
+                    f"    ROW_NUMBER() OVER (PARTITION BY repo_id ORDER BY collected_on DESC) AS position"
+                    f"  FROM observations WHERE collected_on <= :{alias}"
+                    f") WHERE position = 1")
+
+        rows = self.conn.execute(
+            f"WITH start_values AS ({last_value_until('start')}), end_values AS ({last_value_until('end')}) "
+            f"SELECT r.owner, r.name, s.value, e.value, e.value - s.value AS growth "
+            f"FROM start_values s JOIN end_values e USING (repo_id) JOIN repos r USING (repo_id) "
+            f"WHERE s.value IS NOT NULL AND e.value IS NOT NULL "
+            f"ORDER BY growth DESC, r.owner, r.name LIMIT :limit",
+            {"start": start.isoformat(), "end": as_of.isoformat(), "limit": limit},
+        ).fetchall()
+        return rows
+
+    def snapshots(self):
+        """Coletas registradas: [(data, partição, repositórios vistos, linhas gravadas)]"""
+        return self.conn.execute(
+            "SELECT collected_on, part, repos_seen, rows_written FROM snapshots ORDER BY rowid"
+        ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Consultas ao histórico de métricas dos repositórios")
+    parser.add_argument("--history", default=HISTORY_DIR, help="pasta do histórico")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    series_parser = subparsers.add_parser("series", help="série temporal de uma métrica")
+    series_parser.add_argument("repo", help="owner/nome")
+    series_parser.add_argument("--metric", default="stars", choices=METRIC_FIELDS)
+    growers_parser = subparsers.add_parser("growers", help="repositórios que mais cresceram")
+    growers_parser.add_argument("--days", type=int, default=30)
+    growers_parser.add_argument("--metric", default="stars", choices=INDEXED_METRICS)
+    growers_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.history)
+    try:
+        if args.command == "series":
+            owner, name = args.repo.split("/", 1)
+            for day, value in store.series(owner, name, args.metric):
+                print(f"{day}  {value}")
+        else:
+            for owner, name, start_value, end_value, growth in store.top_growers(args.days, args.metric,
+                                                                                 limit=args.limit):
+                print(f"{owner}/{name}: {start_value} -> {end_value} (+{growth})")
+    finally:
+        store.close()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures dos testes: o servidor local de benchmarks/mock_github.py e os
+coletores (graphql.py, main.py) apontados para ele
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# Lidos na importação dos coletores
+os.environ.setdefault("TOKEN", "test-token")
+os.environ.setdefault("GITHUB_GRAPHQL_URL", "http://127.0.0.1:9/graphql")
+os.environ.setdefault("GITHUB_API_URL", "http://127.0.0.1:9")
+
+import graphql  # noqa: E402
+import main  # noqa: E402
+from mock_github import MockGitHub  # noqa: E402
+from query_planner import full_plan  # noqa: E402
+from token_pool import TokenPool  # noqa: E402
+
+TEST_TOKEN = "test-token"
+
+
+@pytest.fixture
+def mock_github(monkeypatch, tmp_path):
+    """Servidor local com 200 repositórios; os coletores usam um token com orçamento alto
+
+    O diretório de trabalho é tmp_path, para que os arquivos auxiliares dos
+    coletores (estatísticas, .tmp) não caiam no repositório.
+    """
+    mock = MockGitHub(repos=200, rate_limit=1000000)
+    base_url = mock.start()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(graphql, "GRAPHQL_URL", f"{base_url}/graphql")
+    monkeypatch.setattr(graphql, "token", TEST_TOKEN)
+    monkeypatch.setattr(graphql, "token_pool", TokenPool([TEST_TOKEN], points_per_minute=1000000, burst=1000))
+    monkeypatch.setattr(graphql, "response_cache", None)
+    monkeypatch.setattr(graphql, "details_plan", full_plan())
+    monkeypatch.setattr(main, "GITHUB_API_URL", base_url)
+    monkeypatch.setattr(main, "tokens", [TEST_TOKEN])
+    monkeypatch.setattr(main, "search_pool", TokenPool([TEST_TOKEN], points_per_minute=1000000, burst=1000))
+    monkeypatch.setattr(main, "core_pool", TokenPool([TEST_TOKEN], points_per_minute=1000000, burst=1000))
+    monkeypatch.setattr(main, "response_cache", None)
+    yield mock
+    mock.stop()
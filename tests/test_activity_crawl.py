@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Coleta de atividade: itens paginados e contagens por janela gravados com a janela de submissão limitada"""
+
+import pyarrow.parquet as pq
+
+import graphql
+from activity_crawl import WINDOW_METRICS, crawl_activity
+
+
+def test_crawl_activity_writes_items_windows_and_digests(mock_github, tmp_path):
+    repos = [(repo["owner"]["login"], repo["name"]) for repo in mock_github.repos[:7]]
+    items_path, windows_path = str(tmp_path / "items.parquet"), str(tmp_path / "windows.parquet")
+
+    # Um worker: só dois repositórios submetidos por vez, o resto entra conforme terminam
+    digests = crawl_activity(repos, graphql.token, items_path, windows_path, max_items=150, months=3, workers=1)
+
+    items = pq.read_table(items_path).to_pandas()
+    windows = pq.read_table(windows_path).to_pandas()
+    for owner, name in repos:
+        repo = mock_github.by_key[(owner, name)]
+        repo_items = items[(items["owner"] == owner) & (items["name"] == name)]
+        assert (repo_items["kind"] == "issue").sum() == min(150, repo["totalIssues"]["totalCount"])
+        assert (repo_items["kind"] == "pr").sum() == min(150, repo["totalPullRequests"]["totalCount"])
+    assert len(windows) == len(repos) * 3 * len(WINDOW_METRICS)
+    assert windows["count"].notna().all()
+
+    issues, prs = items[items["kind"] == "issue"], items[items["kind"] == "pr"]
+    assert digests["time_to_close"].count == issues["closed_at"].notna().sum()
+    assert digests["merge_latency"].count == prs["merged_at"].notna().sum()
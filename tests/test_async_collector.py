@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Coletor assíncrono: mesmo relatório e CSV que o coletor síncrono de graphql.py"""
+
+import asyncio
+import re
+
+import pytest
+
+import graphql
+from async_collector import collect_and_print_repo_info_async
+from crawl_journal import CrawlJournal
+
+
+def read(path):
+    """Conteúdo do arquivo sem o instante da coleta, que difere entre as duas execuções"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return re.sub(r"^(Data da coleta: |.*,)\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ$", r"\1", text, flags=re.MULTILINE)
+
+
+@pytest.mark.parametrize("batch_size", [None, 10])
+def test_async_report_matches_sync_collector(mock_github, tmp_path, batch_size):
+    repos = graphql.get_top_starred_repos_graphql(max_repos=40)
+
+    graphql.collect_and_print_repo_info(repos, str(tmp_path / "sync.txt"), batch_size=batch_size)
+    graphql.txt_to_csv_with_issues_prs(str(tmp_path / "sync.txt"), str(tmp_path / "sync.csv"))
+
+    written = asyncio.run(collect_and_print_repo_info_async(
+        repos, str(tmp_path / "async.txt"), concurrency=4, batch_size=batch_size,
+        csv_path=str(tmp_path / "async.csv")))
+
+    assert len(written) == 40
+    assert read(tmp_path / "async.txt") == read(tmp_path / "sync.txt")
+    assert read(tmp_path / "async.csv") == read(tmp_path / "sync.csv")
+
+
+def test_async_collector_skips_journaled_repos(mock_github, tmp_path):
+    repos = graphql.get_top_starred_repos_graphql(max_repos=20)
+    journal_path = str(tmp_path / "journal.jsonl")
+
+    journal = CrawlJournal(journal_path)
+    asyncio.run(collect_and_print_repo_info_async(repos[:10], str(tmp_path / "first.txt"), journal=journal))
+    journal.close()
+
+    requests_before = mock_github.stats["requests"]
+    journal = CrawlJournal(journal_path, resume=True)
+    written = asyncio.run(collect_and_print_repo_info_async(repos, str(tmp_path / "report.txt"), journal=journal))
+    journal.close()
+
+    # Só os 10 repositórios fora do diário são buscados
+    assert mock_github.stats["requests"] - requests_before == 10
+    assert len(written) == 20
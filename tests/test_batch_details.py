@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""Detalhes em lote com aliases: erros parciais e contagens nulas não descartam o lote"""
+
+import graphql
+
+
+def test_failed_alias_keeps_the_rest_of_the_batch(mock_github):
+    keys = [(repo["owner"]["login"], repo["name"]) for repo in mock_github.repos[:10]]
+    keys.insert(4, ("owner-x", "missing"))
+    basic_repos = [{"owner": {"login": owner}, "name": name} for owner, name in keys]
+
+    details = graphql.get_repos_details_batch_graphql(basic_repos, graphql.token, batch_size=25)
+
+    assert set(details) == set(keys) - {("owner-x", "missing")}
+    for key, repo in details.items():
+        assert repo["stargazerCount"] == mock_github.by_key[key]["stargazerCount"]
+    # Um lote, mais só o alias com erro buscado individualmente
+    assert mock_github.stats["requests"] == 2
+
+
+def test_null_counts_are_filled_in_one_follow_up(mock_github):
+    repos = mock_github.repos[:10]
+    null_keys = {(repo["owner"]["login"], repo["name"]) for repo in repos[2:5]}
+    mock_github.null_counts = null_keys
+
+    details = graphql.get_repos_details_batch_graphql(repos, graphql.token, batch_size=25)
+
+    assert len(details) == 10
+    for key in null_keys:
+        assert details[key]["closedIssues"] == mock_github.by_key[key]["closedIssues"]
+    # Erro parcial em um campo interno: o lote vale, e as contagens vêm de um único acompanhamento
+    assert mock_github.stats["requests"] == 2
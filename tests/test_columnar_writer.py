@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""RepoParquetWriter: row groups gravados durante a coleta, arquivo publicado só no close()"""
+
+import os
+
+import pyarrow.parquet as pq
+
+from columnar_writer import RepoParquetWriter, repo_to_record
+from mock_github import make_dataset
+
+
+def test_row_groups_are_flushed_and_published_on_close(tmp_path):
+    path = str(tmp_path / "repos.parquet")
+    repos = make_dataset(25)
+    writer = RepoParquetWriter(path, row_group_size=10)
+    for rank, repo in enumerate(repos, 1):
+        writer.write(repo_to_record(rank, repo["owner"]["login"], repo["name"], repo))
+
+    assert writer.rows_written == 20 and len(writer.buffer) == 5
+    assert not os.path.exists(path)
+
+    writer.close()
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3 and parquet.metadata.num_rows == 25
+    assert not os.path.exists(path + ".tmp")
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""--resume: a busca continua do último cursor e os repositórios do diário não são buscados de novo"""
+
+import graphql
+from crawl_journal import CrawlJournal
+
+
+def record_requested_repos(mock):
+    """Lista (owner, nome) pedidos nos lotes de detalhes do servidor"""
+    requested = []
+    handle = mock.graphql
+
+    def graphql_with_log(body):
+        variables = body.get("variables") or {}
+        requested.extend((owner, variables[f"n{key[1:]}"]) for key, owner in variables.items()
+                         if key.startswith("o") and key[1:].isdigit())
+        return handle(body)
+
+    mock.graphql = graphql_with_log
+    return requested
+
+
+def test_resume_skips_journaled_pages_and_repos(mock_github, tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    report = str(tmp_path / "report.txt")
+
+    # Execução interrompida: 2 páginas da busca e os detalhes de 20 repositórios
+    journal = CrawlJournal(path)
+    repos = graphql.get_top_starred_repos_graphql(max_repos=100, per_page=50, journal=journal)
+    graphql.get_repos_details_batch_graphql(repos[:20], graphql.token,
+                                            on_result=graphql.journal_recorder(journal))
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "repo", "owner": "owner-1", "na')  # linha incompleta da queda
+
+    requested = record_requested_repos(mock_github)
+    requests_before = mock_github.stats["requests"]
+    journal = CrawlJournal(path, resume=True)
+    assert len(journal.pages) == 2 and len(journal.repos) == 20
+
+    repos = graphql.get_top_starred_repos_graphql(max_repos=200, per_page=50, journal=journal)
+    search_requests = mock_github.stats["requests"] - requests_before
+    written = graphql.collect_and_print_repo_info(repos, report, batch_size=25, journal=journal)
+    journal.close()
+
+    assert search_requests == 2
+    assert [repo["name"] for repo in repos] == [repo["name"] for repo in mock_github.repos[:200]]
+    assert len(written) == 200
+    journaled = {(repo["owner"]["login"], repo["name"]) for repo in repos[:20]}
+    assert len(requested) == 180 and not journaled & set(requested)
+
+    # O diário retomado continua legível depois da linha incompleta descartada
+    journal = CrawlJournal(path, resume=True)
+    journal.close()
+    assert len(journal.repos) == 200
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Data de referência das métricas em dias: a data da coleta gravada nos dados, ou a explícita"""
+
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import graphql
+from features import load_features
+from repo_stats import compute_stats
+
+ROWS = {"Created At": ["2020-01-01T00:00:00Z"], "Last Commit Date": ["2020-01-11T00:00:00Z"],
+        "Main Language": ["Python"], "Collected At": ["2020-01-21T00:00:00Z"]}
+
+
+def test_reference_date_defaults_to_collection_date(tmp_path):
+    csv_path = str(tmp_path / "repos.csv")
+    pd.DataFrame(ROWS).to_csv(csv_path, index=False)
+
+    df = load_features(csv_path, None, cache_dir=str(tmp_path / "cache"))
+    assert df["Repo_Age_Days"].iloc[0] == 20
+    assert df["Days_Since_Last_Commit"].iloc[0] == 10
+
+    df = load_features(csv_path, None, reference_date=datetime(2020, 1, 31), cache_dir=str(tmp_path / "cache"))
+    assert df["Repo_Age_Days"].iloc[0] == 30
+
+
+def test_copy_with_new_mtime_keeps_features(tmp_path):
+    csv_path = str(tmp_path / "repos.csv")
+    pd.DataFrame(ROWS).to_csv(csv_path, index=False)
+    copy_path = str(tmp_path / "copy.csv")
+    shutil.copy(csv_path, copy_path)
+    os.utime(copy_path, (0, 0))
+
+    original = load_features(csv_path, None, cache_dir=str(tmp_path / "cache"))
+    copied = load_features(copy_path, None, cache_dir=str(tmp_path / "cache"))
+    pd.testing.assert_frame_equal(original, copied)
+    assert compute_stats([copy_path]).median("Repo_Age_Days") == 20
+
+
+def test_file_without_collection_date_requires_reference_date(tmp_path):
+    csv_path = str(tmp_path / "repos.csv")
+    pd.DataFrame({column: ROWS[column] for column in ("Created At", "Last Commit Date")}).to_csv(
+        csv_path, index=False)
+
+    with pytest.raises(ValueError, match="--reference-date"):
+        load_features(csv_path, None, cache_dir=str(tmp_path / "cache"))
+    df = load_features(csv_path, None, reference_date=datetime(2020, 1, 21), cache_dir=str(tmp_path / "cache"))
+    assert df["Repo_Age_Days"].iloc[0] == 20
+
+
+def test_collector_outputs_record_collection_date(mock_github, tmp_path):
+    repos = graphql.get_top_starred_repos_graphql(max_repos=5)
+    report = str(tmp_path / "report.txt")
+    written = graphql.collect_and_print_repo_info(repos, report, parquet_path=str(tmp_path / "repos.parquet"))
+    graphql.txt_to_csv_with_issues_prs(report, str(tmp_path / "from_txt.csv"))
+    graphql.write_repo_report(repos, str(tmp_path / "direct.txt"),
+                              lambda i, repo: written[(repo["owner"]["login"], repo["name"])],
+                              csv_path=str(tmp_path / "direct.csv"))
+
+    for name in ("from_txt.csv", "direct.csv", "repos.parquet"):
+        path, copy_path = str(tmp_path / name), str(tmp_path / ("copy-" + name))
+        shutil.copy(path, copy_path)
+        os.utime(copy_path, (0, 0))
+        source = load_features(path, None, cache_dir=str(tmp_path / "cache"))
+        assert source["Repo_Age_Days"].notna().all()
+        pd.testing.assert_frame_equal(source, load_features(copy_path, None, cache_dir=str(tmp_path / "cache")))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Planos parciais (--rq/--columns): mescla com a busca e o snapshot, N/A no relatório e snapshot completo"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+
+import graphql
+from incremental import load_snapshot, save_snapshot
+from query_planner import FIELD_SELECTIONS, has_all_fields, plan_query
+from repo_record import RepoRecord
+
+
+def key_of(repo):
+    return (repo["owner"]["login"], repo["name"])
+
+
+def test_partial_plan_is_rejected_without_refresh_or_incremental():
+    result = subprocess.run([sys.executable, os.path.join(os.path.dirname(graphql.__file__), "graphql.py"),
+                             "--rq", "RQ02"], capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "--refresh ou --incremental" in result.stderr
+
+
+def test_incremental_partial_plan_merges_search_node_and_snapshot(mock_github, monkeypatch, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    report = str(tmp_path / "report.txt")
+
+    repos = graphql.get_top_starred_repos_graphql(max_repos=20)
+    graphql.incremental_refresh(repos, report, snapshot)
+    previous = load_snapshot(snapshot)
+    assert len(previous) == 20 and all(has_all_fields(repo) for repo in previous.values())
+
+    # Um repositório alterado (novo push, estrelas e PRs) e um novo no ranking
+    changed = mock_github.repos[3]
+    changed["pushedAt"] = "2030-01-01T00:00:00Z"
+    changed["stargazerCount"] += 1
+    changed["pullRequests"] = {"totalCount": 123456}
+    newcomer = mock_github.repos[20]
+
+    monkeypatch.setattr(graphql, "details_plan", plan_query(rqs=["RQ02"]))
+    repos = graphql.get_top_starred_repos_graphql(max_repos=21)
+    written = graphql.incremental_refresh(repos, report, snapshot)
+
+    merged = written[key_of(changed)]
+    old = previous[key_of(changed)]
+    assert merged["pullRequests"] == {"totalCount": 123456}
+    assert merged["pushedAt"] == "2030-01-01T00:00:00Z"
+    assert merged["stargazerCount"] == changed["stargazerCount"]
+    assert merged["forkCount"] == old["forkCount"]
+    assert merged["languages"] == old["languages"]
+    assert has_all_fields(merged)
+
+    # Sem detalhes anteriores, o novo repositório é buscado com o fragmento completo
+    assert dict(written[key_of(newcomer)]) == {field: newcomer[field] for field in RepoRecord.FIELDS}
+
+    saved = load_snapshot(snapshot)
+    assert len(saved) == 21 and all(has_all_fields(repo) for repo in saved.values())
+    with open(report, encoding="utf-8") as f:
+        text = f.read()
+    assert "Stars: 0" not in text and "Forks: N/A" not in text
+
+
+def test_refresh_partial_plan_keeps_unrequested_fields(mock_github, monkeypatch):
+    repos = graphql.get_top_starred_repos_graphql(max_repos=10, with_details=True)
+    known = {key_of(repo): repo for repo in repos}
+    # Um repositório conhecido só pelo ID (snapshot incompleto)
+    sparse = key_of(repos[-1])
+    known[sparse] = RepoRecord.from_mapping({"id": repos[-1]["id"], "name": sparse[1],
+                                             "owner": {"login": sparse[0]}})
+    mock_github.repos[0]["forkCount"] = 1
+
+    monkeypatch.setattr(graphql, "details_plan", plan_query(columns=["Stars"]))
+    _, details = graphql.refresh_by_node_ids(known, graphql.token)
+
+    assert all(has_all_fields(repo) for repo in details.values())
+    # forkCount não foi pedido: continua o do snapshot
+    assert details[key_of(repos[0])]["forkCount"] == repos[0]["forkCount"]
+    assert details[sparse]["forkCount"] == mock_github.by_key[sparse]["forkCount"]
+
+
+def test_report_writes_unfetched_fields_as_missing():
+    partial = RepoRecord.from_mapping({"id": "R_1", "name": "repo", "owner": {"login": "owner"},
+                                       "pullRequests": {"totalCount": 7}, "totalPullRequests": {"totalCount": None}})
+    buffer = io.StringIO()
+    graphql.write_repo_section(buffer, 1, "owner", "repo", partial)
+    text = buffer.getvalue()
+    assert "Stars: N/A" in text and "Forks: N/A" in text
+    assert "RQ03_Total_Releases: N/A" in text and "RQ06 - Total Issues: N/A" in text
+    # Contagem nula (buscada, mas não calculada pelo GitHub) continua 0
+    assert "RQ02_Merged_PRs: 7" in text and "RQ02_Total_PRs: 0" in text
+
+    section = next(graphql.iter_report_sections([text]))
+    row = dict(zip(graphql.CSV_HEADERS, graphql.report_section_to_csv_row(section)))
+    assert row["Stars"] == "N/A" and row["Forks"] == "N/A" and row["Releases"] == "N/A"
+    assert row["Merged PRs"] == 7
+
+
+def test_snapshot_skips_partial_records(tmp_path):
+    full = RepoRecord.from_mapping(dict({field: None for field in FIELD_SELECTIONS},
+                                        id="R_1", name="full", owner={"login": "o"}))
+    partial = RepoRecord.from_mapping({"id": "R_2", "name": "partial", "owner": {"login": "o"}})
+    path = str(tmp_path / "snapshot.json")
+    save_snapshot([full, partial], {("o", "full"): full, ("o", "partial"): partial}, path)
+    with open(path, encoding="utf-8") as f:
+        names = [entry["name"] for entry in json.load(f)["repos"]]
+    assert names == ["full"]
+
+
+def test_incremental_reuse_takes_fresh_stars_from_search(mock_github, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    report = str(tmp_path / "report.txt")
+    graphql.incremental_refresh(graphql.get_top_starred_repos_graphql(max_repos=10), report, snapshot)
+
+    # Só as estrelas mudam: pushedAt/updatedAt iguais, o repositório é reaproveitado do snapshot
+    starred = mock_github.repos[5]
+    starred["stargazerCount"] += 7
+    requests_before = mock_github.stats["requests"]
+    written = graphql.incremental_refresh(graphql.get_top_starred_repos_graphql(max_repos=10), report, snapshot)
+
+    assert mock_github.stats["requests"] - requests_before == 1  # só a busca
+    assert written[key_of(starred)]["stargazerCount"] == starred["stargazerCount"]
+    assert load_snapshot(snapshot)[key_of(starred)]["stargazerCount"] == starred["stargazerCount"]
+    with open(report, encoding="utf-8") as f:
+        assert f"Stars: {starred['stargazerCount']}\n" in f.read()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Orçamento de rate limit e dados GraphQL a partir de uma única decodificação do corpo"""
+
+import requests
+
+import graphql
+
+
+def test_rate_limit_comes_from_the_single_decode(mock_github, monkeypatch):
+    decoded = []
+    decode = requests.Response.json
+
+    def counting_json(self, **kwargs):
+        decoded.append(1)
+        return decode(self, **kwargs)
+
+    monkeypatch.setattr(requests.Response, "json", counting_json)
+    query, variables = graphql.build_batch_query([("owner-0", "repo-0"), ("owner-1", "repo-1")])
+    data, response = graphql.make_graphql_request(graphql.GRAPHQL_URL, {}, {"query": query, "variables": variables})
+
+    assert set(data["data"]) == {"r0", "r1", "rateLimit"}
+    assert len(decoded) == 1
+    # A resposta não é alterada: json() continua sendo o método de requests
+    assert "json" not in vars(response)
+    budget = graphql.token_pool.scheduler_for(graphql.token).budget()
+    assert budget["last_cost"] == 1 and budget["remaining"] is not None
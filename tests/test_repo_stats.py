@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Motor de estatísticas em streaming: quantis do t-digest, mescla de shards e resumo dos gráficos"""
+
+import numpy as np
+import pandas as pd
+
+import graphic_generator
+from repo_stats import CORRELATION_COLUMNS, Correlation, RepoStats, TDigest
+
+QUANTILES = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def rank_error(values, estimate, q):
+    """Distância, em quantil, entre a estimativa e o quantil q dos dados"""
+    below = np.searchsorted(np.sort(values), estimate, side="right") / len(values)
+    return abs(below - q)
+
+
+def sample_values(seed=0, size=50000):
+    rng = np.random.default_rng(seed)
+    # Cauda longa (como estrelas e forks) com muitos valores repetidos
+    return np.floor(rng.lognormal(mean=6, sigma=1.5, size=size))
+
+
+def test_tdigest_quantiles_match_numpy():
+    values = sample_values()
+    digest = TDigest()
+    for chunk in np.array_split(values, 10):
+        digest.add_many(chunk)
+
+    assert digest.count == len(values)
+    for q in QUANTILES:
+        estimate = digest.quantile(q)
+        exact = np.quantile(values, q)
+        assert rank_error(values, estimate, q) < 0.01
+        assert abs(estimate - exact) <= 0.05 * exact + 1
+
+
+def test_tdigest_merge_matches_single_pass():
+    values = sample_values(seed=1)
+    a, b = values[:20000], values[20000:]
+    single, left, right = TDigest(), TDigest(), TDigest()
+    single.add_many(values)
+    left.add_many(a)
+    right.add_many(b)
+    left.merge(right)
+
+    assert left.count == single.count
+    assert (left.min, left.max) == (single.min, single.max)
+    for q in QUANTILES:
+        assert rank_error(values, left.quantile(q), q) < 0.01
+        assert rank_error(values, single.quantile(q), q) < 0.01
+
+
+def correlated_frame(seed=2, size=5000):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=size)
+    data = {column: base * (i + 1) + rng.normal(size=size) * (i + 1) for i, column in enumerate(CORRELATION_COLUMNS)}
+    df = pd.DataFrame(data)
+    # Valores ausentes: cada par usa só as linhas com as duas colunas
+    df.loc[rng.random(size) < 0.1, 'Issues'] = np.nan
+    return df
+
+
+def test_correlation_merge_matches_single_pass_and_pandas():
+    df = correlated_frame()
+    values = df[CORRELATION_COLUMNS].to_numpy(dtype=float)
+    single, left, right = (Correlation(CORRELATION_COLUMNS) for _ in range(3))
+    single.update(values)
+    left.update(values[:1234])
+    right.update(values[1234:])
+    left.merge(right)
+
+    np.testing.assert_allclose(left.matrix().to_numpy(), single.matrix().to_numpy(), atol=1e-12)
+    np.testing.assert_allclose(single.matrix().to_numpy(), df[CORRELATION_COLUMNS].corr().to_numpy(), atol=1e-9)
+
+
+def test_repo_stats_merge_matches_single_pass():
+    df = correlated_frame()
+    rng = np.random.default_rng(3)
+    for column in ('Repo_Age_Days', 'Merged_PRs_Ratio', 'Releases', 'Days_Since_Last_Commit',
+                   'Closed_Issues_Ratio'):
+        df[column] = rng.integers(0, 1000, size=len(df))
+    df['Main Language'] = rng.choice(['Python', 'Go', 'Rust', None], size=len(df))
+
+    single = RepoStats()
+    single.update(df)
+    merged = RepoStats()
+    merged.update(df.iloc[:2000])
+    shard = RepoStats()
+    shard.update(df.iloc[2000:])
+    merged.merge(RepoStats.from_dict(shard.to_dict()))
+
+    assert merged.rows == single.rows == len(df)
+    assert merged.top_languages() == single.top_languages()
+    pd.testing.assert_frame_equal(merged.correlation.matrix(), single.correlation.matrix(), atol=1e-12)
+    for column in ('Stars', 'Releases', 'Issues'):
+        values = pd.to_numeric(df[column]).dropna().to_numpy()
+        for q in QUANTILES:
+            assert rank_error(values, merged.digests[column].quantile(q), q) < 0.01
+
+
+def test_graphic_summary_uses_repo_stats(capsys):
+    df = correlated_frame()
+    for column in ('Repo_Age_Days', 'Merged_PRs_Ratio', 'Releases', 'Days_Since_Last_Commit',
+                   'Closed_Issues_Ratio'):
+        df[column] = np.arange(len(df))
+    df['Main Language'] = 'Python'
+
+    stats = graphic_generator.print_summary(df)
+    output = capsys.readouterr().out
+    assert stats.rows == len(df)
+    assert f"Repositórios: {len(df)}" in output and "Python: 5000" in output
+    assert abs(stats.median('Releases') - df['Releases'].median()) <= 0.01 * len(df)
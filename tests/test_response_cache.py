@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""ResponseCache: chave por endpoint, leituras sem escrita e descarte LRU com os acessos em lote"""
+
+import itertools
+import os
+import sqlite3
+import subprocess
+import sys
+
+import graphql
+import response_cache
+from response_cache import ResponseCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_key_depends_on_endpoint():
+    query, variables = "query { viewer { login } }", {"a": 1}
+    local = ResponseCache.make_key(query, variables, endpoint="http://127.0.0.1:8000/graphql")
+    github = ResponseCache.make_key(query, variables, endpoint="https://api.github.com/graphql")
+    assert local != github
+    assert local == ResponseCache.make_key(query, dict(variables), endpoint="http://127.0.0.1:8000/graphql")
+
+
+def test_graphql_cache_is_not_shared_between_endpoints(mock_github, monkeypatch, tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(graphql, "response_cache", cache)
+    graphql.get_top_starred_repos_graphql(max_repos=10)
+    requests_before = mock_github.stats["requests"]
+
+    graphql.get_top_starred_repos_graphql(max_repos=10)
+    assert mock_github.stats["requests"] == requests_before
+
+    monkeypatch.setattr(graphql, "GRAPHQL_URL", graphql.GRAPHQL_URL.replace("/graphql", "/"))
+    graphql.get_top_starred_repos_graphql(max_repos=10)
+    assert mock_github.stats["requests"] == requests_before + 1
+    cache.close()
+
+
+def test_reads_do_not_write_and_lru_uses_batched_access(monkeypatch, tmp_path):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(response_cache.time, "time", lambda: next(clock))
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path, max_entries=2)
+    cache.put("a", b"A", ttl=100)
+    cache.put("b", b"B", ttl=100)
+
+    changes = cache.conn.total_changes
+    assert cache.get("a") == (b"A", None, True)
+    assert cache.conn.total_changes == changes
+
+    # O acesso pendente de "a" é gravado antes do descarte: sai "b", o menos usado
+    cache.put("c", b"C", ttl=100)
+    assert cache.get("a") is not None and cache.get("b") is None and cache.get("c") is not None
+    cache.close()
+
+    with sqlite3.connect(path) as conn:
+        assert sorted(key for key, in conn.execute("SELECT key FROM entries")) == ["a", "c"]
+
+
+def test_summary_reports_hits_and_oldest_age(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put("old", b"A", ttl=10 * response_cache.HOUR)
+    now[0] += 2 * response_cache.HOUR
+    cache.put("new", b"B", ttl=10 * response_cache.HOUR)
+    now[0] += response_cache.HOUR
+
+    assert cache.get("new")[2] and cache.get("old")[2]
+    assert cache.stats()["oldest_hit_age"] == 3 * response_cache.HOUR
+    assert "2 respostas servidas do cache, a mais antiga gravada há 3.0 h" in cache.summary()
+    cache.close()
+
+
+def test_opens_cache_files_without_stored_at(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, "
+                     "expires_at REAL NOT NULL, last_access REAL NOT NULL)")
+        conn.execute("INSERT INTO entries VALUES ('a', X'41', NULL, 1e12, 0)")
+
+    cache = ResponseCache(path)
+    assert cache.get("a") == (b"A", None, True)
+    # Sem o horário da gravação, a entrada conta como acerto sem idade conhecida
+    assert cache.stats()["oldest_hit_age"] is None and "1 respostas" in cache.summary()
+    cache.close()
+
+
+def test_collector_caches_only_with_cache_option(mock_github, tmp_path):
+    def run(*args):
+        env = dict(os.environ, TOKEN="test-token", GITHUB_GRAPHQL_URL=graphql.GRAPHQL_URL)
+        return subprocess.run([sys.executable, os.path.join(ROOT, "graphql.py"), "--max-repos", "5", *args],
+                              cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120)
+
+    result = run()
+    assert result.returncode == 0
+    assert not list(tmp_path.glob("*.sqlite")) and "Cache de respostas" not in result.stdout
+
+    run("--cache", "cache.sqlite")
+    result = run("--cache", "cache.sqlite")
+    assert (tmp_path / "cache.sqlite").exists()
+    assert "Cache de respostas (cache.sqlite): " in result.stdout
+    assert "0 respostas servidas" not in result.stdout
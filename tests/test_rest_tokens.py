@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Coletor REST (main.py) com tokens revogados: 401 troca de token ou encerra sem exceção"""
+
+import main
+from token_pool import TokenPool
+
+
+def pools(monkeypatch, tokens):
+    for name in ("search_pool", "core_pool"):
+        monkeypatch.setattr(main, name, TokenPool(tokens, points_per_minute=1000000, burst=1000))
+
+
+def test_401_with_only_revoked_token_returns_empty(mock_github, monkeypatch, capsys):
+    mock_github.valid_tokens = {"good"}
+    pools(monkeypatch, ["token"])
+
+    assert main.get_top_starred_repos_paginated(100) == []
+    assert "401" in capsys.readouterr().out
+    # Sem outro token no pool, o 401 não é repetido
+    assert mock_github.stats["unauthorized"] == 1
+
+    # Com o pool esgotado, os detalhes também falham sem exceção
+    assert main.get_repo_details("owner-0", "repo-0") is None
+
+
+def test_401_switches_to_another_token(mock_github, monkeypatch):
+    mock_github.valid_tokens = {"good"}
+    pools(monkeypatch, ["bad", "good"])
+
+    repos = main.get_top_starred_repos_paginated(200)
+    assert len(repos) == 200
+    assert main.search_pool.budget()["token_0"]["revoked"]
+    assert main.get_repo_details("owner-0", "repo-0")["name"] == "repo-0"
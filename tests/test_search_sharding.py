@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Busca fatiada por estrelas: além do limite de 1.000 resultados, sem duplicatas nem lacunas"""
+
+import pytest
+
+import graphql
+from mock_github import MockGitHub
+from search_sharding import SEARCH_RESULT_CAP, SHARD_CAP, merge_shards, plan_star_shards
+
+
+@pytest.fixture
+def large_mock(mock_github, monkeypatch):
+    """Servidor com 2.500 repositórios, mais que uma única busca devolve"""
+    mock = MockGitHub(repos=2500, rate_limit=1000000)
+    monkeypatch.setattr(graphql, "GRAPHQL_URL", f"{mock.start()}/graphql")
+    yield mock
+    mock.stop()
+
+
+def stars_of(repo):
+    return repo["stargazerCount"]
+
+
+def test_shards_are_adjacent_and_under_the_cap(large_mock):
+    def count_in_range(low, high):
+        return sum(low <= stars_of(repo) <= high for repo in large_mock.repos)
+
+    max_stars = max(stars_of(repo) for repo in large_mock.repos)
+    shards = list(plan_star_shards(count_in_range, max_stars, 2000))
+
+    assert shards[0][1] == max_stars
+    for (low, _, _), (_, next_high, _) in zip(shards, shards[1:]):
+        assert next_high == low - 1
+    assert all(count <= SHARD_CAP for _, _, count in shards)
+    assert sum(count for _, _, count in shards) >= 2000
+
+
+def test_sharded_search_collects_past_the_cap(large_mock):
+    max_repos = 2000
+    repos = graphql.get_top_starred_repos_sharded(max_repos=max_repos, workers=4)
+
+    assert len(repos) == max_repos > SEARCH_RESULT_CAP
+    keys = [(repo["owner"]["login"], repo["name"]) for repo in repos]
+    assert len(set(keys)) == len(keys)
+
+    stars = [stars_of(repo) for repo in repos]
+    assert stars == sorted(stars, reverse=True)
+
+    # Sem lacunas nas fronteiras: todo repositório acima da menor contagem coletada está presente
+    floor = stars[-1]
+    expected = {(repo["owner"]["login"], repo["name"]) for repo in large_mock.repos if stars_of(repo) > floor}
+    assert expected <= set(keys)
+
+
+def test_merge_shards_drops_repos_seen_in_two_shards():
+    def repo(name, stars):
+        return {"owner": {"login": "o"}, "name": name, "stargazerCount": stars}
+
+    # "b" ganhou estrelas entre a consulta das duas faixas
+    upper = [repo("a", 30), repo("b", 21)]
+    lower = [repo("b", 20), repo("c", 10)]
+    merged = merge_shards([lower, upper], max_repos=10)
+
+    assert [(r["name"], r["stargazerCount"]) for r in merged] == [("a", 30), ("b", 21), ("c", 10)]
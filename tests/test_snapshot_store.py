@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Histórico de métricas: deltas por coleta, séries pelo índice e pelo Parquet e ranking de crescimento"""
+
+import copy
+from datetime import date, timedelta
+
+from mock_github import make_dataset
+from snapshot_store import SnapshotStore
+
+DAY1 = date(2024, 1, 1)
+DAY2 = DAY1 + timedelta(days=10)
+DAY3 = DAY1 + timedelta(days=20)
+
+
+def collection(repos):
+    return repos, {(repo["owner"]["login"], repo["name"]): repo for repo in repos}
+
+
+def test_append_series_and_top_growers(tmp_path):
+    grower, unchanged, other = make_dataset(3)
+    store = SnapshotStore(str(tmp_path / "history"))
+    assert store.append(*collection([grower, unchanged, other]), collected_on=DAY1) == 3
+
+    # Dia 2: grower ganha 100 estrelas; other ganha 5 estrelas e forks; unchanged não muda
+    grower2, other2 = copy.deepcopy(grower), copy.deepcopy(other)
+    grower2["stargazerCount"] += 100
+    other2["stargazerCount"] += 5
+    other2["forkCount"] += 1
+    assert store.append(*collection([grower2, unchanged, other2]), collected_on=DAY2) == 2
+
+    # Dia 3: grower ganha mais 50 estrelas; other só muda releases (métrica fora do índice)
+    grower3, other3 = copy.deepcopy(grower2), copy.deepcopy(other2)
+    grower3["stargazerCount"] += 50
+    other3["releases"] = {"totalCount": other2["releases"]["totalCount"] + 1}
+    assert store.append(*collection([grower3, unchanged, other3]), collected_on=DAY3) == 2
+
+    assert [rows for _, _, _, rows in store.snapshots()] == [3, 2, 2]
+
+    stars = grower["stargazerCount"]
+    assert store.series("owner-0", "repo-0") == [(DAY1, stars), (DAY2, stars + 100), (DAY3, stars + 150)]
+    assert store.series("owner-1", "repo-1") == [(DAY1, unchanged["stargazerCount"])]
+    releases = other["releases"]["totalCount"]
+    assert store.series("owner-2", "repo-2", "releases") == [(DAY1, releases), (DAY2, releases),
+                                                            (DAY3, releases + 1)]
+    assert store.series("owner-1", "repo-1", "releases") == [(DAY1, unchanged["releases"]["totalCount"])]
+
+    # Janela desde antes do dia 2: o repositório sem deltas usa a observação do dia 1
+    growers = store.top_growers(days=15, as_of=DAY3)
+    assert [(owner, growth) for owner, _, _, _, growth in growers] == [("owner-0", 150), ("owner-2", 5),
+                                                                        ("owner-1", 0)]
+    assert growers[0][2:4] == (stars, stars + 150)
+    growers = store.top_growers(days=5, as_of=DAY3)
+    assert [(owner, growth) for owner, _, _, _, growth in growers] == [("owner-0", 50), ("owner-1", 0),
+                                                                        ("owner-2", 0)]
+    # Sem observação antes do início da janela, o repositório fica de fora
+    assert store.top_growers(days=30, as_of=DAY3) == []
+    store.close()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de tokens do GitHub com orçamento de rate limit por token
+
+Cada token tem seu próprio RateLimitScheduler. Cada requisição (ou lote) vai
+para o token com mais folga, e tokens revogados ou esgotados são evitados até
+voltarem a ter orçamento.
+"""
+
+import os
+import threading
+import time
+
+from rate_limit import RateLimitScheduler
+
+
+class NoTokensAvailableError(Exception):
+    """Todos os tokens do pool foram revogados"""
+
+
+def tokens_from_env():
+    """Lê os tokens de TOKENS (separados por vírgula) e de TOKEN"""
+    tokens = [t.strip() for t in os.getenv("TOKENS", "").split(",")]
+    tokens.append(os.getenv("TOKEN"))
+    # Remove vazios e duplicados mantendo a ordem
+    return list(dict.fromkeys(t for t in tokens if t))
+
+
+class TokenPool:
+    """Distribui requisições entre vários tokens conforme o orçamento de cada um
+
+    Sem tokens, o pool usa um único escalonador e não altera o header de
+    autorização (útil contra servidores locais de teste).
+    """
+
+    def __init__(self, tokens, **scheduler_kwargs):
+        tokens = list(dict.fromkeys(tokens)) or [None]
+        self.schedulers = {t: RateLimitScheduler(**scheduler_kwargs) for t in tokens}
+        self.labels = {t: f"token_{i}" for i, t in enumerate(tokens)}
+        self.revoked = set()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **scheduler_kwargs):
+        return cls(tokens_from_env(), **scheduler_kwargs)
+
+    def scheduler_for(self, token):
+        return self.schedulers[token]
+
+    def _pick(self):
+        active = [t for t in self.schedulers if t not in self.revoked]
+        if not active:
+            raise NoTokensAvailableError("Todos os tokens foram revogados")
+
+        now = time.time()
+
+        def headroom(t):
+            scheduler = self.schedulers[t]
+            budget = scheduler.budget()
+            if scheduler.blocked_until > now:
+                return (0, -scheduler.blocked_until, 0)
+            remaining = budget["remaining"]
+            if remaining is None:
+                # Ainda sem resposta: assume o limite padrão do GitHub
+                remaining = budget["limit"] or 5000
+            if remaining <= 0 and budget["reset_at"]:
+                return (0, -budget["reset_at"], 0)
+            return (1, remaining, budget["bucket_tokens"])
+
+        return max(active, key=headroom)
+
+    def has_active_tokens(self):
+        """Verifica se ainda há algum token não revogado"""
+        with self.lock:
+            return any(t not in self.revoked for t in self.schedulers)
+
+    def acquire(self, cost=1):
+        """Escolhe o token com mais folga, reserva o custo e espera se preciso"""
+        with self.lock:
+            token = self._pick()
+            wait = self.schedulers[token].reserve_slot(cost)
+        if wait > 0:
+            time.sleep(wait)
+        return token
+
+    def last_cost(self):
+        """Último custo GraphQL observado em qualquer token"""
+        costs = [s.last_cost for s in self.schedulers.values() if s.last_cost]
+        return costs[-1] if costs else 1
+
+    def update_from_response(self, token, response, rate_limit=None):
+        """Atualiza o orçamento do token (headers e rateLimit GraphQL) e marca como revogado em caso de 401"""
+        if response.status_code == 401:
+            self.revoke(token)
+            return
+        self.schedulers[token].update_from_response(response, rate_limit)
+
+    def revoke(self, token):
+        with self.lock:
+            if token is not None:
+                self.revoked.add(token)
+                print(f"{self.labels[token]} revogado ou inválido, removido do pool")
+
+    def budget(self):
+        """Métrica com o orçamento de cada token (identificados por rótulo, nunca pelo valor)"""
+        return {
+            self.labels[t]: dict(s.budget(), revoked=t in self.revoked)
+            for t, s in self.schedulers.items()
+        }